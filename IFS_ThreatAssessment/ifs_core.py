@@ -17,6 +17,15 @@ from typing import Tuple, Union, List
 from dataclasses import dataclass
 import math
 
+try:
+    from numba import njit  # 可选：JIT编译数值内核
+except ImportError:
+    def njit(*args, **kwargs):
+        """numba不可用时的空装饰器，直接返回原函数"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 
 @dataclass
 class IFS:
@@ -118,7 +127,26 @@ class IFSConverter:
             nu = max(0.0, 1.0 - mu - 0.1)
         
         return IFS(mu=mu, nu=nu)
-    
+
+    @staticmethod
+    def from_real_number_arrays(value: np.ndarray, ideal, tolerance,
+                                min_val, max_val) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        实数 → IFS（批量版，与from_real_number逐元素等价）
+
+        参数均可为标量或可广播的数组，要求 max_val > min_val
+
+        Returns:
+            (mu, nu) 已满足IFS约束的数组
+        """
+        deviation = np.abs(value - ideal)
+        mu = np.exp(-(deviation ** 2) / (2 * tolerance ** 2))
+        nu = np.minimum(0.9, deviation / (max_val - min_val))
+        # 确保 μ + ν ≤ 1，保留小量犹豫度
+        nu = np.where(mu + nu > 1.0, 1.0 - mu - 0.05, nu)
+        mu, nu, _ = normalize_ifs_arrays(mu, nu)
+        return mu, nu
+
     @staticmethod
     def from_interval(lower: float, upper: float, ideal: float, 
                      reference_range: Tuple[float, float]) -> IFS:
@@ -389,6 +417,86 @@ def create_ifs(mu: float, nu: float) -> IFS:
     return IFS(mu=mu, nu=nu)
 
 
+def normalize_ifs_arrays(mu: np.ndarray, nu: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    批量版IFS约束处理（与IFS.__post_init__逐元素等价）
+
+    Args:
+        mu: 隶属度数组
+        nu: 非隶属度数组
+
+    Returns:
+        (mu, nu, pi) 满足 μ + ν ≤ 1 的数组三元组
+    """
+    mu = np.clip(mu, 0.0, 1.0)
+    nu = np.clip(nu, 0.0, 1.0)
+
+    # 约束条件：μ + ν ≤ 1，超出时归一化
+    total = mu + nu
+    scale = np.where(total > 1.0, total, 1.0)
+    mu = mu / scale
+    nu = nu / scale
+
+    return mu, nu, 1.0 - mu - nu
+
+
+def weighted_average_arrays(mu: np.ndarray, nu: np.ndarray,
+                            weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    批量版IFWA聚合（与IFSOperations.weighted_average逐行等价，含IFS约束处理）
+
+    每行是一个目标，每列是一个指标；按列顺序逐项累加，保证与标量版结果一致。
+    参数校验与标量版相同，校验通过后调用编译内核计算
+
+    Args:
+        mu: 隶属度矩阵 (N, K)
+        nu: 非隶属度矩阵 (N, K)
+        weights: 指标权重 (K,)，内部归一化
+
+    Returns:
+        (mu_w, nu_w, score) 三个长度为N的数组，score = μ_w - ν_w
+    """
+    if mu.shape[1] != len(weights):
+        raise ValueError("IFS列表和权重列表长度必须相等")
+    if weights.sum() == 0:
+        raise ValueError("权重和不能为0")
+    return _weighted_average_kernel(mu, nu, weights)
+
+
+@njit(cache=True)
+def _weighted_average_kernel(mu: np.ndarray, nu: np.ndarray,
+                             weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """weighted_average_arrays的计算内核（numba可用时JIT编译），调用方负责校验权重"""
+    n, k = mu.shape
+    weight_sum = 0.0
+    for j in range(k):
+        weight_sum += weights[j]
+
+    mu_out = np.empty(n)
+    nu_out = np.empty(n)
+    score = np.empty(n)
+    for i in range(n):
+        mu_w = 0.0
+        nu_w = 0.0
+        for j in range(k):
+            w = weights[j] / weight_sum
+            mu_w += w * mu[i, j]
+            nu_w += w * nu[i, j]
+
+        # 与IFS.__post_init__一致：截断到[0, 1]，μ + ν > 1 时归一化
+        mu_w = max(0.0, min(1.0, mu_w))
+        nu_w = max(0.0, min(1.0, nu_w))
+        total = mu_w + nu_w
+        if total > 1.0:
+            mu_w = mu_w / total
+            nu_w = nu_w / total
+
+        mu_out[i] = mu_w
+        nu_out[i] = nu_w
+        score[i] = mu_w - nu_w
+    return mu_out, nu_out, score
+
+
 def convert_to_ifs(value: Union[float, Tuple, str], 
                    conversion_type: str = 'real',
                    **kwargs) -> IFS:
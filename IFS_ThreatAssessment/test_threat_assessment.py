@@ -189,7 +189,18 @@ def test_threat_indicators():
     env_complex = indicators.evaluate_environment(0.8, 0.7)
     runner.assert_true(env_open['threat_score'] > env_complex['threat_score'],
                       "开阔环境威胁 > 复杂环境威胁")
-    
+
+    # 测试7：批量评估与逐个评估一致
+    print("\n测试2.7：批量评估一致性")
+    vis_batch = indicators.evaluate_visibility_batch([False, True], visibility_ratio=[1.0, 0.2])
+    runner.assert_true(np.allclose(vis_batch['threat_score'],
+                                   [vis_clear['threat_score'], vis_blocked['threat_score']]),
+                      "通视批量评估 = 逐个评估")
+    env_batch = indicators.evaluate_environment_batch([0.1, 0.8], [0.1, 0.7])
+    runner.assert_true(np.allclose(env_batch['threat_score'],
+                                   [env_open['threat_score'], env_complex['threat_score']]),
+                      "环境批量评估 = 逐个评估")
+
     runner.print_summary()
     return runner
 
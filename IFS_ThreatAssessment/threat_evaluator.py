@@ -8,8 +8,14 @@
 import numpy as np
 from typing import Dict, List, Tuple, Optional
 import time
-from .ifs_core import IFS, IFSOperations
-from .threat_indicators import ThreatIndicators
+from bisect import bisect_right
+from .ifs_core import IFS, IFSOperations, weighted_average_arrays
+from .threat_indicators import ThreatIndicators, ThresholdConfig
+
+
+# 综合威胁等级：按升序阈值二分查找，下标即等级
+_THREAT_LEVEL_BOUNDS = (0.0, 0.3, 0.6)
+_THREAT_LEVEL_NAMES = ('low', 'medium', 'high', 'critical')
 
 
 class IFSThreatEvaluator:
@@ -22,7 +28,7 @@ class IFSThreatEvaluator:
     3. 找出最具威胁的目标
     """
     
-    def __init__(self, custom_weights: Dict[str, float] = None):
+    def __init__(self, custom_weights: Dict[str, float] = None, thresholds: ThresholdConfig = None):
         """
         初始化威胁评估器
         
@@ -37,10 +43,19 @@ class IFSThreatEvaluator:
                     'visibility': 0.06,  # 通视条件
                     'environment': 0.04  # 作战环境
                 }
+            thresholds: 各指标分段阈值（ThresholdConfig），为None时使用默认阈值
         """
-        self.indicators = ThreatIndicators()
+        self.indicators = ThreatIndicators(thresholds)
         self.operations = IFSOperations()
         
+        # 批量聚合用的 (N, K) 隶属度/非隶属度缓冲区，目标数超出容量时扩容，跨调用复用
+        self._mu_buf = np.empty((0, 0))
+        self._nu_buf = np.empty((0, 0))
+        
+        # 预先调用一次聚合内核：numba可用时在初始化阶段完成JIT编译（或加载编译缓存），
+        # 避免第一个回合的评估承担这部分耗时
+        weighted_average_arrays(np.zeros((1, 1)), np.zeros((1, 1)), np.ones(1))
+        
         # 设置指标权重
         self.default_weights = {
             'distance': 0.30,
@@ -97,6 +112,131 @@ class IFSThreatEvaluator:
         """
         start_time = time.time()
         
+        indicator_results, distance = self._evaluate_indicators(enemy, player_pos, terrain_data)
+        ifs_list, weight_list, indicator_names = self._collect_indicator_ifs(indicator_results)
+        
+        # 4. 使用IFS加权算术平均算子（IFWA）聚合
+        comprehensive_ifs = self.operations.weighted_average(ifs_list, weight_list)
+        
+        return self._build_result(
+            enemy, indicator_results, distance, ifs_list, weight_list, indicator_names,
+            comprehensive_ifs.mu, comprehensive_ifs.nu, comprehensive_ifs.pi,
+            time.time() - start_time
+        )
+    
+    def evaluate_targets(self, 
+                         enemies: List[Dict], 
+                         player_pos: Tuple[float, float] = (0, 0),
+                         terrain_data: Dict = None) -> List[Dict]:
+        """
+        批量评估多个敌人的威胁度（结果与逐个调用evaluate_single_target一致）
+        
+        各指标仍逐个目标评估，IFWA聚合则把所有目标的(μ, ν)打包成 (N, K) 矩阵，
+        由weighted_average_arrays一次完成（numba可用时JIT编译）
+        
+        Args:
+            enemies: 敌人列表
+            player_pos: 玩家位置
+            terrain_data: 地形数据（可选），按 terrain_data['enemies'][敌人ID] 取各目标的地形信息
+        
+        Returns:
+            与enemies顺序一致的评估结果列表
+        """
+        if not enemies:
+            return []
+        
+        evaluated, weight_list, indicator_names, mu_w, nu_w, _, aggregation_time = \
+            self._aggregate_targets(enemies, player_pos, terrain_data)
+        
+        return [
+            self._build_aggregated_result(
+                enemy, evaluated[i], weight_list, indicator_names,
+                float(mu_w[i]), float(nu_w[i]), aggregation_time
+            )
+            for i, enemy in enumerate(enemies)
+        ]
+    
+    def _aggregate_targets(self, 
+                           enemies: List[Dict], 
+                           player_pos: Tuple[float, float],
+                           terrain_data: Optional[Dict]) -> Tuple:
+        """
+        逐个目标评估各指标，再一次完成所有目标的IFWA聚合（不组装结果字典）
+        
+        Args:
+            enemies: 敌人列表（非空）
+            player_pos: 玩家位置
+            terrain_data: 地形数据（可选）
+        
+        Returns:
+            (各目标的(指标结果, 距离, 耗时)列表, 权重列表, 指标名称列表,
+             聚合μ数组, 聚合ν数组, 综合得分数组, 平均每个目标的聚合耗时)
+        """
+        evaluated = []
+        for enemy in enemies:
+            start_time = time.time()
+            enemy_terrain_data = None
+            if terrain_data and 'enemies' in terrain_data:
+                enemy_terrain_data = terrain_data['enemies'].get(enemy['id'], None)
+            indicator_results, distance = self._evaluate_indicators(enemy, player_pos, enemy_terrain_data)
+            evaluated.append((indicator_results, distance, time.time() - start_time))
+        
+        # 指标集合只取决于权重配置，所有目标相同
+        _, weight_list, indicator_names = self._collect_indicator_ifs(evaluated[0][0])
+        
+        # 4. 把 (μ, ν) 写入复用的 (N, K) 缓冲区，一次完成所有目标的IFWA聚合
+        n, k = len(enemies), len(indicator_names)
+        if self._mu_buf.shape[0] < n or self._mu_buf.shape[1] != k:
+            capacity = max(n, 2 * self._mu_buf.shape[0])
+            self._mu_buf = np.empty((capacity, k))
+            self._nu_buf = np.empty((capacity, k))
+        mu = self._mu_buf[:n]
+        nu = self._nu_buf[:n]
+        for i, (indicator_results, _, _) in enumerate(evaluated):
+            for j, name in enumerate(indicator_names):
+                ifs = indicator_results[name]['ifs']
+                mu[i, j] = ifs.mu
+                nu[i, j] = ifs.nu
+        
+        start_time = time.time()
+        mu_w, nu_w, scores = weighted_average_arrays(mu, nu, np.asarray(weight_list, dtype=np.float64))
+        aggregation_time = (time.time() - start_time) / n
+        
+        return evaluated, weight_list, indicator_names, mu_w, nu_w, scores, aggregation_time
+    
+    def _build_aggregated_result(self, 
+                                 enemy: Dict, 
+                                 evaluated: Tuple[Dict, float, float],
+                                 weight_list: List[float], 
+                                 indicator_names: List[str],
+                                 mu: float, 
+                                 nu: float, 
+                                 aggregation_time: float) -> Dict:
+        """
+        由_aggregate_targets的单个目标输出组装评估结果
+        """
+        indicator_results, distance, elapsed = evaluated
+        ifs_list = [indicator_results[name]['ifs'] for name in indicator_names]
+        return self._build_result(
+            enemy, indicator_results, distance, ifs_list, weight_list, indicator_names,
+            mu, nu, 1.0 - mu - nu, elapsed + aggregation_time
+        )
+    
+    def _evaluate_indicators(self, 
+                             enemy: Dict, 
+                             player_pos: Tuple[float, float],
+                             terrain_data: Optional[Dict]) -> Tuple[Dict, float]:
+        """
+        计算单个敌人的六项威胁指标
+        
+        Args:
+            enemy: 敌人数据字典
+            player_pos: 玩家位置 (x, z)
+            terrain_data: 该敌人的地形数据（可选）
+        
+        Returns:
+            (各指标评估结果字典, 敌我距离)
+        """
         # 1. 计算距离
         dx = enemy['x'] - player_pos[0]
         dz = enemy['z'] - player_pos[1]
@@ -156,7 +296,18 @@ class IFSThreatEvaluator:
                 building_density=0.1
             )
         
-        # 3. 提取各指标的IFS值
+        return indicator_results, distance
+    
+    def _collect_indicator_ifs(self, indicator_results: Dict) -> Tuple[List[IFS], List[float], List[str]]:
+        """
+        3. 按固定顺序提取参与聚合的各指标IFS值及权重
+        
+        Args:
+            indicator_results: _evaluate_indicators返回的指标结果
+        
+        Returns:
+            (IFS列表, 权重列表, 指标名称列表)
+        """
         ifs_list = []
         weight_list = []
         indicator_names = []
@@ -167,21 +318,41 @@ class IFSThreatEvaluator:
                 weight_list.append(self.weights[indicator_name])
                 indicator_names.append(indicator_name)
         
-        # 4. 使用IFS加权算术平均算子（IFWA）聚合
-        comprehensive_ifs = self.operations.weighted_average(ifs_list, weight_list)
+        return ifs_list, weight_list, indicator_names
+    
+    @staticmethod
+    def _threat_level(comprehensive_score: float) -> str:
+        """
+        由综合威胁得分确定威胁等级
         
+        Args:
+            comprehensive_score: 综合威胁得分（-1 到 1）
+        
+        Returns:
+            'critical' / 'high' / 'medium' / 'low'
+        """
+        # 得分 >= 0.6 → critical，>= 0.3 → high，>= 0.0 → medium，其余 → low
+        return _THREAT_LEVEL_NAMES[bisect_right(_THREAT_LEVEL_BOUNDS, comprehensive_score)]
+    
+    def _build_result(self, 
+                      enemy: Dict, 
+                      indicator_results: Dict, 
+                      distance: float,
+                      ifs_list: List[IFS], 
+                      weight_list: List[float], 
+                      indicator_names: List[str],
+                      mu: float, 
+                      nu: float, 
+                      pi: float,
+                      evaluation_time: float) -> Dict:
+        """
+        由聚合后的(μ, ν, π)组装评估结果（格式见evaluate_single_target）
+        """
         # 5. 计算综合威胁得分
-        comprehensive_score = comprehensive_ifs.score()
+        comprehensive_score = mu - nu
         
         # 6. 确定威胁等级
-        if comprehensive_score >= 0.6:
-            threat_level = 'critical'
-        elif comprehensive_score >= 0.3:
-            threat_level = 'high'
-        elif comprehensive_score >= 0.0:
-            threat_level = 'medium'
-        else:
-            threat_level = 'low'
+        threat_level = self._threat_level(comprehensive_score)
         
         # 7. 计算各指标对综合得分的贡献
         contributions = {}
@@ -195,16 +366,14 @@ class IFSThreatEvaluator:
                 'percentage': (contribution / comprehensive_score * 100) if comprehensive_score != 0 else 0
             }
         
-        evaluation_time = time.time() - start_time
-        
         return {
             'enemy_id': enemy['id'],
             'comprehensive_threat_score': comprehensive_score,
             'threat_level': threat_level,
             'ifs_values': {
-                'membership': comprehensive_ifs.mu,
-                'non_membership': comprehensive_ifs.nu,
-                'hesitancy': comprehensive_ifs.pi
+                'membership': mu,
+                'non_membership': nu,
+                'hesitancy': pi
             },
             'indicator_details': indicator_results,
             'weighted_aggregation': {
@@ -231,16 +400,7 @@ class IFSThreatEvaluator:
         Returns:
             按威胁度降序排列的评估结果列表
         """
-        results = []
-        
-        for enemy in enemies:
-            # 获取该敌人的地形数据（如果存在）
-            enemy_terrain_data = None
-            if terrain_data and 'enemies' in terrain_data:
-                enemy_terrain_data = terrain_data['enemies'].get(enemy['id'], None)
-            
-            result = self.evaluate_single_target(enemy, player_pos, enemy_terrain_data)
-            results.append(result)
+        results = self.evaluate_targets(enemies, player_pos, terrain_data)
         
         # 按综合威胁得分降序排序
         results.sort(key=lambda x: x['comprehensive_threat_score'], reverse=True)
@@ -254,7 +414,8 @@ class IFSThreatEvaluator:
     def find_most_threatening(self, 
                              enemies: List[Dict], 
                              player_pos: Tuple[float, float] = (0, 0),
-                             terrain_data: Dict = None) -> Optional[Dict]:
+                             terrain_data: Dict = None,
+                             include_details: bool = True) -> Optional[Dict]:
         """
         快速找出最高威胁目标（优化版）
         
@@ -262,6 +423,8 @@ class IFSThreatEvaluator:
             enemies: 敌人列表
             player_pos: 玩家位置
             terrain_data: 地形数据（可选）
+            include_details: 是否组装完整评估结果（指标详情、贡献度等）；
+                为False时只返回 enemy_id / comprehensive_threat_score / threat_level / distance
         
         Returns:
             最高威胁目标的评估结果，如果没有敌人则返回None
@@ -270,22 +433,30 @@ class IFSThreatEvaluator:
             return None
         
         if len(enemies) == 1:
-            return self.evaluate_single_target(enemies[0], player_pos, terrain_data)
-        
-        # 评估所有目标并找出最大威胁
-        max_threat_score = -float('inf')
-        most_threatening = None
+            result = self.evaluate_single_target(enemies[0], player_pos, terrain_data)
+            if not include_details:
+                result = {key: result[key] for key in
+                          ('enemy_id', 'comprehensive_threat_score', 'threat_level', 'distance')}
+            return result
+        
+        # 批量聚合所有目标，只为第一个最大威胁目标组装结果
+        evaluated, weight_list, indicator_names, mu_w, nu_w, scores, aggregation_time = \
+            self._aggregate_targets(enemies, player_pos, terrain_data)
+        best = int(np.argmax(scores))
+        
+        if not include_details:
+            comprehensive_score = float(scores[best])
+            return {
+                'enemy_id': enemies[best]['id'],
+                'comprehensive_threat_score': comprehensive_score,
+                'threat_level': self._threat_level(comprehensive_score),
+                'distance': evaluated[best][1]
+            }
         
-        for enemy in enemies:
-            enemy_terrain_data = None
-            if terrain_data and 'enemies' in terrain_data:
-                enemy_terrain_data = terrain_data['enemies'].get(enemy['id'], None)
-            
-            result = self.evaluate_single_target(enemy, player_pos, enemy_terrain_data)
-            
-            if result['comprehensive_threat_score'] > max_threat_score:
-                max_threat_score = result['comprehensive_threat_score']
-                most_threatening = result
+        most_threatening = self._build_aggregated_result(
+            enemies[best], evaluated[best], weight_list, indicator_names,
+            float(mu_w[best]), float(nu_w[best]), aggregation_time
+        )
         
         if most_threatening:
             most_threatening['rank'] = 1
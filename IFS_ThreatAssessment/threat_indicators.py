@@ -13,110 +13,239 @@
 
 import numpy as np
 import math
-from typing import Dict, Tuple
-from .ifs_core import IFS, IFSConverter
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+from .ifs_core import IFS, IFSConverter, normalize_ifs_arrays
+
+# 弧度→角度换算系数（避免每次调用math.degrees）
+_RAD2DEG = 180.0 / math.pi
+
+# 距离指标量化精度（每米分段数），0.1米以内的差异视为相同距离
+_DISTANCE_BINS_PER_METER = 10
+
+# 批量评估统一使用float32：隶属度/得分精度约1e-5（相对于1.0），
+# 远低于模糊评价本身的不确定性，同时内存带宽减半
+_BATCH_DTYPE = np.float32
+
+# 作战环境分级查找表（批量评估用）
+# 复杂度分界：total_density < 0.3 → open，< 0.6 → moderate，否则 complex
+_ENV_BOUNDS = np.array([0.3, 0.6], dtype=_BATCH_DTYPE)
+
+_DIST_ZONES = np.array(['critical', 'high', 'medium', 'low'])
+
+_SPEED_CATEGORIES = np.array(['high_speed', 'medium_speed', 'low_speed', 'static'])
+_ANGLE_CATEGORIES = np.array(['approaching', 'flanking', 'lateral', 'retreating'])
+_ENV_LEVELS = np.array(['open', 'moderate', 'complex'])
+_ENV_THREAT_LEVELS = np.array(['high', 'medium', 'low'])
+# 每行：(mu基值, mu斜率, nu基值, nu斜率, 密度偏移)，mu = 基值 + 斜率 * (密度 - 偏移)
+_ENV_COEFFS = np.array([
+    [0.70, -0.20, 0.20, 0.10, 0.0],   # open
+    [0.50, -0.10, 0.35, 0.10, 0.3],   # moderate
+    [0.40, -0.15, 0.30, 0.10, 0.0],   # complex
+], dtype=_BATCH_DTYPE)
+
+
+class ThresholdConfig:
+    """
+    威胁指标分段阈值（只读）
+
+    构造时可通过关键字参数覆盖默认阈值，构造后不可修改；
+    使用__slots__存储，热路径以属性访问代替字典键查找
+    """
+
+    __slots__ = ('d_crit', 'd_high', 'd_med', 'd_low',
+                 'speed_by_type', 'speed_default',
+                 'ang_direct', 'ang_oblique', 'ang_lateral')
+
+    def __init__(
+        self,
+        d_crit: float = 10,
+        d_high: float = 20,
+        d_med: float = 35,
+        d_low: float = 50,
+        speed_by_type: Optional[Dict[str, Tuple[float, float]]] = None,
+        speed_default: Tuple[float, float] = (5.0, 2.0),
+        ang_direct: float = 30,
+        ang_oblique: float = 90,
+        ang_lateral: float = 150
+    ):
+        """
+        Args:
+            d_crit: 极高威胁区域距离上限（米）
+            d_high: 高威胁区域距离上限（米）
+            d_med: 中威胁区域距离上限（米）
+            d_low: 低威胁区域距离上限（米）
+            speed_by_type: 类型 → (高速阈值, 中速阈值)（m/s），为None时使用士兵/无人机的默认值
+            speed_default: 未知类型的(高速阈值, 中速阈值)，默认按士兵处理
+            ang_direct: 直接朝向角度上限（度）
+            ang_oblique: 斜向角度上限（度）
+            ang_lateral: 侧向角度上限（度）
+        """
+        if not 0 < d_crit < d_high < d_med < d_low:
+            raise ValueError("距离阈值必须满足 0 < d_crit < d_high < d_med < d_low")
+        if not 0 < ang_direct < ang_oblique < ang_lateral < 180:
+            raise ValueError("角度阈值必须满足 0 < ang_direct < ang_oblique < ang_lateral < 180")
+        if speed_by_type is None:
+            speed_by_type = {
+                'soldier': (5.0, 2.0),   # 士兵
+                'drone': (15.0, 8.0)     # 无人机
+            }
+
+        _set = object.__setattr__
+        # 距离分段阈值（米）
+        _set(self, 'd_crit', d_crit)     # 极高威胁区域
+        _set(self, 'd_high', d_high)     # 高威胁区域
+        _set(self, 'd_med', d_med)       # 中威胁区域
+        _set(self, 'd_low', d_low)       # 低威胁区域
+
+        # 速度阈值（m/s）：类型 → (高速阈值, 中速阈值)
+        _set(self, 'speed_by_type', MappingProxyType(  # 只读视图，阈值统一存为元组
+            {name: tuple(limits) for name, limits in speed_by_type.items()}
+        ))
+        _set(self, 'speed_default', tuple(speed_default))
+
+        # 角度阈值（度）
+        _set(self, 'ang_direct', ang_direct)     # 直接朝向
+        _set(self, 'ang_oblique', ang_oblique)   # 斜向
+        _set(self, 'ang_lateral', ang_lateral)   # 侧向
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"ThresholdConfig是只读的，不能修改 {name}")
+
+
+def _build_dist_params(cfg: ThresholdConfig) -> np.ndarray:
+    """
+    按距离分段阈值生成距离分区参数表（批量评估用，与_distance_ifs的分区参数一致）
+
+    Args:
+        cfg: 分段阈值配置
+
+    Returns:
+        shape为(4, 8)的参数表，每行：(理想值, 容忍度, 区间下界, 区间上界, mu增量, mu上限, nu减量, nu下限)
+    """
+    return np.array([
+        [0.0, 5.0, 0.0, cfg.d_crit, 0.15, 0.95, 0.10, 0.02],             # critical
+        [cfg.d_crit, 5.0, cfg.d_crit, cfg.d_high, 0.10, 0.85, 0.05, 0.05],  # high
+        [cfg.d_high, 7.0, cfg.d_high, cfg.d_med, 0.0, 1.0, 0.0, 0.0],       # medium（不增强）
+        [cfg.d_high, 7.0, cfg.d_high, cfg.d_med, 0.0, 1.0, 0.0, 0.0],       # low（占位，使用指数衰减）
+    ], dtype=_BATCH_DTYPE)
 
 
 class ThreatIndicators:
     """威胁指标评估类"""
     
-    def __init__(self):
-        """初始化指标参数"""
-        self.converter = IFSConverter()
+    def __init__(self, thresholds: Optional[ThresholdConfig] = None):
+        """
+        初始化指标参数
         
-        # 距离分段阈值（米）
-        self.distance_thresholds = {
-            'critical': 10,    # 极高威胁区域
-            'high': 20,        # 高威胁区域
-            'medium': 35,      # 中威胁区域
-            'low': 50          # 低威胁区域
-        }
+        Args:
+            thresholds: 各指标分段阈值（距离/速度/角度），为None时使用默认阈值
+        """
+        self.converter = IFSConverter()
         
-        # 速度阈值（m/s）
-        self.speed_thresholds = {
-            'soldier': {
-                'high': 5.0,    # 士兵高速阈值
-                'medium': 2.0   # 士兵中速阈值
-            },
-            'drone': {
-                'high': 15.0,   # 无人机高速阈值
-                'medium': 8.0   # 无人机中速阈值
-            }
-        }
+        # 各指标分段阈值（距离/速度/角度）
+        self.thresholds = thresholds if thresholds is not None else ThresholdConfig()
+        # 距离分区参数表（批量评估用），由分段阈值生成，保证与逐个评估一致
+        self._dist_params = _build_dist_params(self.thresholds)
         
-        # 角度阈值（度）
-        self.angle_thresholds = {
-            'direct': 30,      # 直接朝向
-            'oblique': 90,     # 斜向
-            'lateral': 150     # 侧向
-        }
+        # 距离指标缓存（按量化距离）
+        self._distance_cached = lru_cache(maxsize=1024)(self._distance_ifs)
     
-    def evaluate_distance(self, distance: float) -> Dict:
+    def _distance_ifs(self, zone: str, d_bin: int) -> Tuple[float, float]:
         """
-        指标1：目标距离评估
-        
-        论文方法：使用分段函数和高斯隶属度
-        - 距离越近，威胁越高
-        - 考虑不同距离段的威胁特性
+        按量化距离计算指定距离区域内的IFS值（结果由evaluate_distance缓存）
         
         Args:
-            distance: 目标距离（米）
+            zone: 距离区域（由精确距离确定，保证量化不会跨越区域边界）
+            d_bin: 量化后的距离（单位：1/_DISTANCE_BINS_PER_METER 米）
         
         Returns:
-            {
-                'ifs': IFS对象,
-                'threat_score': float,
-                'threat_level': str,
-                'distance': float,
-                'zone': str  # 'critical', 'high', 'medium', 'low'
-            }
+            (mu, nu)
         """
-        # 确定距离区域
-        if distance <= self.distance_thresholds['critical']:
-            zone = 'critical'
+        distance = d_bin / _DISTANCE_BINS_PER_METER
+        cfg = self.thresholds
+        
+        if zone == 'critical':
             # 极近距离：极高威胁
             ifs = self.converter.from_real_number(
                 value=distance,
                 ideal=0,
                 tolerance=5,
                 min_val=0,
-                max_val=self.distance_thresholds['critical']
+                max_val=cfg.d_crit
             )
             # 增强威胁度
             ifs = IFS(mu=min(0.95, ifs.mu + 0.15), nu=max(0.02, ifs.nu - 0.1))
             
-        elif distance <= self.distance_thresholds['high']:
-            zone = 'high'
+        elif zone == 'high':
             # 近距离：高威胁
             ifs = self.converter.from_real_number(
                 value=distance,
-                ideal=self.distance_thresholds['critical'],
+                ideal=cfg.d_crit,
                 tolerance=5,
-                min_val=self.distance_thresholds['critical'],
-                max_val=self.distance_thresholds['high']
+                min_val=cfg.d_crit,
+                max_val=cfg.d_high
             )
             ifs = IFS(mu=min(0.85, ifs.mu + 0.1), nu=max(0.05, ifs.nu - 0.05))
             
-        elif distance <= self.distance_thresholds['medium']:
-            zone = 'medium'
+        elif zone == 'medium':
             # 中距离：中威胁
             ifs = self.converter.from_real_number(
                 value=distance,
-                ideal=self.distance_thresholds['high'],
+                ideal=cfg.d_high,
                 tolerance=7,
-                min_val=self.distance_thresholds['high'],
-                max_val=self.distance_thresholds['medium']
+                min_val=cfg.d_high,
+                max_val=cfg.d_med
             )
             
         else:
-            zone = 'low'
             # 远距离：低威胁
             # 威胁度随距离增加而递减
-            decay_factor = math.exp(-(distance - self.distance_thresholds['medium']) / 15)
+            decay_factor = math.exp(-(distance - cfg.d_med) / 15)
             mu = max(0.1, 0.4 * decay_factor)
             nu = min(0.8, 0.5 + (1 - decay_factor) * 0.3)
             ifs = IFS(mu=mu, nu=nu)
         
+        return ifs.mu, ifs.nu
+    
+    def evaluate_distance(self, distance: float) -> Dict:
+        """
+        指标1：目标距离评估
+        
+        论文方法：使用分段函数和高斯隶属度
+        - 距离越近，威胁越高
+        - 考虑不同距离段的威胁特性
+        - 区域内距离按0.1米量化计算并缓存（LRU）
+        
+        Args:
+            distance: 目标距离（米）
+        
+        Returns:
+            {
+                'ifs': IFS对象,
+                'threat_score': float,
+                'threat_level': str,
+                'distance': float,
+                'zone': str  # 'critical', 'high', 'medium', 'low'
+            }
+        """
+        cfg = self.thresholds
+        
+        # 确定距离区域（使用精确距离）
+        if distance <= cfg.d_crit:
+            zone = 'critical'
+        elif distance <= cfg.d_high:
+            zone = 'high'
+        elif distance <= cfg.d_med:
+            zone = 'medium'
+        else:
+            zone = 'low'
+        
+        # 区域内距离按0.1米量化后查缓存，逐帧评估时相邻帧几乎总是命中
+        mu, nu = self._distance_cached(zone, round(distance * _DISTANCE_BINS_PER_METER))
+        ifs = IFS(mu=mu, nu=nu)
+        
         threat_score = ifs.score()
         
         # 确定威胁等级
@@ -160,34 +289,35 @@ class ThreatIndicators:
             }
         """
         # 获取对应类型的速度阈值
-        thresholds = self.speed_thresholds.get(enemy_type, self.speed_thresholds['soldier'])
+        cfg = self.thresholds
+        speed_high, speed_medium = cfg.speed_by_type.get(enemy_type, cfg.speed_default)
         
         # 分类速度等级
-        if speed >= thresholds['high']:
+        if speed >= speed_high:
             speed_category = 'high_speed'
             # 高速运动：高威胁（可能是冲锋/攻击）
             # 超出阈值越多，威胁越大
-            excess_ratio = min(2.0, speed / thresholds['high'])
+            excess_ratio = min(2.0, speed / speed_high)
             mu = min(0.9, 0.65 + 0.25 * (excess_ratio - 1))
             nu = max(0.05, 0.25 - 0.2 * (excess_ratio - 1))
             ifs = IFS(mu=mu, nu=nu)
             
-        elif speed >= thresholds['medium']:
+        elif speed >= speed_medium:
             speed_category = 'medium_speed'
             # 中速运动：中等威胁（可能是机动）
             ifs = self.converter.from_real_number(
                 value=speed,
-                ideal=thresholds['high'],
-                tolerance=thresholds['medium'],
+                ideal=speed_high,
+                tolerance=speed_medium,
                 min_val=0,
-                max_val=thresholds['high'] * 1.5
+                max_val=speed_high * 1.5
             )
             
         elif speed >= 0.5:
             speed_category = 'low_speed'
             # 低速运动：低威胁（可能是巡逻）
-            mu = 0.3 + 0.2 * (speed / thresholds['medium'])
-            nu = 0.6 - 0.3 * (speed / thresholds['medium'])
+            mu = 0.3 + 0.2 * (speed / speed_medium)
+            nu = 0.6 - 0.3 * (speed / speed_medium)
             ifs = IFS(mu=mu, nu=nu)
             
         else:
@@ -243,7 +373,7 @@ class ThreatIndicators:
         # 计算从敌人到玩家的方位角
         dx = player_pos[0] - enemy_pos[0]
         dz = player_pos[1] - enemy_pos[1]
-        angle_to_player = math.degrees(math.atan2(dz, dx))
+        angle_to_player = math.atan2(dz, dx) * _RAD2DEG
         
         # 标准化到[0, 360)
         if angle_to_player < 0:
@@ -253,28 +383,29 @@ class ThreatIndicators:
         angle_diff = abs((enemy_direction - angle_to_player + 180) % 360 - 180)
         
         # 根据角度差评估威胁
-        if angle_diff <= self.angle_thresholds['direct']:
+        cfg = self.thresholds
+        if angle_diff <= cfg.ang_direct:
             direction_category = 'approaching'  # 正面接近
             # 直接朝向玩家：极高威胁
             # 角度差越小，威胁越大
-            mu = 0.95 - 0.15 * (angle_diff / self.angle_thresholds['direct'])
-            nu = 0.02 + 0.08 * (angle_diff / self.angle_thresholds['direct'])
+            mu = 0.95 - 0.15 * (angle_diff / cfg.ang_direct)
+            nu = 0.02 + 0.08 * (angle_diff / cfg.ang_direct)
             ifs = IFS(mu=mu, nu=nu)
             
-        elif angle_diff <= self.angle_thresholds['oblique']:
+        elif angle_diff <= cfg.ang_oblique:
             direction_category = 'flanking'  # 侧向包抄
             # 斜向接近：高威胁
-            relative_angle = (angle_diff - self.angle_thresholds['direct']) / \
-                           (self.angle_thresholds['oblique'] - self.angle_thresholds['direct'])
+            relative_angle = (angle_diff - cfg.ang_direct) / \
+                           (cfg.ang_oblique - cfg.ang_direct)
             mu = 0.8 - 0.3 * relative_angle
             nu = 0.1 + 0.3 * relative_angle
             ifs = IFS(mu=mu, nu=nu)
             
-        elif angle_diff <= self.angle_thresholds['lateral']:
+        elif angle_diff <= cfg.ang_lateral:
             direction_category = 'lateral'  # 侧向移动
             # 侧向：中等威胁（可能是机动）
-            relative_angle = (angle_diff - self.angle_thresholds['oblique']) / \
-                           (self.angle_thresholds['lateral'] - self.angle_thresholds['oblique'])
+            relative_angle = (angle_diff - cfg.ang_oblique) / \
+                           (cfg.ang_lateral - cfg.ang_oblique)
             mu = 0.5 - 0.2 * relative_angle
             nu = 0.4 + 0.2 * relative_angle
             ifs = IFS(mu=mu, nu=nu)
@@ -282,8 +413,8 @@ class ThreatIndicators:
         else:
             direction_category = 'retreating'  # 撤退
             # 背向玩家：低威胁
-            retreat_factor = (angle_diff - self.angle_thresholds['lateral']) / \
-                           (180 - self.angle_thresholds['lateral'])
+            retreat_factor = (angle_diff - cfg.ang_lateral) / \
+                           (180 - cfg.ang_lateral)
             mu = 0.3 - 0.2 * retreat_factor
             nu = 0.6 + 0.2 * retreat_factor
             ifs = IFS(mu=mu, nu=nu)
@@ -504,6 +635,301 @@ class ThreatIndicators:
             'description': f"{complexity_level}环境，密度{total_density*100:.0f}%"
         }
 
+    def evaluate_distance_batch(self, distance) -> Dict:
+        """
+        指标1（批量版）：目标距离评估
+
+        与evaluate_distance逐元素等价（不做距离量化）
+
+        Args:
+            distance: 目标距离数组（米）
+
+        Returns:
+            {
+                'mu': ndarray,
+                'nu': ndarray,
+                'pi': ndarray,
+                'threat_score': ndarray,
+                'threat_level': ndarray[str],
+                'zone': ndarray[str]
+            }
+        """
+        cfg = self.thresholds
+        distance = np.asarray(distance, dtype=_BATCH_DTYPE)
+
+        # 距离分区下标：<=critical → 0，<=high → 1，<=medium → 2，其余 → 3
+        bounds = np.array([cfg.d_crit, cfg.d_high, cfg.d_med], dtype=_BATCH_DTYPE)
+        idx = np.searchsorted(bounds, distance, side='left')
+        p = self._dist_params[idx]
+
+        # 前三个区域：高斯隶属度 + 区域增强
+        mu, nu = self.converter.from_real_number_arrays(
+            distance, p[..., 0], p[..., 1], p[..., 2], p[..., 3]
+        )
+        mu, nu, _ = normalize_ifs_arrays(np.minimum(p[..., 5], mu + p[..., 4]),
+                                         np.maximum(p[..., 7], nu - p[..., 6]))
+
+        # 远距离：威胁度随距离指数衰减
+        decay_factor = np.exp(-(distance - cfg.d_med) / 15)
+        is_low = idx == 3
+        mu = np.where(is_low, np.maximum(0.1, 0.4 * decay_factor), mu)
+        nu = np.where(is_low, np.minimum(0.8, 0.5 + (1 - decay_factor) * 0.3), nu)
+
+        mu, nu, pi = normalize_ifs_arrays(mu.astype(_BATCH_DTYPE), nu.astype(_BATCH_DTYPE))
+        threat_score = mu - nu
+
+        return {
+            'mu': mu,
+            'nu': nu,
+            'pi': pi,
+            'threat_score': threat_score,
+            'threat_level': np.select([threat_score >= 0.7, threat_score >= 0.4, threat_score >= 0.0],
+                                      ['critical', 'high', 'medium'], default='low'),
+            'zone': _DIST_ZONES[idx]
+        }
+
+    def evaluate_speed_batch(self, speed, enemy_type) -> Dict:
+        """
+        指标2（批量版）：目标速度评估
+
+        与evaluate_speed逐元素等价
+
+        Args:
+            speed: 移动速度数组（m/s）
+            enemy_type: 敌人类型（标量字符串或字符串数组）
+
+        Returns:
+            {
+                'mu': ndarray,
+                'nu': ndarray,
+                'pi': ndarray,
+                'threat_score': ndarray,
+                'threat_level': ndarray[str],
+                'speed_category': ndarray[str]
+            }
+        """
+        cfg = self.thresholds
+        speed = np.asarray(speed, dtype=_BATCH_DTYPE)
+        types = np.broadcast_to(np.asarray(enemy_type), speed.shape)
+
+        # 按类型取速度阈值
+        speed_high = np.full(speed.shape, cfg.speed_default[0], dtype=_BATCH_DTYPE)
+        speed_medium = np.full(speed.shape, cfg.speed_default[1], dtype=_BATCH_DTYPE)
+        for type_name, (high, medium) in cfg.speed_by_type.items():
+            mask = types == type_name
+            speed_high[mask] = high
+            speed_medium[mask] = medium
+
+        is_high = speed >= speed_high
+        is_medium = speed >= speed_medium
+        is_low = speed >= 0.5
+
+        # 高速：超出阈值越多，威胁越大
+        excess_ratio = np.minimum(2.0, speed / speed_high)
+        mu_high = np.minimum(0.9, 0.65 + 0.25 * (excess_ratio - 1))
+        nu_high = np.maximum(0.05, 0.25 - 0.2 * (excess_ratio - 1))
+
+        # 中速：高斯隶属度
+        mu_medium, nu_medium = self.converter.from_real_number_arrays(
+            speed, speed_high, speed_medium, 0.0, speed_high * 1.5
+        )
+
+        # 低速
+        mu_low = 0.3 + 0.2 * (speed / speed_medium)
+        nu_low = 0.6 - 0.3 * (speed / speed_medium)
+
+        conditions = [is_high, is_medium, is_low]
+        mu = np.select(conditions, [mu_high, mu_medium, mu_low], default=0.25)
+        nu = np.select(conditions, [nu_high, nu_medium, nu_low], default=0.50)
+        category = _SPEED_CATEGORIES[np.select(conditions, [0, 1, 2], default=3)]
+
+        mu, nu, pi = normalize_ifs_arrays(mu.astype(_BATCH_DTYPE), nu.astype(_BATCH_DTYPE))
+        threat_score = mu - nu
+
+        return {
+            'mu': mu,
+            'nu': nu,
+            'pi': pi,
+            'threat_score': threat_score,
+            'threat_level': np.select([threat_score >= 0.5, threat_score >= 0.1],
+                                      ['high', 'medium'], default='low'),
+            'speed_category': category
+        }
+
+    def evaluate_attack_angle_batch(self, enemy_direction, enemy_x, enemy_z,
+                                    player_pos: Tuple[float, float] = (0, 0)) -> Dict:
+        """
+        指标3（批量版）：攻击角度评估
+
+        与evaluate_attack_angle逐元素等价
+
+        Args:
+            enemy_direction: 敌人移动方向数组（度，0-360）
+            enemy_x: 敌人X坐标数组
+            enemy_z: 敌人Z坐标数组
+            player_pos: 玩家位置 (x, z)，默认(0, 0)
+
+        Returns:
+            {
+                'mu': ndarray,
+                'nu': ndarray,
+                'pi': ndarray,
+                'threat_score': ndarray,
+                'threat_level': ndarray[str],
+                'angle_to_player': ndarray,
+                'angle_diff': ndarray,
+                'direction_category': ndarray[str]
+            }
+        """
+        cfg = self.thresholds
+        enemy_direction = np.asarray(enemy_direction, dtype=_BATCH_DTYPE)
+        dx = player_pos[0] - np.asarray(enemy_x, dtype=_BATCH_DTYPE)
+        dz = player_pos[1] - np.asarray(enemy_z, dtype=_BATCH_DTYPE)
+
+        # 从敌人到玩家的方位角，标准化到[0, 360)
+        angle_to_player = np.arctan2(dz, dx) * _BATCH_DTYPE(_RAD2DEG)
+        angle_to_player = np.where(angle_to_player < 0, angle_to_player + 360, angle_to_player)
+        angle_diff = np.abs(np.mod(enemy_direction - angle_to_player + 180, 360) - 180)
+
+        # 角度分类下标：<=direct → 0，<=oblique → 1，<=lateral → 2，其余 → 3
+        bounds = np.array([cfg.ang_direct, cfg.ang_oblique, cfg.ang_lateral], dtype=_BATCH_DTYPE)
+        idx = np.searchsorted(bounds, angle_diff, side='left')
+
+        direct_ratio = angle_diff / cfg.ang_direct
+        flank_ratio = (angle_diff - cfg.ang_direct) / (cfg.ang_oblique - cfg.ang_direct)
+        lateral_ratio = (angle_diff - cfg.ang_oblique) / (cfg.ang_lateral - cfg.ang_oblique)
+        retreat_ratio = (angle_diff - cfg.ang_lateral) / (180 - cfg.ang_lateral)
+
+        mu = np.choose(idx, [0.95 - 0.15 * direct_ratio, 0.8 - 0.3 * flank_ratio,
+                             0.5 - 0.2 * lateral_ratio, 0.3 - 0.2 * retreat_ratio])
+        nu = np.choose(idx, [0.02 + 0.08 * direct_ratio, 0.1 + 0.3 * flank_ratio,
+                             0.4 + 0.2 * lateral_ratio, 0.6 + 0.2 * retreat_ratio])
+
+        mu, nu, pi = normalize_ifs_arrays(mu.astype(_BATCH_DTYPE), nu.astype(_BATCH_DTYPE))
+        threat_score = mu - nu
+
+        return {
+            'mu': mu,
+            'nu': nu,
+            'pi': pi,
+            'threat_score': threat_score,
+            'threat_level': np.select([threat_score >= 0.6, threat_score >= 0.2],
+                                      ['high', 'medium'], default='low'),
+            'angle_to_player': angle_to_player,
+            'angle_diff': angle_diff,
+            'direction_category': _ANGLE_CATEGORIES[idx]
+        }
+
+    def evaluate_visibility_batch(self, is_blocked,
+                                  blocking_count=0,
+                                  visibility_ratio=None) -> Dict:
+        """
+        指标5（批量版）：通视条件评估
+
+        与evaluate_visibility逐元素等价，用于网格扫描/热力图等大批量场景
+
+        Args:
+            is_blocked: 是否被遮挡（布尔数组）
+            blocking_count: 遮挡物数量（标量或数组）
+            visibility_ratio: 可见度比例数组，NaN或None表示按遮挡状态估算
+
+        Returns:
+            {
+                'mu': ndarray,
+                'nu': ndarray,
+                'pi': ndarray,
+                'threat_score': ndarray,
+                'threat_level': ndarray[str],
+                'visibility_ratio': ndarray
+            }
+        """
+        is_blocked = np.asarray(is_blocked, dtype=bool)
+        if visibility_ratio is None:
+            ratio = np.full(is_blocked.shape, np.nan, dtype=_BATCH_DTYPE)
+        else:
+            ratio = np.asarray(visibility_ratio, dtype=_BATCH_DTYPE)
+        blocking_count = np.asarray(blocking_count, dtype=_BATCH_DTYPE)
+
+        # 缺省可见度：遮挡为0，无遮挡为1
+        vis = np.where(np.isnan(ratio), np.where(is_blocked, 0.0, 1.0), ratio).astype(_BATCH_DTYPE)
+
+        clear = ~is_blocked | (vis > 0.7)
+        partial = vis > 0.3
+        uncertainty_factor = np.minimum(0.3, 0.1 + blocking_count * 0.05)
+
+        mu = np.select([clear, partial],
+                       [0.85 - 0.1 * (1 - vis), 0.45 + 0.25 * vis],
+                       default=0.30 - uncertainty_factor).astype(_BATCH_DTYPE)
+        nu = np.select([clear, partial],
+                       [0.10 + 0.1 * (1 - vis), 0.35 - 0.15 * vis],
+                       default=_BATCH_DTYPE(0.50)).astype(_BATCH_DTYPE)
+        level = np.select([clear, partial], ['high', 'medium'], default='low')
+
+        mu, nu, pi = normalize_ifs_arrays(mu, nu)
+
+        return {
+            'mu': mu,
+            'nu': nu,
+            'pi': pi,
+            'threat_score': mu - nu,
+            'threat_level': level,
+            'visibility_ratio': vis
+        }
+
+    def evaluate_environment_batch(self, obstacle_density,
+                                   building_density=0.0,
+                                   complexity_level=None) -> Dict:
+        """
+        指标6（批量版）：作战环境评估
+
+        与evaluate_environment逐元素等价
+
+        Args:
+            obstacle_density: 障碍物密度数组 [0, 1]
+            building_density: 建筑物密度（标量或数组）[0, 1]
+            complexity_level: 复杂度等级（标量字符串或字符串数组），None表示自动判断
+
+        Returns:
+            {
+                'mu': ndarray,
+                'nu': ndarray,
+                'pi': ndarray,
+                'threat_score': ndarray,
+                'threat_level': ndarray[str],
+                'total_density': ndarray,
+                'complexity_level': ndarray[str]
+            }
+        """
+        obstacle_density = np.asarray(obstacle_density, dtype=_BATCH_DTYPE)
+        building_density = np.asarray(building_density, dtype=_BATCH_DTYPE)
+        total_density = (obstacle_density + building_density) / 2.0
+
+        # 自动判断复杂度等级：searchsorted直接得到分级下标（0/1/2）
+        if complexity_level is None:
+            idx = np.searchsorted(_ENV_BOUNDS, total_density, side='right')
+            level = _ENV_LEVELS[idx]
+        else:
+            level = np.broadcast_to(np.asarray(complexity_level), total_density.shape)
+            idx = np.where(level == 'open', 0, np.where(level == 'moderate', 1, 2))
+
+        coeffs = _ENV_COEFFS[idx]
+        offset_density = total_density - coeffs[..., 4]
+        mu = coeffs[..., 0] + coeffs[..., 1] * offset_density
+        nu = coeffs[..., 2] + coeffs[..., 3] * offset_density
+        threat_level = _ENV_THREAT_LEVELS[idx]
+
+        mu, nu, pi = normalize_ifs_arrays(mu, nu)
+
+        return {
+            'mu': mu,
+            'nu': nu,
+            'pi': pi,
+            'threat_score': mu - nu,
+            'threat_level': threat_level,
+            'total_density': total_density,
+            'complexity_level': level
+        }
+
 
 if __name__ == "__main__":
     # 测试代码
@@ -6,47 +6,284 @@
 2. 威胁指标雷达图
 3. 目标对比分析图
 4. 威胁排名柱状图
+
+说明：本模块只输出图片文件，matplotlib在首次创建ThreatVisualizer时才导入；
+绘图直接使用Figure + FigureCanvasAgg，不经过pyplot的全局figure管理，也不改变全局后端
 """
 
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.patches import Circle, Rectangle, Wedge, FancyBboxPatch
 import numpy as np
 from typing import Dict, List, Tuple, Optional
-import os
+from pathlib import Path
+
+# matplotlib相关对象，由_mpl()延迟导入后填充
+matplotlib = None
+Figure = None
+FigureCanvasAgg = None
+Line2D = None
+Patch = None
+Circle = None
+PolyCollection = None
+LineCollection = None
+PatchCollection = None
+to_rgba = None
+
+try:
+    import pyvips  # 可选：批量出图时用libvips编码PNG
+except ImportError:
+    pyvips = None
+
+try:
+    from numba import njit  # 可选：JIT编译数值内核
+except ImportError:
+    def njit(*args, **kwargs):
+        """numba不可用时的空装饰器，直接返回原函数"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+def _mpl():
+    """
+    延迟导入matplotlib（只导入不绘图的调用方不必承担其导入开销）
+    
+    Returns:
+        matplotlib模块
+    """
+    global matplotlib, Figure, FigureCanvasAgg, Line2D, Patch
+    global Circle, PolyCollection, LineCollection, PatchCollection, to_rgba
+    if matplotlib is None:
+        import matplotlib as _matplotlib
+        from matplotlib.figure import Figure as _Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg as _FigureCanvasAgg
+        from matplotlib.lines import Line2D as _Line2D
+        from matplotlib.patches import Circle as _Circle, Patch as _Patch
+        from matplotlib.collections import (PolyCollection as _PolyCollection, LineCollection as _LineCollection,
+                                            PatchCollection as _PatchCollection)
+        from matplotlib.colors import to_rgba as _to_rgba
+        Figure, FigureCanvasAgg = _Figure, _FigureCanvasAgg
+        Line2D, Patch, Circle = _Line2D, _Patch, _Circle
+        PolyCollection, LineCollection = _PolyCollection, _LineCollection
+        PatchCollection = _PatchCollection
+        to_rgba = _to_rgba
+        matplotlib = _matplotlib
+    return matplotlib
+
+
+# 六项威胁指标的固定顺序（对应得分矩阵的列）
+_INDICATOR_ORDER = ('distance', 'type', 'speed', 'angle', 'visibility', 'environment')
+
+
+@njit(cache=True)
+def _normalize_scores(flat_scores: np.ndarray) -> np.ndarray:
+    """将威胁得分从[-1, 1]映射到[0, 1]（一维数组）"""
+    out = np.empty_like(flat_scores)
+    for i in range(flat_scores.shape[0]):
+        out[i] = (flat_scores[i] + 1) * 0.5
+    return out
 
 
 class ThreatVisualizer:
     """威胁可视化工具类"""
     
-    def __init__(self, output_dir: str = "examples"):
+    def __init__(self, output_dir: str = "examples", reuse_figure: bool = False,
+                 dpi: int = 150, use_libvips: bool = False):
         """
         初始化可视化工具
         
         Args:
             output_dir: 输出目录
+            reuse_figure: 是否按图表类型缓存并复用figure/axes（适合逐帧重复绘制），
+                开启后退出前需调用close_cached()释放
+            dpi: 输出图像分辨率
+            use_libvips: 是否用libvips编码PNG（需安装pyvips，未安装时回退到savefig）
         """
-        self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
         
-        # 设置中文字体（尝试多个选项）
-        plt.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
-        plt.rcParams['axes.unicode_minus'] = False
+        # 创建实例即意味着要绘图，此时才导入matplotlib
+        _mpl()
+        
+        # 保存参数：布局已由tight_layout固定，不再做bbox_inches='tight'的额外渲染；
+        # PNG使用最低压缩等级，以少量体积换取编码速度
+        self.save_kwargs = dict(dpi=dpi, bbox_inches=None, format='png', pil_kwargs={'compress_level': 1})
+        self.use_libvips = use_libvips and pyvips is not None
+        
+        # figure缓存：{图表类型: (fig, ax)}
+        self.reuse_figure = reuse_figure
+        self._fig_cache: Dict[str, Tuple] = {}
         
-        # 威胁等级颜色映射
-        self.threat_colors = {
+        # 对比图的柱子/标签对象，供blit模式原地更新：{'labels', 'bars', 'texts'}
+        self._comparison_artists: Optional[Dict] = None
+        
+        # 设置中文字体（尝试多个选项）
+        matplotlib.rcParams['font.sans-serif'] = ['Arial Unicode MS', 'SimHei', 'DejaVu Sans']
+        matplotlib.rcParams['axes.unicode_minus'] = False
+        
+        # 无界面批量出图：关闭自动布局（保存前统一tight_layout），开启路径简化
+        matplotlib.rcParams.update({
+            'path.simplify': True,
+            'path.simplify_threshold': 1.0,
+            'agg.path.chunksize': 10000,
+            'figure.autolayout': False
+        })
+        
+        # 威胁等级颜色映射（预先转换为RGBA元组，绘制时不再解析颜色字符串）
+        self.threat_colors = {level: to_rgba(color) for level, color in {
             'critical': '#FF0000',  # 红色
             'high': '#FF6600',      # 橙红色
             'medium': '#FFAA00',    # 橙黄色
             'low': '#00AA00'        # 绿色
+        }.items()}
+        
+        # 指标贡献饼图配色与缺失指标的灰色
+        self._palette = [to_rgba(c) for c in ('#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#F7DC6F')]
+        self._missing_color = np.array(to_rgba('#CCCCCC'), dtype=np.float32)
+        
+        # 批量着色用的颜色表：按等级索引取RGBA行，末行为未知等级的缺省色
+        self._level_index = {'critical': 0, 'high': 1, 'medium': 2, 'low': 3}
+        self._unknown_level = len(self._level_index)
+        self._color_table = np.array(
+            [self.threat_colors[level] for level in self._level_index] + [to_rgba('#AAAAAA')],
+            dtype=np.float32)
+        # 描边颜色表：critical/high用深红，其余用黑色
+        self._edge_table = np.array(
+            [to_rgba(c) for c in ('darkred', 'darkred', 'black', 'black', 'black')],
+            dtype=np.float32)
+    
+    def _level_indices(self, levels: List[str]) -> np.ndarray:
+        """将威胁等级列表映射为颜色表索引数组"""
+        return np.fromiter((self._level_index.get(level, self._unknown_level) for level in levels),
+                           dtype=np.int8, count=len(levels))
+    
+    def _flatten(self, results: List[Dict]) -> Dict[str, np.ndarray]:
+        """
+        将评估结果列表展开为按字段存放的数组，供各绘图方法直接做数组运算
+        
+        每次调用都重新展开（O(N)），调用方原地更新结果后再次绘图也能得到最新数据
+        
+        Args:
+            results: 威胁评估结果列表
+        
+        Returns:
+            字典：ids(敌人ID), score(综合威胁得分), level(颜色表索引),
+            type(敌人类型), distance(距离), ind_scores(N×6原始指标得分，缺失为NaN)
+        """
+        num = len(results)
+        ind_scores = np.full((num, len(_INDICATOR_ORDER)), np.nan, dtype=np.float32)
+        for i, result in enumerate(results):
+            details = result['indicator_details']
+            for j, indicator_name in enumerate(_INDICATOR_ORDER):
+                if indicator_name in details:
+                    ind_scores[i, j] = details[indicator_name]['threat_score']
+        
+        return {
+            'ids': np.array([r['enemy_id'] for r in results]),
+            'score': np.fromiter((r['comprehensive_threat_score'] for r in results),
+                                 dtype=float, count=num),
+            'level': self._level_indices([r['threat_level'] for r in results]),
+            'type': np.array([r['indicator_details']['type']['type'] for r in results], dtype=object),
+            'distance': np.fromiter((r['distance'] for r in results), dtype=np.float32, count=num),
+            'ind_scores': ind_scores
         }
     
+    def _get_figure(self, kind: str, figsize: Tuple[float, float], dpi: Optional[float] = None,
+                    **subplots_kwargs):
+        """
+        获取绘图用的figure/axes
+        
+        直接创建Figure并绑定Agg画布，不注册到pyplot；
+        reuse_figure模式下按图表类型缓存，再次绘制时只清空axes，
+        避免每帧重复创建figure和初始化坐标轴样式
+        
+        Args:
+            kind: 图表类型（缓存键）
+            figsize: 图像尺寸（英寸）
+            dpi: 图像分辨率，None时使用默认值
+            **subplots_kwargs: 传给Figure.subplots的参数（nrows, ncols, subplot_kw等）
+        
+        Returns:
+            (fig, ax)
+        """
+        if self.reuse_figure and kind in self._fig_cache:
+            fig, ax = self._fig_cache[kind]
+            for sub_ax in np.atleast_1d(ax).flat:
+                sub_ax.cla()
+            return fig, ax
+        
+        fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(fig)
+        ax = fig.subplots(**subplots_kwargs)
+        if self.reuse_figure:
+            self._fig_cache[kind] = (fig, ax)
+        return fig, ax
+    
+    def _save_figure(self, fig, output_file: str, fmt: str = 'png', tight: bool = True) -> str:
+        """
+        保存图像
+        
+        Args:
+            fig: 要保存的figure
+            output_file: 输出文件名
+            fmt: 输出格式，非png时按格式替换文件扩展名
+            tight: 保存前是否重新tight_layout（原地更新的图表沿用已有布局）
+        
+        Returns:
+            保存的文件路径
+        """
+        output_path = self.output_dir / output_file
+        if fmt != 'png':
+            output_path = output_path.with_suffix('.' + fmt)
+        if tight:
+            fig.tight_layout()
+        if fmt in ('svg', 'pdf'):
+            # 矢量输出：savefig按format切换到对应后端的画布，不经过Agg光栅化，也不需要dpi
+            fig.savefig(output_path, format=fmt, bbox_inches=None)
+        elif output_path.suffix.lower() != '.png':
+            # 其他格式交给matplotlib按扩展名推断
+            fig.savefig(output_path, dpi=self.save_kwargs['dpi'], bbox_inches=None)
+        elif self.use_libvips:
+            self._save_png_libvips(fig, output_path)
+        else:
+            fig.savefig(output_path, **self.save_kwargs)
+        if self.reuse_figure:
+            fig.canvas.draw_idle()
+        
+        return str(output_path)
+    
+    def _save_png_libvips(self, fig, output_path: Path):
+        """
+        用libvips编码PNG：Agg渲染出RGBA缓冲区后直接交给libvips压缩写盘
+        
+        Args:
+            fig: 要保存的figure
+            output_path: 输出路径
+        """
+        original_dpi = fig.dpi
+        fig.set_dpi(self.save_kwargs['dpi'])
+        try:
+            fig.canvas.draw()
+            rgba = np.asarray(fig.canvas.buffer_rgba())
+            height, width = rgba.shape[:2]
+            image = pyvips.Image.new_from_memory(np.ascontiguousarray(rgba).data,
+                                                 width, height, 4, 'uchar')
+            with open(output_path, 'wb') as f:
+                f.write(image.pngsave_buffer(compression=1, effort=1))
+        finally:
+            fig.set_dpi(original_dpi)
+    
+    def close_cached(self):
+        """释放reuse_figure模式下缓存的所有figure"""
+        self._fig_cache.clear()
+        self._comparison_artists = None
+    
     def plot_threat_heatmap(self,
                            evaluation_results: List[Dict],
                            terrain_data: Dict = None,
                            player_pos: Tuple[float, float] = (0, 0),
                            output_file: str = "threat_heatmap.png",
-                           show_details: bool = True) -> str:
+                           show_details: bool = True,
+                           positions: Optional[np.ndarray] = None,
+                           fmt: str = 'png') -> str:
         """
         绘制威胁度热力图
         
@@ -56,11 +293,14 @@ class ThreatVisualizer:
             player_pos: 玩家位置
             output_file: 输出文件名
             show_details: 是否显示详细标注
+            positions: 各敌人(x, z)坐标，形状(N, 2)，顺序与evaluation_results一致；
+                为None时按距离随机生成方位（仅演示用）
+            fmt: 输出格式（'png'/'svg'/'pdf'），非png时自动替换文件扩展名
         
         Returns:
             保存的文件路径
         """
-        fig, ax = plt.subplots(figsize=(16, 16), dpi=100)
+        fig, ax = self._get_figure('heatmap', figsize=(16, 16), dpi=100)
         
         # 设置坐标范围
         coord_range = 50
@@ -77,10 +317,11 @@ class ThreatVisualizer:
             self._draw_terrain(ax, terrain_data)
         
         # 2. 绘制同心圆（10m, 20m）
-        for radius in [10, 20]:
-            circle = Circle(player_pos, radius, fill=False, 
-                          edgecolor='blue', linestyle='--', linewidth=1.5, alpha=0.5)
-            ax.add_patch(circle)
+        ring_radii = (10, 20)
+        ax.add_collection(PatchCollection([Circle(player_pos, radius) for radius in ring_radii],
+                                          facecolors='none', edgecolors='blue', linestyles='--',
+                                          linewidths=1.5, alpha=0.5))
+        for radius in ring_radii:
             ax.text(player_pos[0] + radius, player_pos[1], f'{radius}m', 
                    fontsize=9, color='blue', alpha=0.7)
         
@@ -91,135 +332,189 @@ class ThreatVisualizer:
                fontsize=11, ha='center', fontweight='bold', color='blue')
         
         # 4. 绘制敌人及威胁度
-        for result in evaluation_results:
-            enemy_id = result['enemy_id']
-            distance = result['distance']
-            threat_score = result['comprehensive_threat_score']
-            threat_level = result['threat_level']
-            
-            # 从indicator_details获取位置和类型
-            enemy_type = result['indicator_details']['type']['type']
-            
-            # 计算敌人位置（从距离和角度反推，或者从原始数据获取）
-            # 这里简化处理：从evaluation_results中我们需要保存原始位置
-            # 实际使用时，应该在evaluate时保存x, z坐标
-            # 这里假设我们能从distance和其他信息推断位置
-            # 为了演示，我们使用一个占位符方法
-            
-            # 获取颜色（基于威胁等级）
-            color = self.threat_colors.get(threat_level, '#AAAAAA')
-            
-            # 威胁度映射到大小（6-30像素）
-            marker_size = 10 + int(20 * (threat_score + 1) / 2)  # score范围[-1, 1]
-            
-            # 根据类型选择标记
-            if enemy_type == 'ifv':
-                marker = 's'  # 方形
-                marker_size = marker_size * 1.5
-            else:
-                marker = 'o'  # 圆形
-            
-            # 由于我们没有直接的x, z坐标，这里用一个变通方法
-            # 实际使用时，应该在调用时传入完整的敌人信息
-            # 暂时用随机位置演示（仅用于结构展示）
-            angle = np.random.uniform(0, 2*np.pi)
-            ex = player_pos[0] + distance * np.cos(angle)
-            ez = player_pos[1] + distance * np.sin(angle)
-            
-            # 绘制敌人
-            ax.plot(ex, ez, marker, color=color, markersize=marker_size,
-                   markeredgecolor='darkred' if threat_level in ['critical', 'high'] else 'black',
-                   markeredgewidth=2, alpha=0.8)
-            
-            # 显示详细信息
-            if show_details:
+        # 先组装各敌人的坐标/大小/颜色数组（float32），再按类型分两次scatter绘制
+        flat = self._flatten(evaluation_results)
+        num_enemies = len(evaluation_results)
+        scores = flat['score']
+        level_idx = flat['level']
+        is_ifv = flat['type'] == 'ifv'
+        
+        # 颜色基于威胁等级查表
+        facecolors = self._color_table[level_idx]
+        edgecolors = self._edge_table[level_idx]
+        
+        # 威胁度映射到大小（10-30像素，score范围[-1, 1]），IFV方形标记放大1.5倍
+        sizes = (10 + (20 * (scores + 1) * 0.5).astype(np.int32)).astype(np.float32)
+        sizes = np.where(is_ifv, sizes * 1.5, sizes)
+        
+        if positions is not None:
+            positions = np.asarray(positions, dtype=np.float32).reshape(num_enemies, 2)
+        else:
+            # 评估结果中没有x, z坐标时，用距离+随机方位角演示（仅用于结构展示）
+            # 实际使用时，应该通过positions传入敌人真实坐标
+            angles = np.random.uniform(0, 2*np.pi, size=num_enemies).astype(np.float32)
+            dists = flat['distance']
+            positions = np.column_stack((player_pos[0] + dists * np.cos(angles),
+                                         player_pos[1] + dists * np.sin(angles)))
+        xs, zs = positions[:, 0], positions[:, 1]
+        
+        # scatter的s参数为面积（points²），对应plot的markersize平方
+        for mask, marker in ((is_ifv, 's'), (~is_ifv, 'o')):
+            if mask.any():
+                ax.scatter(xs[mask], zs[mask], s=sizes[mask] ** 2, marker=marker,
+                           c=facecolors[mask], edgecolors=edgecolors[mask],
+                           linewidths=2, alpha=0.8, zorder=3)
+        
+        # 显示详细信息（文字没有集合版本，逐个添加）
+        if show_details:
+            for enemy_id, score, ex, ez, color in zip(flat['ids'], scores, xs, zs, facecolors):
                 # 敌人编号
                 ax.text(ex, ez, str(enemy_id), fontsize=8, ha='center', va='center',
                        color='white', fontweight='bold')
                 
                 # 威胁得分标注
-                score_text = f"{threat_score:.2f}"
+                score_text = f"{score:.2f}"
                 ax.text(ex, ez - 2, score_text, fontsize=7, ha='center',
                        bbox=dict(boxstyle="round,pad=0.3", facecolor=color, alpha=0.7, edgecolor='none'))
         
         # 5. 添加图例
         legend_elements = [
-            plt.Line2D([0], [0], marker='*', color='w', markerfacecolor='blue', 
+            Line2D([0], [0], marker='*', color='w', markerfacecolor='blue', 
                       markersize=15, label='Player'),
-            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor=self.threat_colors['critical'],
+            Line2D([0], [0], marker='o', color='w', markerfacecolor=self.threat_colors['critical'],
                       markersize=10, label='Critical Threat'),
-            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor=self.threat_colors['high'],
+            Line2D([0], [0], marker='o', color='w', markerfacecolor=self.threat_colors['high'],
                       markersize=10, label='High Threat'),
-            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor=self.threat_colors['medium'],
+            Line2D([0], [0], marker='o', color='w', markerfacecolor=self.threat_colors['medium'],
                       markersize=10, label='Medium Threat'),
-            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor=self.threat_colors['low'],
+            Line2D([0], [0], marker='o', color='w', markerfacecolor=self.threat_colors['low'],
                       markersize=10, label='Low Threat'),
         ]
         ax.legend(handles=legend_elements, loc='upper right', fontsize=10, framealpha=0.9)
         
         # 保存图像
-        output_path = os.path.join(self.output_dir, output_file)
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=150, bbox_inches='tight')
-        plt.close()
+        return self._save_figure(fig, output_file, fmt=fmt)
+    
+    @staticmethod
+    def _rect_verts(items: List[Dict]) -> np.ndarray:
+        """由中心点和宽深计算矩形四角顶点，返回形状为(N, 4, 2)的float32数组"""
+        centers = np.array([[item['x'], item['z']] for item in items], dtype=np.float32)
+        half = np.array([[item['width'], item['depth']] for item in items], dtype=np.float32) / 2
+        corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float32)
+        return centers[:, None, :] + corners[None, :, :] * half[:, None, :]
+    
+    @staticmethod
+    def _label_bars(ax, bars, labels: List[str], padding: float = 2, **text_kwargs):
+        """
+        在柱子末端添加数值标签
+        
+        matplotlib>=3.4时用ax.bar_label一次性创建，旧版本逐个ax.annotate
+        
+        Args:
+            ax: 坐标轴
+            bars: bar/barh返回的BarContainer
+            labels: 各柱子的标签文本
+            padding: 标签与柱子末端的距离（points）
+            **text_kwargs: 文本样式参数
+        
+        Returns:
+            创建的标签对象列表（与bars一一对应）
+        """
+        if hasattr(ax, 'bar_label'):
+            return ax.bar_label(bars, labels=labels, padding=padding, **text_kwargs)
+        
+        texts = []
+        horizontal = getattr(bars, 'orientation', 'vertical') == 'horizontal'
+        for bar, label in zip(bars, labels):
+            if horizontal:
+                xy = (bar.get_x() + bar.get_width(), bar.get_y() + bar.get_height() / 2)
+                texts.append(ax.annotate(label, xy, xytext=(padding, 0), textcoords='offset points',
+                                         ha='left', va='center', **text_kwargs))
+            else:
+                xy = (bar.get_x() + bar.get_width() / 2, bar.get_y() + bar.get_height())
+                texts.append(ax.annotate(label, xy, xytext=(0, padding), textcoords='offset points',
+                                         ha='center', va='bottom', **text_kwargs))
+        return texts
+    
+    def _prepare_terrain(self, terrain_data: Dict) -> Dict:
+        """
+        提取地形绘制所需的几何数组（顶点、颜色、线段等）
+        
+        每次调用都重新提取（O(N)），调用方原地修改地形数据后再次绘制也能得到最新几何
+        
+        Args:
+            terrain_data: 地形数据
+        
+        Returns:
+            各地形图层的几何数据，缺失或为空的图层不出现在结果中
+        """
+        layers = {}
+        
+        buildings = terrain_data.get('buildings')
+        if buildings:
+            layers['buildings'] = {
+                'verts': self._rect_verts(buildings),
+                'labels': [(b['x'], b['z'], f"B{b.get('id', '?')}") for b in buildings]
+            }
+        
+        obstacles = terrain_data.get('obstacles')
+        if obstacles:
+            obstacle_colors = {'Cover': 'brown', 'Barrier': 'black'}
+            layers['obstacles'] = {
+                'verts': self._rect_verts(obstacles),
+                'colors': [obstacle_colors.get(obstacle.get('type', 'unknown'), 'darkblue')
+                           for obstacle in obstacles]
+            }
+        
+        alleys = terrain_data.get('alleys')
+        if alleys:
+            layers['alleys'] = {
+                'segments': np.array([[[alley['start_x'], alley['start_z']],
+                                       [alley['end_x'], alley['end_z']]] for alley in alleys], dtype=np.float32),
+                'widths': np.array([alley['width'] for alley in alleys], dtype=np.float32) * 2
+            }
         
-        return output_path
+        return layers
     
     def _draw_terrain(self, ax, terrain_data: Dict):
-        """绘制地形元素（建筑物、障碍物等）"""
+        """绘制地形元素（建筑物、障碍物等），每类地形合并为一个集合对象绘制"""
+        layers = self._prepare_terrain(terrain_data)
+        
         # 绘制建筑物
-        if 'buildings' in terrain_data:
-            for building in terrain_data['buildings']:
-                bx, bz = building['x'], building['z']
-                bw, bd = building['width'], building['depth']
-                
-                rect = Rectangle((bx - bw/2, bz - bd/2), bw, bd,
-                               facecolor='gray', edgecolor='darkgray',
-                               alpha=0.3, linewidth=1.5)
-                ax.add_patch(rect)
-                
-                # 建筑物标签
-                ax.text(bx, bz, f"B{building.get('id', '?')}", 
-                       fontsize=8, ha='center', va='center', color='gray', alpha=0.7)
-        
-        # 绘制障碍物
-        if 'obstacles' in terrain_data:
-            for obstacle in terrain_data['obstacles']:
-                ox, oz = obstacle['x'], obstacle['z']
-                ow, od = obstacle['width'], obstacle['depth']
-                
-                obstacle_type = obstacle.get('type', 'unknown')
-                if obstacle_type == 'Cover':
-                    color = 'brown'
-                elif obstacle_type == 'Barrier':
-                    color = 'black'
-                else:
-                    color = 'darkblue'
-                
-                rect = Rectangle((ox - ow/2, oz - od/2), ow, od,
-                               facecolor=color, edgecolor=color,
-                               alpha=0.4, linewidth=1)
-                ax.add_patch(rect)
-        
-        # 绘制巷道
-        if 'alleys' in terrain_data:
-            for alley in terrain_data['alleys']:
-                x1, z1 = alley['start_x'], alley['start_z']
-                x2, z2 = alley['end_x'], alley['end_z']
-                width = alley['width']
-                
-                ax.plot([x1, x2], [z1, z2], color='lightgray', 
-                       linewidth=width*2, alpha=0.3, solid_capstyle='round')
+        buildings = layers.get('buildings')
+        if buildings:
+            ax.add_collection(PolyCollection(buildings['verts'],
+                                             facecolors='gray', edgecolors='darkgray',
+                                             alpha=0.3, linewidths=1.5))
+            
+            # 建筑物标签
+            for bx, bz, label in buildings['labels']:
+                ax.text(bx, bz, label, fontsize=8, ha='center', va='center', color='gray', alpha=0.7)
+        
+        # 绘制障碍物（按类型着色）
+        obstacles = layers.get('obstacles')
+        if obstacles:
+            ax.add_collection(PolyCollection(obstacles['verts'],
+                                             facecolors=obstacles['colors'], edgecolors=obstacles['colors'],
+                                             alpha=0.4, linewidths=1))
+        
+        # 绘制巷道（线宽随巷道宽度变化）
+        alleys = layers.get('alleys')
+        if alleys:
+            ax.add_collection(LineCollection(alleys['segments'], colors='lightgray',
+                                             linewidths=alleys['widths'], alpha=0.3, capstyle='round'))
     
     def plot_radar_chart(self,
                         evaluation_result: Dict,
-                        output_file: str = "threat_radar.png") -> str:
+                        output_file: str = "threat_radar.png",
+                        fmt: str = 'png') -> str:
         """
         绘制单个目标的威胁指标雷达图
         
         Args:
             evaluation_result: 单个目标的评估结果
             output_file: 输出文件名
+            fmt: 输出格式（'png'/'svg'/'pdf'），非png时自动替换文件扩展名
         
         Returns:
             保存的文件路径
@@ -227,9 +522,6 @@ class ThreatVisualizer:
         # 提取6个指标的威胁得分
         indicators = evaluation_result['indicator_details']
         
-        categories = []
-        scores = []
-        
         indicator_order = ['distance', 'type', 'speed', 'angle', 'visibility', 'environment']
         indicator_labels = {
             'distance': 'Distance',
@@ -240,20 +532,24 @@ class ThreatVisualizer:
             'environment': 'Environment'
         }
         
-        for ind_name in indicator_order:
-            if ind_name in indicators:
-                categories.append(indicator_labels[ind_name])
-                # 将得分从[-1, 1]映射到[0, 1]
-                score = (indicators[ind_name]['threat_score'] + 1) / 2
-                scores.append(score)
+        present = [ind_name for ind_name in indicator_order if ind_name in indicators]
+        categories = [indicator_labels[ind_name] for ind_name in present]
+        # 将得分从[-1, 1]映射到[0, 1]
+        scores = _normalize_scores(np.fromiter((indicators[ind_name]['threat_score'] for ind_name in present),
+                                               dtype=np.float32, count=len(present)))
         
         # 创建雷达图
         num_vars = len(categories)
-        angles = np.linspace(0, 2 * np.pi, num_vars, endpoint=False).tolist()
-        scores += scores[:1]  # 闭合图形
-        angles += angles[:1]
+        # 闭合图形：预分配num_vars+1长度的数组，末位重复首个点
+        angles = np.empty(num_vars + 1, dtype=np.float32)
+        angles[:-1] = np.linspace(0, 2 * np.pi, num_vars, endpoint=False)
+        angles[-1] = angles[0]
+        scores_closed = np.empty(num_vars + 1, dtype=np.float32)
+        scores_closed[:-1] = scores
+        scores_closed[-1] = scores[0]
+        scores = scores_closed
         
-        fig, ax = plt.subplots(figsize=(10, 10), subplot_kw=dict(projection='polar'))
+        fig, ax = self._get_figure('radar', figsize=(10, 10), subplot_kw=dict(projection='polar'))
         
         # 绘制数据
         ax.plot(angles, scores, 'o-', linewidth=2, color='red', label='Threat Score')
@@ -272,22 +568,18 @@ class ThreatVisualizer:
         threat_level = evaluation_result['threat_level']
         threat_score = evaluation_result['comprehensive_threat_score']
         
-        plt.title(f'Enemy #{enemy_id} Threat Indicators\n'
+        ax.set_title(f'Enemy #{enemy_id} Threat Indicators\n'
                  f'Level: {threat_level.upper()} (Score: {threat_score:.3f})',
                  fontsize=14, fontweight='bold', pad=20)
         
         # 保存
-        output_path = os.path.join(self.output_dir, output_file)
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return output_path
+        return self._save_figure(fig, output_file, fmt=fmt)
     
     def plot_threat_ranking(self,
                            evaluation_results: List[Dict],
                            output_file: str = "threat_ranking.png",
-                           top_n: int = 10) -> str:
+                           top_n: int = 10,
+                           fmt: str = 'png') -> str:
         """
         绘制威胁排名柱状图
         
@@ -295,40 +587,38 @@ class ThreatVisualizer:
             evaluation_results: 评估结果列表（已排序）
             output_file: 输出文件名
             top_n: 显示前N个目标
+            fmt: 输出格式（'png'/'svg'/'pdf'），非png时自动替换文件扩展名
         
         Returns:
             保存的文件路径
         """
         # 取前N个
-        top_results = evaluation_results[:top_n]
+        flat = self._flatten(evaluation_results)
         
-        enemy_ids = [f"Enemy #{r['enemy_id']}" for r in top_results]
-        threat_scores = [r['comprehensive_threat_score'] for r in top_results]
-        threat_levels = [r['threat_level'] for r in top_results]
+        enemy_ids = [f"Enemy #{enemy_id}" for enemy_id in flat['ids'][:top_n]]
+        threat_scores = flat['score'][:top_n]
         
         # 获取颜色
-        colors = [self.threat_colors.get(level, '#AAAAAA') for level in threat_levels]
+        colors = self._color_table[flat['level'][:top_n]]
         
         # 创建图表
-        fig, ax = plt.subplots(figsize=(12, 8))
+        fig, ax = self._get_figure('ranking', figsize=(12, 8))
         
         bars = ax.barh(enemy_ids, threat_scores, color=colors, edgecolor='black', linewidth=1.5)
         
         # 添加数值标签
-        for i, (bar, score) in enumerate(zip(bars, threat_scores)):
-            ax.text(score + 0.02, bar.get_y() + bar.get_height()/2, 
-                   f'{score:.3f}', va='center', fontsize=10, fontweight='bold')
+        self._label_bars(ax, bars, [f'{score:.3f}' for score in threat_scores],
+                         padding=4, fontsize=10, fontweight='bold')
         
         # 设置坐标轴
         ax.set_xlabel('Threat Score', fontsize=12, fontweight='bold')
         ax.set_ylabel('Enemy', fontsize=12, fontweight='bold')
-        ax.set_title(f'Top {len(top_results)} Threat Ranking', fontsize=14, fontweight='bold')
+        ax.set_title(f'Top {len(threat_scores)} Threat Ranking', fontsize=14, fontweight='bold')
         ax.set_xlim(-1, 1)
         ax.axvline(x=0, color='gray', linestyle='--', linewidth=1, alpha=0.5)
         ax.grid(axis='x', alpha=0.3)
         
         # 添加威胁等级图例
-        from matplotlib.patches import Patch
         legend_elements = [
             Patch(facecolor=self.threat_colors['critical'], label='Critical'),
             Patch(facecolor=self.threat_colors['high'], label='High'),
@@ -338,22 +628,19 @@ class ThreatVisualizer:
         ax.legend(handles=legend_elements, loc='lower right', fontsize=10)
         
         # 保存
-        output_path = os.path.join(self.output_dir, output_file)
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return output_path
+        return self._save_figure(fig, output_file, fmt=fmt)
     
     def plot_indicator_contributions(self,
                                     evaluation_result: Dict,
-                                    output_file: str = "indicator_contributions.png") -> str:
+                                    output_file: str = "indicator_contributions.png",
+                                    fmt: str = 'png') -> str:
         """
         绘制各指标对综合威胁度的贡献饼图
         
         Args:
             evaluation_result: 单个目标的评估结果
             output_file: 输出文件名
+            fmt: 输出格式（'png'/'svg'/'pdf'），非png时自动替换文件扩展名
         
         Returns:
             保存的文件路径
@@ -364,7 +651,7 @@ class ThreatVisualizer:
         values = []
         colors_list = []
         
-        color_palette = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#F7DC6F']
+        color_palette = self._palette
         
         for i, (indicator_name, contrib_data) in enumerate(contributions.items()):
             labels.append(f"{indicator_name.capitalize()}\n({contrib_data['weight']:.2f})")
@@ -372,7 +659,7 @@ class ThreatVisualizer:
             colors_list.append(color_palette[i % len(color_palette)])
         
         # 创建饼图
-        fig, ax = plt.subplots(figsize=(10, 8))
+        fig, ax = self._get_figure('contributions', figsize=(10, 8))
         
         wedges, texts, autotexts = ax.pie(values, labels=labels, colors=colors_list,
                                           autopct='%1.1f%%', startangle=90,
@@ -382,66 +669,99 @@ class ThreatVisualizer:
         enemy_id = evaluation_result['enemy_id']
         threat_score = evaluation_result['comprehensive_threat_score']
         
-        plt.title(f'Enemy #{enemy_id} - Indicator Contributions\n'
+        ax.set_title(f'Enemy #{enemy_id} - Indicator Contributions\n'
                  f'Comprehensive Threat Score: {threat_score:.3f}',
                  fontsize=14, fontweight='bold', pad=20)
         
         # 保存
-        output_path = os.path.join(self.output_dir, output_file)
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return output_path
+        return self._save_figure(fig, output_file, fmt=fmt)
     
     def plot_comparison(self,
                        evaluation_results: List[Dict],
-                       output_file: str = "threat_comparison.png") -> str:
+                       output_file: str = "threat_comparison.png",
+                       blit: bool = False,
+                       fmt: str = 'png') -> str:
         """
         绘制多个目标的对比分析图
         
         Args:
             evaluation_results: 多个目标的评估结果列表
             output_file: 输出文件名
+            blit: 逐帧重复绘制时原地更新上一帧的柱子和标签（仅reuse_figure模式生效，
+                且对比的敌人需与上一帧相同），跳过坐标轴重建和tight_layout
+            fmt: 输出格式（'png'/'svg'/'pdf'），非png时自动替换文件扩展名
         
         Returns:
             保存的文件路径
         """
-        if len(evaluation_results) > 5:
-            evaluation_results = evaluation_results[:5]  # 最多对比5个
+        flat = self._flatten(evaluation_results)
+        num_enemies = min(len(evaluation_results), 5)  # 最多对比5个
         
-        num_enemies = len(evaluation_results)
+        # (敌人数, 6)得分矩阵映射到[0, 1]，缺失指标得分为0、灰色显示
+        raw_scores = flat['ind_scores'][:num_enemies]
+        present = ~np.isnan(raw_scores)
+        score_matrix = np.where(present, _normalize_scores(raw_scores.ravel()).reshape(raw_scores.shape), 0)
+        level_colors = self._color_table[flat['level'][:num_enemies]]
+        missing_color = self._missing_color
+        enemy_labels = [f"E{enemy_id}" for enemy_id in flat['ids'][:num_enemies]]
         
-        # 创建子图
-        fig, axes = plt.subplots(2, 3, figsize=(18, 12))
-        fig.suptitle('Multi-Target Threat Comparison', fontsize=16, fontweight='bold')
-        
-        indicators_order = ['distance', 'type', 'speed', 'angle', 'visibility', 'environment']
         indicator_labels = {
             'distance': 'Distance', 'type': 'Type', 'speed': 'Speed',
             'angle': 'Angle', 'visibility': 'Visibility', 'environment': 'Environment'
         }
         
+        # 不足两个目标时无可对比，改为单图展示该目标的6项指标
+        if num_enemies <= 1:
+            fig, ax = self._get_figure('comparison_single', figsize=(10, 6))
+            if num_enemies:
+                colors = np.where(present[0][:, None], level_colors[0], missing_color)
+                bars = ax.bar([indicator_labels[name] for name in _INDICATOR_ORDER], score_matrix[0],
+                              color=colors, edgecolor='black', linewidth=1.5)
+                self._label_bars(ax, bars, [f'{score:.2f}' for score in score_matrix[0]],
+                                 padding=2, fontsize=9)
+                ax.set_title(f'Enemy #{flat["ids"][0]} Indicator Scores', fontsize=14, fontweight='bold')
+            else:
+                ax.set_title('No Targets to Compare', fontsize=14, fontweight='bold')
+            ax.set_ylabel('Normalized Score', fontsize=10)
+            ax.set_ylim(0, 1)
+            ax.grid(axis='y', alpha=0.3)
+            return self._save_figure(fig, output_file, fmt=fmt)
+        
+        use_blit = blit and self.reuse_figure
+        artists = self._comparison_artists
+        if use_blit and artists is not None and artists['labels'] == enemy_labels \
+                and 'comparison' in self._fig_cache:
+            # 原地更新：只改柱子高度/颜色和标签文字位置
+            fig, _ = self._fig_cache['comparison']
+            for idx in range(len(_INDICATOR_ORDER)):
+                scores = score_matrix[:, idx]
+                colors = np.where(present[:, idx, None], level_colors, missing_color)
+                for bar, text, score, color in zip(artists['bars'][idx], artists['texts'][idx],
+                                                   scores, colors):
+                    bar.set_height(score)
+                    bar.set_facecolor(color)
+                    text.set_text(f'{score:.2f}')
+                    text.xy = (bar.get_x() + bar.get_width() / 2, score)
+            return self._save_figure(fig, output_file, fmt=fmt, tight=False)
+        
+        # 创建子图
+        fig, axes = self._get_figure('comparison', nrows=2, ncols=3, figsize=(18, 12))
+        fig.suptitle('Multi-Target Threat Comparison', fontsize=16, fontweight='bold')
+        
+        all_bars = []
+        all_texts = []
+        
         # 为每个指标绘制对比柱状图
-        for idx, indicator_name in enumerate(indicators_order):
+        for idx, indicator_name in enumerate(_INDICATOR_ORDER):
             row = idx // 3
             col = idx % 3
             ax = axes[row, col]
             
-            enemy_labels = [f"E{r['enemy_id']}" for r in evaluation_results]
-            scores = []
-            colors = []
-            
-            for result in evaluation_results:
-                if indicator_name in result['indicator_details']:
-                    score = result['indicator_details'][indicator_name]['threat_score']
-                    scores.append((score + 1) / 2)  # 映射到[0, 1]
-                    colors.append(self.threat_colors.get(result['threat_level'], '#AAAAAA'))
-                else:
-                    scores.append(0)
-                    colors.append('#CCCCCC')
+            scores = score_matrix[:, idx]
+            colors = np.where(present[:, idx, None], level_colors, missing_color)
             
             bars = ax.bar(enemy_labels, scores, color=colors, edgecolor='black', linewidth=1.5)
+            all_bars.append(bars)
             
             ax.set_title(indicator_labels[indicator_name], fontsize=12, fontweight='bold')
             ax.set_ylabel('Normalized Score', fontsize=10)
@@ -449,18 +769,16 @@ class ThreatVisualizer:
             ax.grid(axis='y', alpha=0.3)
             
             # 添加数值标签
-            for bar, score in zip(bars, scores):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2, height + 0.02,
-                       f'{score:.2f}', ha='center', va='bottom', fontsize=9)
+            all_texts.append(self._label_bars(ax, bars, [f'{score:.2f}' for score in scores],
+                                              padding=2, fontsize=9))
         
-        # 保存
-        output_path = os.path.join(self.output_dir, output_file)
-        plt.tight_layout()
-        plt.savefig(output_path, dpi=150, bbox_inches='tight')
-        plt.close()
+        # 非blit重建时清空：坐标轴已被清除，缓存的柱子不再属于当前图像
+        self._comparison_artists = (
+            {'labels': enemy_labels, 'bars': all_bars, 'texts': all_texts} if use_blit else None
+        )
         
-        return output_path
+        # 保存
+        return self._save_figure(fig, output_file, fmt=fmt)
 
 
 if __name__ == "__main__":
@@ -1,6 +1,19 @@
 """检查可用的串口"""
+from concurrent.futures import ThreadPoolExecutor
+
 import serial.tools.list_ports
 
+
+def probe(port):
+    """尝试打开端口检查是否可用，返回(端口, 异常或None)"""
+    try:
+        s = serial.Serial(port.device, timeout=0.1)
+        s.close()
+        return port, None
+    except serial.SerialException as e:
+        return port, e
+
+
 print("\n" + "=" * 60)
 print("可用串口列表")
 print("=" * 60)
@@ -10,23 +23,17 @@ ports = serial.tools.list_ports.comports()
 if not ports:
     print("❌ 未找到任何串口设备")
 else:
-    for port in ports:
-        print(f"\n串口: {port.device}")
-        print(f"  描述: {port.description}")
-        print(f"  硬件ID: {port.hwid}")
-        
-        # 尝试打开端口检查是否可用
-        try:
-            s = serial.Serial(port.device, timeout=0.1)
-            s.close()
-            print(f"  状态: ✓ 可用")
-        except serial.SerialException as e:
-            print(f"  状态: ✗ 被占用或无权限")
-            print(f"  错误: {e}")
+    # 打开端口主要是等待驱动的阻塞调用，并发探测；map按输入顺序返回，输出顺序不变
+    with ThreadPoolExecutor(max_workers=min(16, len(ports))) as executor:
+        for port, error in executor.map(probe, ports):
+            print(f"\n串口: {port.device}")
+            print(f"  描述: {port.description}")
+            print(f"  硬件ID: {port.hwid}")
+            
+            if error is None:
+                print(f"  状态: ✓ 可用")
+            else:
+                print(f"  状态: ✗ 被占用或无权限")
+                print(f"  错误: {error}")
 
 print("\n" + "=" * 60)
-
-
-
-
-
@@ -38,6 +38,11 @@ IFS_CONFIG = {
 # 'minimal': 只输出选中的目标ID
 IFS_LOG_LEVEL = 'detailed'
 
+# IFS评估前的候选目标预筛选数量
+# 大于0时先用简单算法给所有目标打分，只对得分最高的前K个目标做完整IFS评估
+# 简单算法只是近似排序，可能漏掉IFS意义上的最大威胁目标；0表示不预筛选（默认）
+IFS_PREFILTER_TOP_K = 0
+
 
 # ============================================================================
 # OpenAI配置（GPT-4o威胁评估）
@@ -55,6 +60,16 @@ OPENAI_BASE_URL = os.environ.get(
 # 是否启用GPT评估
 ENABLE_GPT_ASSESSMENT = True
 
+# GPT请求超时（秒）：请求在主循环中同步执行，超时后按降级策略改用下一级评估
+GPT_REQUEST_TIMEOUT = 5.0
+
+# GPT请求失败时的最大重试次数（由openai客户端按指数退避重试）
+GPT_MAX_RETRIES = 1
+
+# 简单算法最高分超过次高分的多少倍时直接采用该目标、不再请求GPT
+# GPT可能给出不同的判断，因此默认0（不跳过）；只有一个目标时总是跳过GPT
+GPT_SKIP_DOMINANCE_RATIO = 0
+
 
 # ============================================================================
 # 串口配置
@@ -66,9 +81,19 @@ SERIAL_PORT = "COM7"
 # 波特率
 SERIAL_BAUDRATE = 9600
 
+# 串口写超时（秒）：USB串口发送缓冲区被占满时，写操作最多阻塞这么久后放弃本次发送
+SERIAL_WRITE_TIMEOUT = 1.0
+
+# 态势感知模式下相邻启动信号帧之间的间隔（秒），给下位机留出处理时间，避免接收缓冲区溢出；
+# 0表示所有启动信号拼接后一次写出（仅在确认下位机能接收连续突发数据时使用）
+SERIAL_FRAME_GAP = 0.05
+
 # 震动器数量（硬件测试时测试0~NUM_VIBRATORS-1）
 NUM_VIBRATORS = 16  # 测试震动片 0-15
 
+# 是否进行启动硬件测试（从环境变量HW_TEST读取，Y/N；为空时在终端交互询问）
+HARDWARE_TEST = os.environ.get("HW_TEST", "").strip().upper()
+
 
 # ============================================================================
 # UDP服务器配置
@@ -83,6 +108,12 @@ UDP_PORT = 5005
 # UDP接收超时时间（秒）
 UDP_TIMEOUT = 1.0
 
+# UDP套接字收/发缓冲区大小（字节），主循环处理较慢时由内核队列暂存数据报，避免静默丢包
+# Linux上实际大小受 net.core.rmem_max / wmem_max 限制，如需更大可执行：
+#   sysctl -w net.core.rmem_max=12582912
+UDP_RECV_BUFFER_SIZE = 4 * 1024 * 1024
+UDP_SEND_BUFFER_SIZE = 4 * 1024 * 1024
+
 
 # ============================================================================
 # 威胁评估策略配置
@@ -1,28 +1,70 @@
 """CSV日志记录模块"""
-import csv
 import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
+
 from models import Target
 
 logger = logging.getLogger(__name__)
 
+# 数据行格式模板（9个基本字段 + 16个方向威胁值），行尾与csv.writer默认的\r\n一致。
+# 各字段均为时间戳、数字或简短类型字符串，不含逗号/引号/换行，无需csv转义。
+# 精度由格式说明符控制：目标距离/角度/坐标保留2位小数，方向威胁值保留3位小数
+ROW_FMT = "{},{},{},{},{:.2f},{:.2f},{:.2f},{:.2f},{:.2f}" + ",{:.3f}" * 16 + "\r\n"
+# 没有威胁目标时，目标相关的7个字段固定为N/A
+ROW_FMT_NO_TARGET = "{},{}" + ",N/A" * 7 + ",{:.3f}" * 16 + "\r\n"
+
 
 class CSVLogger:
     """CSV日志记录器，用于记录实验数据"""
     
-    def __init__(self, base_dir: str = "logs"):
+    def __init__(
+        self,
+        base_dir: str = "logs",
+        flush_every: int = 0,
+        batch_size: int = 64,
+        fsync_interval: float = 5.0
+    ):
         """
         初始化CSV日志记录器
         
         Args:
             base_dir: 日志文件存储目录，默认为 "logs"
+            flush_every: 每写入多少行强制把缓冲的行写入文件一次，0表示只按batch_size批量写出
+                         （关闭时统一写出并fsync）
+            batch_size: 内存中累积多少行后批量写出，默认64
+            fsync_interval: 两次fsync之间的最短间隔（秒）；使用log_round_data_async时后台线程空闲
+                            超过该间隔也会写出并fsync缓冲的行，异常退出时最多丢失约这么长时间的数据。
+                            同步调用log_round_data时只在下一次写入或close时检查该窗口；
+                            0表示只在关闭时fsync
         """
         self.base_dir = base_dir
-        self.csv_file = None
-        self.csv_writer = None
+        self._fd: Optional[int] = None  # CSV文件的原始文件描述符
         self.file_path = None
+        self.flush_every = flush_every
+        self.rows_written = 0
+        self._row_buffer: list = []
+        self._batch_size = max(1, batch_size)
+        self._fsync_interval = fsync_interval
+        self._last_fsync = time.monotonic()
+        # 上次fsync之后是否又记录了新行（后台线程空闲时据此决定是否需要落盘）
+        self._unsynced = False
+        self._headers: List[str] = []
+        self._col_index: Dict[str, int] = {}
+        # 内存中的round索引：round编号 -> 数据行文本（含已提交给后台线程、尚未写入的行，避免反复扫描CSV文件）
+        self._round_rows: Dict[str, str] = {}
+        # 后台写入线程及其任务队列（首次调用log_round_data_async时创建）
+        self._queue: Optional[queue.Queue] = None
+        self._writer_thread: Optional[threading.Thread] = None
+        # 时间戳缓存：同一秒内复用已格式化的"年-月-日 时:分:秒"前缀
+        self._last_sec = None
+        self._last_sec_str = ""
+        # 复用的方向威胁值缓冲区（每行原地覆盖）
+        self._dt_buf = [0.0] * 16
         
         # 创建日志目录
         self._create_log_directory()
@@ -47,9 +89,9 @@ class CSVLogger:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             self.file_path = os.path.join(self.base_dir, f"experiment_{timestamp}.csv")
             
-            # 打开文件
-            self.csv_file = open(self.file_path, 'w', newline='', encoding='utf-8')
-            self.csv_writer = csv.writer(self.csv_file)
+            # 直接打开原始文件描述符：行在内存中批量拼接后一次os.write写出，
+            # 绕过文本IO层的编码与缓冲管理
+            self._fd = os.open(self.file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
             
             # 写入列头
             headers = [
@@ -79,8 +121,10 @@ class CSVLogger:
                 'northwest_threat',          # 14
                 'north_northwest_threat'     # 15
             ]
-            self.csv_writer.writerow(headers)
-            self.csv_file.flush()
+            # 列名均为纯ASCII标识符，无需csv转义（行尾与csv.writer默认的\r\n一致）
+            os.write(self._fd, (','.join(headers) + '\r\n').encode('utf-8'))
+            self._headers = headers
+            self._col_index = {name: i for i, name in enumerate(headers)}
             
             logger.info("=" * 60)
             logger.info("📊 CSV Logger initialized")
@@ -96,7 +140,8 @@ class CSVLogger:
         self,
         round_number: str,
         most_threatening_target: Optional[Target],
-        direction_threats  # 可以是字典或列表
+        direction_threats,  # 可以是字典、列表或numpy数组
+        timestamp: Optional[str] = None
     ):
         """
         记录每轮的数据到CSV
@@ -104,75 +149,184 @@ class CSVLogger:
         Args:
             round_number: 轮次编号（如 "1-1"）
             most_threatening_target: 最具威胁的目标对象，如果没有则为None
-            direction_threats: 16个方向的威胁值（字典{0-15: float}或列表）
+            direction_threats: 16个方向的威胁值（shape为(16,)的np.ndarray、字典{0-15: float}或列表）
+            timestamp: 该行的时间戳字符串，为None时使用当前时间
         """
-        if not self.csv_writer or not self.csv_file:
+        if self._fd is None:
             logger.error("CSV logger is not initialized")
             return
         
         try:
-            # 生成时间戳（精确到毫秒）
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-            
-            # 提取威胁目标信息
-            if most_threatening_target:
-                threat_id = most_threatening_target.id
-                threat_type = most_threatening_target.type
-                threat_distance = round(most_threatening_target.distance, 2)
-                threat_angle = round(most_threatening_target.angle, 2)
-                threat_x = round(most_threatening_target.position.x, 2)
-                threat_y = round(most_threatening_target.position.y, 2)
-                threat_z = round(most_threatening_target.position.z, 2)
-            else:
-                threat_id = "N/A"
-                threat_type = "N/A"
-                threat_distance = "N/A"
-                threat_angle = "N/A"
-                threat_x = "N/A"
-                threat_y = "N/A"
-                threat_z = "N/A"
-            
-            # 处理direction_threats（可以是字典或列表）
-            if isinstance(direction_threats, dict):
-                # 如果是字典，按方向ID（0-15）排序提取值
-                direction_threats_list = [direction_threats.get(i, 0.0) for i in range(16)]
-            else:
-                # 如果是列表，直接使用
-                direction_threats_list = list(direction_threats)
-            
-            # 确保有16个方向的威胁值
-            if len(direction_threats_list) < 16:
-                logger.warning(f"Expected 16 direction threats, got {len(direction_threats_list)}")
-                direction_threats_list = direction_threats_list + [0.0] * (16 - len(direction_threats_list))
-            
-            # 四舍五入威胁值到3位小数
-            direction_threats_rounded = [round(t, 3) for t in direction_threats_list[:16]]
-            
-            # 写入数据行
-            row = [
-                timestamp,
-                round_number,
-                threat_id,
-                threat_type,
-                threat_distance,
-                threat_angle,
-                threat_x,
-                threat_y,
-                threat_z,
-            ] + direction_threats_rounded
-            
-            self.csv_writer.writerow(row)
-            self.csv_file.flush()  # 立即写入磁盘
-            
+            line = self._format_row(round_number, most_threatening_target, direction_threats, timestamp)
+            self._index_row(round_number, line)
+            self._append_row(line)
             logger.debug(f"CSV: Logged data for round {round_number}")
             
         except Exception as e:
             logger.error(f"Failed to write to CSV file: {e}")
             # 不抛出异常，避免中断主程序
     
+    def log_round_data_async(
+        self,
+        round_number: str,
+        most_threatening_target: Optional[Target],
+        direction_threats
+    ):
+        """
+        把一轮数据交给后台线程写入CSV，调用方不等待磁盘写入
+        
+        数据行在提交时格式化并加入内存索引，check_round_exists和read_round_data随即可用；
+        后台线程只负责按提交顺序写出
+        
+        Args:
+            round_number: 轮次编号（如 "1-1"）
+            most_threatening_target: 最具威胁的目标对象，如果没有则为None
+            direction_threats: 16个方向的威胁值（字典{0-15: float}、列表或np.ndarray）
+        """
+        if self._fd is None:
+            logger.error("CSV logger is not initialized")
+            return
+        
+        try:
+            line = self._format_row(round_number, most_threatening_target, direction_threats)
+        except Exception as e:
+            logger.error(f"Failed to format CSV row: {e}")
+            return
+        
+        self._index_row(round_number, line)
+        if self._writer_thread is None:
+            self._queue = queue.Queue()
+            self._writer_thread = threading.Thread(target=self._drain_queue, name="csv-writer", daemon=True)
+            self._writer_thread.start()
+        self._queue.put(line)
+    
+    def _drain_queue(self):
+        """
+        后台写入线程：依次取出提交的数据行写入CSV，收到None时退出
+        
+        队列空闲超过fsync_interval时把缓冲的行写出并fsync，
+        避免最后几行在没有后续数据到来时一直停留在内存中
+        """
+        timeout = self._fsync_interval if self._fsync_interval > 0 else None
+        while True:
+            try:
+                line = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                if self._unsynced:
+                    try:
+                        self._sync()
+                    except Exception as e:
+                        logger.error(f"Failed to sync CSV file: {e}")
+                continue
+            if line is None:
+                return
+            try:
+                self._append_row(line)
+            except Exception as e:
+                logger.error(f"Failed to write to CSV file: {e}")
+    
+    def _format_row(
+        self,
+        round_number: str,
+        target: Optional[Target],
+        direction_threats,
+        timestamp: Optional[str] = None
+    ) -> str:
+        """
+        把一轮数据格式化为CSV数据行文本（含行尾）
+        
+        Args:
+            round_number: 轮次编号（如 "1-1"）
+            target: 最具威胁的目标对象，如果没有则为None
+            direction_threats: 16个方向的威胁值（字典{0-15: float}、列表或np.ndarray）
+            timestamp: 该行的时间戳字符串，为None时使用当前时间
+        
+        Returns:
+            数据行文本
+        """
+        # 生成时间戳（精确到毫秒）
+        if timestamp is None:
+            timestamp = self._format_timestamp()
+        
+        # 处理direction_threats（可以是字典、列表或numpy数组），
+        # 原地填入预分配的16元素缓冲区，不为每行创建中间列表
+        buf = self._dt_buf
+        if isinstance(direction_threats, dict):
+            # 如果是字典，按方向ID（0-15）提取值
+            get = direction_threats.get
+            for i in range(16):
+                buf[i] = get(i, 0.0)
+        else:
+            # 如果是列表或数组，直接按顺序使用
+            n = len(direction_threats)
+            # 确保有16个方向的威胁值
+            if n < 16:
+                logger.warning(f"Expected 16 direction threats, got {n}")
+                for i in range(n, 16):
+                    buf[i] = 0.0
+            else:
+                n = 16
+            for i in range(n):
+                buf[i] = direction_threats[i]
+        
+        # 格式化数据行（舍入由格式模板完成，无需逐个调用round()）
+        if target:
+            return ROW_FMT.format(
+                timestamp,
+                round_number,
+                target.id,
+                target.type,
+                target.distance,
+                target.angle,
+                target.position.x,
+                target.position.y,
+                target.position.z,
+                *buf
+            )
+        return ROW_FMT_NO_TARGET.format(timestamp, round_number, *buf)
+    
+    def _index_row(self, round_number: str, line: str):
+        """把数据行加入内存round索引（同一round只保留第一次记录，与按文件顺序查找的结果一致）"""
+        self._round_rows.setdefault(round_number, line)
+    
+    def _append_row(self, line: str):
+        """把已格式化的数据行加入写出缓冲，并按batch_size/flush_every/fsync_interval写出和落盘"""
+        self._row_buffer.append(line)
+        self.rows_written += 1
+        self._unsynced = True
+        
+        # 缓冲满一批后一次性写出
+        if len(self._row_buffer) >= self._batch_size:
+            self._write_pending_rows()
+        
+        # 仅在配置了flush_every时按行数周期性flush
+        if self.flush_every > 0 and self.rows_written % self.flush_every == 0:
+            self._flush_buffer()
+        
+        # 按时间窗口合并落盘：距上次fsync超过fsync_interval才同步一次
+        if self._fsync_interval > 0 and time.monotonic() - self._last_fsync > self._fsync_interval:
+            self._sync()
+    
+    def _format_timestamp(self) -> str:
+        """
+        生成当前时间戳字符串（格式：%Y-%m-%d %H:%M:%S.毫秒）
+        
+        秒级前缀按秒缓存，同一秒内的多行只需拼接毫秒部分
+        
+        Returns:
+            时间戳字符串
+        """
+        t = time.time()
+        sec = int(t)
+        if sec != self._last_sec:
+            self._last_sec = sec
+            self._last_sec_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sec))
+        ms = int((t - sec) * 1000)
+        return f"{self._last_sec_str}.{ms:03d}"
+    
     def check_round_exists(self, round_number: str) -> bool:
         """
-        检查CSV文件中是否已存在该round的记录
+        检查是否已记录过该round（基于内存索引，O(1)）
         
         Args:
             round_number: 轮次编号（如 "1-1"）
@@ -180,23 +334,11 @@ class CSVLogger:
         Returns:
             如果round已存在返回True，否则返回False
         """
-        if not self.file_path or not os.path.exists(self.file_path):
-            return False
-        
-        try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get('round') == round_number:
-                        return True
-            return False
-        except Exception as e:
-            logger.error(f"Error checking round existence: {e}")
-            return False
+        return round_number in self._round_rows
     
     def read_round_data(self, round_number: str) -> Optional[dict]:
         """
-        从CSV读取指定round的数据
+        读取指定round的数据（从内存索引中获取，不再扫描CSV文件）
         
         Args:
             round_number: 轮次编号（如 "1-1"）
@@ -207,66 +349,80 @@ class CSVLogger:
                     threat_enemy_angle, threat_enemy_x, threat_enemy_y, threat_enemy_z,
                     direction_threats (list of 16 floats)
         """
-        if not self.file_path or not os.path.exists(self.file_path):
-            logger.warning(f"CSV file does not exist: {self.file_path}")
+        line = self._round_rows.get(round_number)
+        if line is None:
+            logger.warning(f"Round {round_number} not found in CSV")
             return None
         
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get('round') == round_number:
-                        # 提取16个方向的威胁值
-                        direction_threats = [
-                            float(row.get('north_threat', 0.0)),              # 0
-                            float(row.get('north_northeast_threat', 0.0)),    # 1
-                            float(row.get('northeast_threat', 0.0)),          # 2
-                            float(row.get('east_northeast_threat', 0.0)),     # 3
-                            float(row.get('east_threat', 0.0)),               # 4
-                            float(row.get('east_southeast_threat', 0.0)),     # 5
-                            float(row.get('southeast_threat', 0.0)),          # 6
-                            float(row.get('south_southeast_threat', 0.0)),    # 7
-                            float(row.get('south_threat', 0.0)),              # 8
-                            float(row.get('south_southwest_threat', 0.0)),    # 9
-                            float(row.get('southwest_threat', 0.0)),          # 10
-                            float(row.get('west_southwest_threat', 0.0)),     # 11
-                            float(row.get('west_threat', 0.0)),               # 12
-                            float(row.get('west_northwest_threat', 0.0)),     # 13
-                            float(row.get('northwest_threat', 0.0)),          # 14
-                            float(row.get('north_northwest_threat', 0.0))     # 15
-                        ]
-                        
-                        # 构建返回数据
-                        data = {
-                            'round': round_number,
-                            'threat_enemy_id': row.get('threat_enemy_id'),
-                            'threat_enemy_type': row.get('threat_enemy_type'),
-                            'threat_enemy_distance': row.get('threat_enemy_distance'),
-                            'threat_enemy_angle': row.get('threat_enemy_angle'),
-                            'threat_enemy_x': row.get('threat_enemy_x'),
-                            'threat_enemy_y': row.get('threat_enemy_y'),
-                            'threat_enemy_z': row.get('threat_enemy_z'),
-                            'direction_threats': direction_threats
-                        }
-                        
-                        logger.debug(f"CSV: Read data for round {round_number}")
-                        return data
+            # 按写入文件的文本拆分字段，与从CSV读回的结果一致
+            raw = line.rstrip('\r\n').split(',')
+            col = self._col_index
+            first_dir = col['north_threat']
             
-            logger.warning(f"Round {round_number} not found in CSV")
-            return None
+            # 16个方向的威胁值是连续的列，一次切片 + map 完成转换
+            direction_threats = list(map(float, raw[first_dir:first_dir + 16]))
+            
+            # 构建返回数据（各字段均为字符串）
+            data = {'round': round_number}
+            for name in (
+                'threat_enemy_id',
+                'threat_enemy_type',
+                'threat_enemy_distance',
+                'threat_enemy_angle',
+                'threat_enemy_x',
+                'threat_enemy_y',
+                'threat_enemy_z',
+            ):
+                data[name] = raw[col[name]]
+            data['direction_threats'] = direction_threats
+            
+            logger.debug(f"CSV: Read data for round {round_number}")
+            return data
             
         except Exception as e:
             logger.error(f"Error reading round data: {e}")
             return None
     
+    def _write_pending_rows(self):
+        """把内存中缓冲的已格式化行编码后用一次os.write写入文件"""
+        if self._row_buffer:
+            data = ''.join(self._row_buffer).encode('utf-8')
+            self._row_buffer.clear()
+            # os.write可能只写入部分数据（例如被信号中断），循环直到全部写完
+            view = memoryview(data)
+            while view:
+                written = os.write(self._fd, view)
+                view = view[written:]
+    
+    def _flush_buffer(self):
+        """把缓冲的行写入文件（文件未关闭时）"""
+        if self._fd is not None:
+            self._write_pending_rows()
+    
+    def _sync(self):
+        """把所有缓冲数据写入文件并fsync到磁盘"""
+        self._flush_buffer()
+        os.fsync(self._fd)
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+    
     def close(self):
-        """关闭CSV文件"""
-        if self.csv_file:
+        """关闭CSV文件（先等待后台线程写完已提交的数据，再统一写出并fsync一次）"""
+        if self._writer_thread is not None:
+            self._queue.put(None)
+            self._writer_thread.join()
+            self._writer_thread = None
+        
+        if self._fd is not None:
             try:
-                self.csv_file.close()
-                logger.info(f"CSV log file closed: {self.file_path}")
+                self._sync()
             except Exception as e:
                 logger.error(f"Error closing CSV file: {e}")
+            finally:
+                os.close(self._fd)
+                self._fd = None
+                logger.info(f"CSV log file closed: {self.file_path}")
     
     def __enter__(self):
         """支持with语句"""
@@ -1,29 +1,32 @@
 """方向计算和马达映射模块"""
 import math
 import logging
+
+import numpy as np
+
 from models import Position
 
 logger = logging.getLogger(__name__)
 
-# 马达方向描述（从玩家视角，16个方向）
-MOTOR_DIRECTIONS = {
-    0: "正北 (0°)",
-    1: "北偏东 (22.5°)",
-    2: "东北 (45°)",
-    3: "东偏北 (67.5°)",
-    4: "正东 (90°)",
-    5: "东偏南 (112.5°)",
-    6: "东南 (135°)",
-    7: "南偏东 (157.5°)",
-    8: "正南 (180°)",
-    9: "南偏西 (202.5°)",
-    10: "西南 (225°)",
-    11: "西偏南 (247.5°)",
-    12: "正西 (270°)",
-    13: "西偏北 (292.5°)",
-    14: "西北 (315°)",
-    15: "北偏西 (337.5°)"
-}
+# 马达方向描述（从玩家视角，16个方向，按马达编号0-15排列）
+MOTOR_DIRECTIONS = (
+    "正北 (0°)",        # 0
+    "北偏东 (22.5°)",   # 1
+    "东北 (45°)",       # 2
+    "东偏北 (67.5°)",   # 3
+    "正东 (90°)",       # 4
+    "东偏南 (112.5°)",  # 5
+    "东南 (135°)",      # 6
+    "南偏东 (157.5°)",  # 7
+    "正南 (180°)",      # 8
+    "南偏西 (202.5°)",  # 9
+    "西南 (225°)",      # 10
+    "西偏南 (247.5°)",  # 11
+    "正西 (270°)",      # 12
+    "西偏北 (292.5°)",  # 13
+    "西北 (315°)",      # 14
+    "北偏西 (337.5°)"   # 15
+)
 
 
 def calculate_direction_angle(player_pos: Position, target_pos: Position) -> float:
@@ -58,7 +61,7 @@ def calculate_direction_angle(player_pos: Position, target_pos: Position) -> flo
     if angle_deg < 0:
         angle_deg += 360
     
-    logger.debug(f"Direction calculation: dx={dx:.2f}, dz={dz:.2f}, angle={angle_deg:.2f}°")
+    logger.debug("Direction calculation: dx=%.2f, dz=%.2f, angle=%.2f°", dx, dz, angle_deg)
     
     return angle_deg
 
@@ -95,9 +98,10 @@ def angle_to_motor_id(angle: float) -> int:
     angle = angle % 360
     # 每个马达覆盖 22.5 度
     # 使用 int((angle + 11.25) / 22.5) 来实现四舍五入效果
-    motor_id = int((angle + 11.25) / 22.5) % 16
+    # 结果非负，用位与 & 0xF 代替 % 16 完成回绕（16号即0号）
+    motor_id = int((angle + 11.25) / 22.5) & 0xF
     
-    logger.debug(f"Angle {angle:.2f}° mapped to motor {motor_id}")
+    logger.debug("Angle %.2f° mapped to motor %d", angle, motor_id)
     
     return motor_id
 
@@ -112,7 +116,9 @@ def get_motor_direction_description(motor_id: int) -> str:
     Returns:
         方向描述字符串
     """
-    return MOTOR_DIRECTIONS.get(motor_id, f"未知方向 (马达{motor_id})")
+    if 0 <= motor_id < 16:
+        return MOTOR_DIRECTIONS[motor_id]
+    return f"未知方向 (马达{motor_id})"
 
 
 def calculate_motor_for_target(player_pos: Position, target_pos: Position) -> tuple:
@@ -126,17 +132,56 @@ def calculate_motor_for_target(player_pos: Position, target_pos: Position) -> tu
     Returns:
         元组 (motor_id, angle, direction_description)
     """
-    angle = calculate_direction_angle(player_pos, target_pos)
-    motor_id = angle_to_motor_id(angle)
-    direction_desc = get_motor_direction_description(motor_id)
-    
-    logger.info(
-        f"Target direction analysis: angle={angle:.2f}°, "
-        f"motor_id={motor_id}, direction={direction_desc}"
+    # 内联角度计算与马达映射（与calculate_direction_angle、angle_to_motor_id等价），
+    # 省去逐层函数调用及各自的调试日志；atan2结果加360后非负，无需再取模
+    angle = math.degrees(math.atan2(target_pos.x - player_pos.x, target_pos.z - player_pos.z))
+    if angle < 0:
+        angle += 360
+    motor_id = int((angle + 11.25) / 22.5) & 0xF
+    direction_desc = MOTOR_DIRECTIONS[motor_id]
+    
+    # main.py 在上层已以INFO级别输出同样的信息，这里只保留DEBUG级别
+    logger.debug(
+        "Target direction analysis: angle=%.2f°, motor_id=%d, direction=%s",
+        angle, motor_id, direction_desc
     )
     
     return motor_id, angle, direction_desc
 
 
+def calculate_direction_angles(
+    player_pos: Position,
+    target_xs: np.ndarray,
+    target_zs: np.ndarray
+) -> np.ndarray:
+    """
+    批量计算多个目标相对于玩家的水平方向角度（calculate_direction_angle的向量化版本）
+    
+    Args:
+        player_pos: 玩家位置
+        target_xs: 各目标的X坐标数组
+        target_zs: 各目标的Z坐标数组
+    
+    Returns:
+        角度数组（0-360度），0度为正前方（Z+），顺时针递增
+    """
+    angles = np.degrees(np.arctan2(
+        np.asarray(target_xs, dtype=np.float64) - player_pos.x,
+        np.asarray(target_zs, dtype=np.float64) - player_pos.z
+    ))
+    # 无分支地把负角度转换到0-360度范围
+    return angles + np.where(angles < 0, 360.0, 0.0)
 
 
+def angles_to_motor_ids(angles: np.ndarray) -> np.ndarray:
+    """
+    批量将角度映射到马达编号（angle_to_motor_id的向量化版本）
+    
+    Args:
+        angles: 角度数组（0-360度）
+    
+    Returns:
+        马达编号数组（0-15，int32）
+    """
+    angles = np.mod(angles, 360)
+    return ((angles + 11.25) / 22.5).astype(np.int32) & 0xF
@@ -3,7 +3,8 @@ import logging
 import signal
 import sys
 import os
-import time
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -16,9 +17,14 @@ from config import (
     LOG_DATE_FORMAT,
     SERIAL_PORT,
     SERIAL_BAUDRATE,
+    SERIAL_WRITE_TIMEOUT,
+    SERIAL_FRAME_GAP,
     NUM_VIBRATORS,
+    HARDWARE_TEST,
     UDP_HOST,
     UDP_PORT,
+    UDP_RECV_BUFFER_SIZE,
+    UDP_SEND_BUFFER_SIZE,
     VIBRATION_INTENSITY,
     VIBRATION_DURATION,
     VIBRATION_MODE_DRONE,
@@ -36,7 +42,7 @@ from config import (
 )
 
 from threat_analyzer import find_most_threatening_target
-from serial_handler import SerialHandler
+from serial_handler import SerialHandler, VibrationWorker
 from udp_server import UDPServer
 from direction_mapper import calculate_motor_for_target
 from situation_awareness import (
@@ -44,6 +50,7 @@ from situation_awareness import (
     normalize_threat_to_intensity
 )
 from csv_logger import CSVLogger
+from models import TargetType
 
 # 配置日志
 logging.basicConfig(
@@ -54,8 +61,86 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# 日志分隔线
+SEPARATOR = "=" * 60
+SUB_SEPARATOR = "─" * 60
+
+# 距离 → 震动模式查找表，按越过的距离阈值个数索引：
+# 0: 持续震动 (最近)，2: 三连击 (中等)，3: 波浪式 (最远)
+DISTANCE_MODE_TABLE = (0, 2, 3)
+
+# 震动模式名称（按模式编号索引）
+VIBRATION_MODE_NAMES = ("持续震动", "超快脉冲", "三连击", "波浪式")
+
 # 全局变量，用于优雅退出
 running = True
+# 退出事件：供阻塞等待的操作（如硬件测试）在收到中断信号时立即返回
+shutdown_event = threading.Event()
+
+# 最近回合的威胁计算结果缓存（按目标数据内容索引，重传/暂停时的相同数据不重复计算）
+THREAT_CACHE_SIZE = 16
+_threat_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+def _threat_cache_key(game_data) -> tuple:
+    """
+    生成威胁计算结果的缓存键（只包含影响计算结果的数据，不含回合号）
+    
+    Args:
+        game_data: 游戏数据对象
+    
+    Returns:
+        由玩家位置和所有目标数据组成的元组
+    """
+    player_pos = game_data.playerPosition
+    return (
+        (player_pos.x, player_pos.y, player_pos.z),
+        tuple(
+            (
+                t.id, t.type, t.distance, t.angle,
+                t.position.x, t.position.y, t.position.z,
+                t.speed, t.direction,
+                None if t.velocity is None else (t.velocity.x, t.velocity.y, t.velocity.z)
+            )
+            for t in game_data.targets
+        )
+    )
+
+
+def compute_round_threats(game_data):
+    """
+    计算最大威胁目标和16方向威胁度，目标数据与最近某回合完全相同时直接复用缓存结果
+    
+    Args:
+        game_data: 游戏数据对象
+    
+    Returns:
+        元组 (most_threatening, direction_threats)
+    """
+    key = _threat_cache_key(game_data)
+    cached = _threat_cache.get(key)
+    if cached is not None:
+        _threat_cache.move_to_end(key)
+        target_index, direction_threats = cached
+        logger.info("Threat data identical to a recent round, reusing cached result")
+        most_threatening = game_data.targets[target_index] if target_index is not None else None
+        return most_threatening, direction_threats
+    
+    most_threatening = find_most_threatening_target(game_data)
+    direction_threats = calculate_all_directions_threat(game_data)
+    
+    # 按下标缓存目标，命中时返回当前回合中对应的Target对象
+    target_index = None
+    if most_threatening is not None:
+        target_index = next(
+            (i for i, t in enumerate(game_data.targets) if t is most_threatening), None
+        )
+    if most_threatening is None or target_index is not None:
+        _threat_cache[key] = (target_index, direction_threats)
+        if len(_threat_cache) > THREAT_CACHE_SIZE:
+            _threat_cache.popitem(last=False)
+    
+    return most_threatening, direction_threats
 
 
 def get_distance_vibration_mode(distance: float) -> int:
@@ -71,12 +156,64 @@ def get_distance_vibration_mode(distance: float) -> int:
         - 2: 三连击 (DISTANCE_1 <= distance < DISTANCE_2, 中等)
         - 3: 波浪式 (distance >= DISTANCE_2, 最远)
     """
-    if distance < DISTANCE_1:
-        return 0  # 模式0: 持续震动 (最近)
-    elif distance < DISTANCE_2:
-        return 2  # 模式2: 三连击 (中等)
-    else:
-        return 3  # 模式3: 波浪式 (最远)
+    # 越过的距离阈值个数（0/1/2）直接作为查表下标
+    return DISTANCE_MODE_TABLE[(distance >= DISTANCE_1) + (distance >= DISTANCE_2)]
+
+
+def play_situation_awareness_vibration(serial_handler: SerialHandler, intensities: list):
+    """
+    态势感知模式：发送16方向多马达震动（在后台震动线程中执行）
+    
+    Args:
+        serial_handler: 串口处理器
+        intensities: 16个方向的震动强度列表
+    """
+    success = serial_handler.send_multi_vibration(
+        intensities=intensities,
+        duration=VIBRATION_DURATION,
+        mode=0,  # 态势感知使用持续震动模式
+        abort_event=shutdown_event
+    )
+    
+    if not success:
+        logger.error("Failed to send situation awareness vibration")
+
+
+def play_target_vibration(serial_handler: SerialHandler, motor_id: int, distance_mode: int, type_mode: int):
+    """
+    单目标模式：双震动（距离 + 类型），在后台震动线程中执行
+    
+    Args:
+        serial_handler: 串口处理器
+        motor_id: 目标方向对应的马达编号
+        distance_mode: 第一次震动的模式（根据距离）
+        type_mode: 第二次震动的模式（根据敌人类型）
+    """
+    # ===== 第一次震动：根据距离 =====
+    success = serial_handler.send_vibration(
+        motor_id, VIBRATION_INTENSITY, VIBRATION_DURATION, distance_mode,
+        abort_event=shutdown_event
+    )
+    
+    if not success:
+        logger.error("Failed to send first vibration (distance)")
+    
+    # ===== 暂停 3 秒 =====
+    # 暂停在后台震动线程中进行，主循环同时继续接收和处理数据；
+    # 收到退出信号时立即结束等待，不再发送第二次震动
+    logger.info(f"⏸  暂停 {PAUSE_BETWEEN_VIBRATIONS} 秒...")
+    if shutdown_event.wait(PAUSE_BETWEEN_VIBRATIONS):
+        logger.info("Shutdown requested, skipping second vibration")
+        return
+    
+    # ===== 第二次震动：根据敌人类型 =====
+    success = serial_handler.send_vibration(
+        motor_id, VIBRATION_INTENSITY, VIBRATION_DURATION, type_mode,
+        abort_event=shutdown_event
+    )
+    
+    if not success:
+        logger.error("Failed to send second vibration (enemy type)")
 
 
 def signal_handler(sig, frame):
@@ -84,6 +221,7 @@ def signal_handler(sig, frame):
     global running
     logger.info("Received interrupt signal, shutting down...")
     running = False
+    shutdown_event.set()
 
 
 def main():
@@ -106,32 +244,45 @@ def main():
     print(f"UDP配置: {UDP_HOST}:{UDP_PORT}")
     print("=" * 70 + "\n")
     
-    # 初始化UDP服务器
-    udp_server = UDPServer(host=UDP_HOST, port=UDP_PORT)
-    if not udp_server.start():
-        logger.error("Failed to start UDP server, exiting...")
-        sys.exit(1)
-    
     # 初始化串口处理器
-    serial_handler = SerialHandler(port=SERIAL_PORT, baudrate=SERIAL_BAUDRATE)
+    serial_handler = SerialHandler(
+        port=SERIAL_PORT, baudrate=SERIAL_BAUDRATE, write_timeout=SERIAL_WRITE_TIMEOUT,
+        frame_gap=SERIAL_FRAME_GAP
+    )
     if not serial_handler.connect():
         logger.error("Failed to connect to serial port, exiting...")
-        udp_server.stop()
         sys.exit(1)
     
-    # 询问用户是否进行硬件测试
-    print("\n" + "=" * 60)
-    print("🔧 硬件测试选项")
-    print("=" * 60)
-    user_input = input("是否进行硬件测试？(Y/N): ").strip().upper()
+    # 询问用户是否进行硬件测试（在UDP服务器启动前完成，避免等待输入时socket已绑定而积压/丢包）
+    # 优先使用环境变量HW_TEST，仅在未设置且运行于终端时才交互询问
+    user_input = HARDWARE_TEST
+    if not user_input and sys.stdin.isatty():
+        print("\n" + "=" * 60)
+        print("🔧 硬件测试选项")
+        print("=" * 60)
+        user_input = input("是否进行硬件测试？(Y/N): ").strip().upper()
     
     if user_input == 'Y':
         logger.info("User chose to perform hardware test")
-        if not serial_handler.hardware_test(num_vibrators=NUM_VIBRATORS, test_duration=1.0):
+        if not serial_handler.hardware_test(
+            num_vibrators=NUM_VIBRATORS, test_duration=1.0, abort_event=shutdown_event
+        ):
             logger.warning("Hardware test failed, but continuing with main program...")
     else:
         logger.info("User skipped hardware test")
     
+    # 初始化UDP服务器
+    udp_server = UDPServer(
+        host=UDP_HOST,
+        port=UDP_PORT,
+        recv_buffer_size=UDP_RECV_BUFFER_SIZE,
+        send_buffer_size=UDP_SEND_BUFFER_SIZE
+    )
+    if not udp_server.start():
+        logger.error("Failed to start UDP server, exiting...")
+        serial_handler.disconnect()
+        sys.exit(1)
+    
     # 初始化CSV日志记录器
     csv_logger = None
     try:
@@ -147,33 +298,42 @@ def main():
     print("• 默认：单目标模式 - 震动威胁最大的单个敌人方向")
     print("• 特殊信号：收到Unity信号时临时切换到态势感知模式（3秒）")
     print("=" * 60)
+    # 后台震动线程（震动期间的等待不再阻塞UDP接收）
+    vibration_worker = VibrationWorker()
+    
     logger.info("Default mode: Single Target Mode")
     logger.info("System initialized successfully. Waiting for data...")
     
     try:
         while running:
-            # 接收UDP数据
-            game_data = udp_server.receive_data()
+            # 批量接收UDP数据，只处理最新的一条（跳过处理期间积压的过时数据）
+            game_data = udp_server.receive_latest()
             
             if game_data is None:
                 # 超时或接收失败，继续循环
                 continue
             
             # 打印接收到的数据详情
-            logger.info("=" * 60)
-            logger.info(f"Processing received data - Round: {game_data.round}")
-            logger.info(f"Player Position: X={game_data.playerPosition.x:.2f}, Y={game_data.playerPosition.y:.2f}, Z={game_data.playerPosition.z:.2f}")
-            logger.info(f"Total targets: {len(game_data.targets)}")
-            for i, target in enumerate(game_data.targets, 1):
-                velocity_info = f", Velocity={target.velocity:.2f} m/s" if target.velocity is not None else ""
-                direction_info = f", Direction={target.direction:.2f}°" if target.direction is not None else ""
-                logger.info(
-                    f"  Target {i}: ID={target.id}, Type={target.type}, "
-                    f"Distance={target.distance:.2f}, Angle={target.angle:.2f}°, "
-                    f"Position=({target.position.x:.2f}, {target.position.y:.2f}, {target.position.z:.2f})"
-                    f"{velocity_info}{direction_info}"
-                )
-            logger.info("=" * 60)
+            logger.info(SEPARATOR)
+            logger.info("Processing received data - Round: %s", game_data.round)
+            player_pos = game_data.playerPosition
+            logger.info("Player Position: X=%.2f, Y=%.2f, Z=%.2f", player_pos.x, player_pos.y, player_pos.z)
+            logger.info("Total targets: %d", len(game_data.targets))
+            # 逐个目标的详情只在DEBUG级别输出，拼接成一条日志（威胁最大目标的信息在下方以INFO级别输出）
+            if logger.isEnabledFor(logging.DEBUG):
+                lines = []
+                for i, target in enumerate(game_data.targets, 1):
+                    pos = target.position
+                    velocity_info = f", Velocity={target.velocity:.2f} m/s" if target.velocity is not None else ""
+                    direction_info = f", Direction={target.direction:.2f}°" if target.direction is not None else ""
+                    lines.append(
+                        f"  Target {i}: ID={target.id}, Type={target.type}, "
+                        f"Distance={target.distance:.2f}, Angle={target.angle:.2f}°, "
+                        f"Position=({pos.x:.2f}, {pos.y:.2f}, {pos.z:.2f})"
+                        f"{velocity_info}{direction_info}"
+                    )
+                logger.debug("Targets:\n%s", "\n".join(lines))
+            logger.info(SEPARATOR)
             
             # 如果没有目标，跳过
             if not game_data.targets:
@@ -185,20 +345,19 @@ def main():
             
             if not round_exists:
                 # ========== 步骤2：计算威胁数据 ==========
-                logger.info(f"📝 Round {game_data.round} is new, calculating threat data...")
-                most_threatening = find_most_threatening_target(game_data)
-                direction_threats = calculate_all_directions_threat(game_data)
+                logger.info("📝 Round %s is new, calculating threat data...", game_data.round)
+                most_threatening, direction_threats = compute_round_threats(game_data)
                 
-                # ========== 步骤3：写入CSV ==========
+                # ========== 步骤3：写入CSV（后台线程写入，主循环不等待磁盘IO） ==========
                 if csv_logger:
-                    csv_logger.log_round_data(
+                    csv_logger.log_round_data_async(
                         round_number=game_data.round,
                         most_threatening_target=most_threatening,
                         direction_threats=direction_threats
                     )
-                    logger.info(f"✓ Round {game_data.round} data saved to CSV")
+                    logger.info("✓ Round %s data queued for CSV", game_data.round)
             else:
-                logger.info(f"📋 Round {game_data.round} already exists in CSV, skipping calculation and vibration")
+                logger.info("📋 Round %s already exists in CSV, skipping calculation and vibration", game_data.round)
                 continue  # 跳过已处理的 round
             
             # ========== 检查是否为态势感知模式 ==========
@@ -217,74 +376,54 @@ def main():
                 # 转换为列表（按方向ID 0-15 排序）
                 intensities_list = [intensities_dict.get(i, 0) for i in range(16)]
                 
-                # 发送多马达震动信号
-                success = serial_handler.send_multi_vibration(
-                    intensities=intensities_list,
-                    duration=VIBRATION_DURATION,
-                    mode=0  # 态势感知使用持续震动模式
-                )
-                
-                if not success:
-                    logger.error("Failed to send situation awareness vibration")
+                # 发送多马达震动信号（后台线程执行，主循环继续接收数据）
+                vibration_worker.submit(play_situation_awareness_vibration, serial_handler, intensities_list)
             
             else:
                 # 单目标模式：双震动（距离 + 类型）
                 logger.info("🎯 单目标模式 - 双震动")
                 
-                # 计算敌人方向对应的马达编号
+                # 计算敌人方向对应的马达编号（玩家/目标位置对象在本回合内只取一次）
+                target_pos = most_threatening.position
                 motor_id, direction_angle, direction_desc = calculate_motor_for_target(
-                    game_data.playerPosition,
-                    most_threatening.position
+                    player_pos, target_pos
                 )
                 
                 # ===== 第一次震动：根据距离 =====
                 distance = most_threatening.distance
                 distance_mode = get_distance_vibration_mode(distance)
-                distance_mode_name = ["持续震动", "超快脉冲", "三连击", "波浪式"][distance_mode]
+                distance_mode_name = VIBRATION_MODE_NAMES[distance_mode]
                 
-                logger.info("=" * 60)
+                logger.info(SEPARATOR)
                 logger.info("🎯 第一次震动 - 距离反馈")
-                logger.info(f"  Most threatening target: ID={most_threatening.id}, Type={most_threatening.type}")
-                logger.info(f"  Target position: ({most_threatening.position.x:.2f}, {most_threatening.position.y:.2f}, {most_threatening.position.z:.2f})")
-                logger.info(f"  Direction angle: {direction_angle:.2f}°")
-                logger.info(f"  Selected motor: #{motor_id} - {direction_desc}")
-                logger.info("─" * 60)
-                logger.info(f"  距离: {distance:.2f}m")
-                logger.info(f"  震动强度: {VIBRATION_INTENSITY}")
-                logger.info(f"  震动模式: {distance_mode} ({distance_mode_name})")
-                logger.info(f"  持续时间: {VIBRATION_DURATION}s")
-                logger.info("=" * 60)
-                
-                success = serial_handler.send_vibration(
-                    motor_id, VIBRATION_INTENSITY, VIBRATION_DURATION, distance_mode
-                )
-                
-                if not success:
-                    logger.error("Failed to send first vibration (distance)")
-                
-                # ===== 暂停 3 秒 =====
-                logger.info(f"⏸  暂停 {PAUSE_BETWEEN_VIBRATIONS} 秒...")
-                time.sleep(PAUSE_BETWEEN_VIBRATIONS)
+                logger.info("  Most threatening target: ID=%s, Type=%s", most_threatening.id, most_threatening.type)
+                logger.info("  Target position: (%.2f, %.2f, %.2f)", target_pos.x, target_pos.y, target_pos.z)
+                logger.info("  Direction angle: %.2f°", direction_angle)
+                logger.info("  Selected motor: #%d - %s", motor_id, direction_desc)
+                logger.info(SUB_SEPARATOR)
+                logger.info("  距离: %.2fm", distance)
+                logger.info("  震动强度: %s", VIBRATION_INTENSITY)
+                logger.info("  震动模式: %d (%s)", distance_mode, distance_mode_name)
+                logger.info("  持续时间: %ss", VIBRATION_DURATION)
+                logger.info(SEPARATOR)
                 
                 # ===== 第二次震动：根据敌人类型 =====
-                is_drone = most_threatening.type.lower() == "drone"
+                is_drone = most_threatening.kind == TargetType.DRONE
                 type_mode = VIBRATION_MODE_DRONE if is_drone else VIBRATION_MODE_SOLDIER
                 type_mode_name = "持续震动" if is_drone else "超快脉冲"
                 
-                logger.info("=" * 60)
+                logger.info(SEPARATOR)
                 logger.info("🎯 第二次震动 - 敌人类型反馈")
-                logger.info(f"  敌人类型: {most_threatening.type}")
-                logger.info(f"  震动强度: {VIBRATION_INTENSITY}")
-                logger.info(f"  震动模式: {type_mode} ({type_mode_name})")
-                logger.info(f"  持续时间: {VIBRATION_DURATION}s")
-                logger.info("=" * 60)
+                logger.info("  敌人类型: %s", most_threatening.type)
+                logger.info("  震动强度: %s", VIBRATION_INTENSITY)
+                logger.info("  震动模式: %s (%s)", type_mode, type_mode_name)
+                logger.info("  持续时间: %ss", VIBRATION_DURATION)
+                logger.info(SEPARATOR)
                 
-                success = serial_handler.send_vibration(
-                    motor_id, VIBRATION_INTENSITY, VIBRATION_DURATION, type_mode
+                # 双震动序列（含等待时间）交给后台线程执行，主循环继续接收数据
+                vibration_worker.submit(
+                    play_target_vibration, serial_handler, motor_id, distance_mode, type_mode
                 )
-                
-                if not success:
-                    logger.error("Failed to send second vibration (enemy type)")
     
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt received")
@@ -295,6 +434,9 @@ def main():
         logger.info("Cleaning up resources...")
         if csv_logger:
             csv_logger.close()
+        # 结束震动序列中的暂停等待，再等正在执行的震动发送完停止信号后断开串口
+        shutdown_event.set()
+        vibration_worker.stop(timeout=5)
         serial_handler.disconnect()
         udp_server.stop()
         logger.info("System shutdown complete")
@@ -1,10 +1,13 @@
 """数据模型定义模块"""
 from dataclasses import dataclass, field
-from typing import List, Optional
+from enum import IntEnum
+from typing import List, Optional, Tuple
 import math
 
+import numpy as np
 
-@dataclass
+
+@dataclass(slots=True)
 class Position:
     """位置坐标"""
     x: float
@@ -12,7 +15,41 @@ class Position:
     z: float
 
 
-@dataclass
+class TargetType(IntEnum):
+    """目标类型（解析时确定一次，之后按整数比较）"""
+    SOLDIER = 0
+    DRONE = 1
+    TANK = 2
+
+
+# 常见类型字符串 → TargetType，未命中时按小写再查，仍未知的按士兵处理
+_TYPE_MAP = {
+    "Soldier": TargetType.SOLDIER,
+    "soldier": TargetType.SOLDIER,
+    "Drone": TargetType.DRONE,
+    "drone": TargetType.DRONE,
+    "Tank": TargetType.TANK,
+    "tank": TargetType.TANK,
+}
+
+
+def parse_target_type(type_name: str) -> TargetType:
+    """
+    将目标类型字符串解析为TargetType
+    
+    Args:
+        type_name: 类型字符串（如 "Drone"、"Soldier"，大小写不敏感）
+    
+    Returns:
+        对应的TargetType，未知类型返回TargetType.SOLDIER
+    """
+    kind = _TYPE_MAP.get(type_name)
+    if kind is None:
+        kind = _TYPE_MAP.get(type_name.lower(), TargetType.SOLDIER)
+    return kind
+
+
+@dataclass(slots=True)
 class Target:
     """敌人目标信息"""
     id: int
@@ -23,6 +60,10 @@ class Target:
     speed: float = 0.0          # 移动速度 (m/s)
     direction: float = 0.0      # 移动方向 (0-360度)
     velocity: Position = None   # 速度矢量（可选）
+    kind: TargetType = field(init=False, repr=False, compare=False)  # 解析后的类型，构造时计算一次
+
+    def __post_init__(self):
+        self.kind = parse_target_type(self.type)
 
 
 @dataclass
@@ -32,6 +73,77 @@ class GameData:
     playerPosition: Position
     targets: List[Target]
     situationAwareness: bool = False  # 是否启用态势感知模式
+    # 目标数据的按列（SoA）缓存，由target_arrays()/target_attributes()首次调用时构建
+    _arrays: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _attributes: Optional[tuple] = field(default=None, init=False, repr=False, compare=False)
+    _targets_by_id: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
+
+    def target_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        以按列（Struct-of-Arrays）形式返回所有目标的数值数据，供向量化计算一次处理全部目标
+        
+        首次调用时构建并缓存；构建后不应再修改targets列表
+        
+        Returns:
+            元组 (positions, distances, angles)：
+            - positions: (N, 3) float64数组，每行为目标的 (x, y, z)
+            - distances: (N,) float64数组，目标距离
+            - angles: (N,) float64数组，目标角度
+        """
+        if self._arrays is None:
+            n = len(self.targets)
+            positions = np.empty((n, 3), dtype=np.float64)
+            for i, target in enumerate(self.targets):
+                pos = target.position
+                positions[i] = (pos.x, pos.y, pos.z)
+            distances = np.fromiter((t.distance for t in self.targets), dtype=np.float64, count=n)
+            angles = np.fromiter((t.angle for t in self.targets), dtype=np.float64, count=n)
+            self._arrays = (positions, distances, angles)
+        return self._arrays
+
+    def target_attributes(self) -> Tuple[list, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        以按列形式返回所有目标的ID、类型和运动数据（与target_arrays()配套）
+        
+        首次调用时构建并缓存；构建后不应再修改targets列表
+        
+        Returns:
+            元组 (ids, kinds, speeds, directions)：
+            - ids: 长度为N的列表，目标ID（保持原始类型，数据源中的ID不一定是整数）
+            - kinds: (N,) int8数组，TargetType取值
+            - speeds: (N,) float64数组，移动速度，缺失记为NaN
+            - directions: (N,) float64数组，移动方向（度），缺失记为NaN
+        """
+        if self._attributes is None:
+            n = len(self.targets)
+            nan = float('nan')
+            ids = [t.id for t in self.targets]
+            kinds = np.fromiter((t.kind for t in self.targets), dtype=np.int8, count=n)
+            speeds = np.fromiter(
+                (nan if t.speed is None else t.speed for t in self.targets), dtype=np.float64, count=n
+            )
+            directions = np.fromiter(
+                (nan if t.direction is None else t.direction for t in self.targets), dtype=np.float64, count=n
+            )
+            self._attributes = (ids, kinds, speeds, directions)
+        return self._attributes
+
+    def target_by_id(self, target_id) -> Optional[Target]:
+        """
+        按ID查找目标（首次调用时建立ID索引并缓存；构建后不应再修改targets列表）
+        
+        Args:
+            target_id: 目标ID
+        
+        Returns:
+            对应的Target对象，ID重复时返回列表中的第一个，找不到返回None
+        """
+        if self._targets_by_id is None:
+            targets_by_id = {}
+            for target in self.targets:
+                targets_by_id.setdefault(target.id, target)
+            self._targets_by_id = targets_by_id
+        return self._targets_by_id.get(target_id)
 
     @classmethod
     def from_dict(cls, data: dict) -> 'GameData':
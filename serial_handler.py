@@ -1,25 +1,81 @@
 """串口通信模块"""
 import logging
 import serial
+import threading
 import time
-from typing import Optional
+from typing import Callable, Optional
 
 logger = logging.getLogger(__name__)
 
+# 停止信号帧（格式：stop）
+STOP_FRAME = b"stop\n"
+
+# 预编码的启动信号帧（格式：motorID,intensity,mode），覆盖16个马达 × 常用强度 × 4种模式，
+# 模块导入时构建一次、所有实例共享；发送时直接查表，不必每次格式化字符串再编码（内容为纯ASCII）
+START_FRAMES = {
+    (motor_id, intensity, mode): f"{motor_id},{intensity},{mode}\n".encode('ascii')
+    for motor_id in range(16)
+    for intensity in (200, 255)
+    for mode in range(4)
+}
+
+def _wait(duration: float, abort_event: Optional[threading.Event]) -> bool:
+    """
+    等待指定时长，提供中止事件时可被提前唤醒
+    
+    Args:
+        duration: 等待时长（秒）
+        abort_event: 中止事件，为None时等同于time.sleep
+    
+    Returns:
+        是否因中止事件而提前结束
+    """
+    if abort_event is None:
+        time.sleep(duration)
+        return False
+    return abort_event.wait(duration)
+
+
+# 启动信号帧各字段的预编码字节（态势感知模式的强度为0-255任意值，不在START_FRAMES中时按字段拼接）
+MOTOR_ID_BYTES = tuple(f"{motor_id},".encode('ascii') for motor_id in range(16))
+INTENSITY_BYTES = tuple(f"{intensity},".encode('ascii') for intensity in range(256))
+MODE_BYTES = tuple(f"{mode}\n".encode('ascii') for mode in range(4))
+
+# 态势感知模式的方向描述（按马达编号0-15排列）
+MULTI_DIRECTION_NAMES = (
+    "正北(0)", "北偏东(1)", "东北(2)", "东偏北(3)",
+    "正东(4)", "东偏南(5)", "东南(6)", "南偏东(7)",
+    "正南(8)", "南偏西(9)", "西南(10)", "西偏南(11)",
+    "正西(12)", "西偏北(13)", "西北(14)", "北偏西(15)"
+)
+
 
 class SerialHandler:
     """串口通信处理器"""
     
-    def __init__(self, port: str = "COM7", baudrate: int = 9600):
+    def __init__(
+        self,
+        port: str = "COM7",
+        baudrate: int = 9600,
+        write_timeout: Optional[float] = 1.0,
+        frame_gap: float = 0.05
+    ):
         """
         初始化串口连接
         
         Args:
             port: 串口名称，默认COM7
             baudrate: 波特率，默认9600
+            write_timeout: 写超时（秒），默认1秒；设备端缓冲区满时写操作最多阻塞这么久，
+                           超时抛出SerialTimeoutException（由各发送方法记录并返回失败）。
+                           None表示一直阻塞
+            frame_gap: 态势感知模式下相邻启动信号帧之间的间隔（秒），默认50毫秒；
+                       0表示所有启动信号拼接后一次写出
         """
         self.port = port
         self.baudrate = baudrate
+        self.write_timeout = write_timeout
+        self.frame_gap = frame_gap
         self.serial_connection: Optional[serial.Serial] = None
     
     def connect(self) -> bool:
@@ -34,13 +90,31 @@ class SerialHandler:
             self.serial_connection = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
-                timeout=1
+                timeout=1,
+                write_timeout=self.write_timeout,
+                xonxoff=False,  # 命令为短ASCII帧，不使用软件流控
+                rtscts=False,
+                dsrdtr=False
             )
+            # Windows驱动默认发送缓冲区较小，加大以免批量写入的多帧数据被拆分
+            if hasattr(self.serial_connection, 'set_buffer_size'):
+                try:
+                    self.serial_connection.set_buffer_size(rx_size=4096, tx_size=4096)
+                except Exception as e:
+                    logger.warning(f"Failed to set serial buffer size: {e}")
+            # Linux USB串口（如FTDI）默认16ms延迟定时器，短命令帧会被攒批延迟发送；开启低延迟模式
+            if hasattr(self.serial_connection, 'set_low_latency_mode'):
+                try:
+                    self.serial_connection.set_low_latency_mode(True)
+                except Exception as e:
+                    logger.warning(f"Failed to enable serial low latency mode: {e}")
+            
             logger.info("=" * 60)
             logger.info(f"✓ Serial port connection successful!")
             logger.info(f"  Port: {self.port}")
             logger.info(f"  Baudrate: {self.baudrate}")
             logger.info(f"  Timeout: 1 second")
+            logger.info(f"  Write timeout: {self.write_timeout} seconds")
             logger.info("=" * 60)
             return True
         except serial.SerialException as e:
@@ -50,13 +124,39 @@ class SerialHandler:
             logger.error(f"Unexpected error connecting to serial port: {e}")
             return False
     
+    def _start_frame(self, vibrator_id: int, intensity: int, mode: int) -> bytes:
+        """
+        获取启动信号帧（优先查预编码表，未命中时用各字段的预编码字节拼接，超出范围时才格式化编码）
+        
+        Args:
+            vibrator_id: 振动器编号
+            intensity: 震动强度
+            mode: 震动模式
+        
+        Returns:
+            编码后的帧字节串
+        """
+        frame = START_FRAMES.get((vibrator_id, intensity, mode))
+        if frame is not None:
+            return frame
+        if 0 <= vibrator_id < 16 and 0 <= intensity < 256 and 0 <= mode < 4:
+            return MOTOR_ID_BYTES[vibrator_id] + INTENSITY_BYTES[intensity] + MODE_BYTES[mode]
+        return f"{vibrator_id},{intensity},{mode}\n".encode('ascii')
+    
     def disconnect(self):
         """断开串口连接"""
         if self.serial_connection and self.serial_connection.is_open:
             self.serial_connection.close()
             logger.info(f"Disconnected from serial port {self.port}")
     
-    def send_vibration(self, vibrator_id: int, intensity: int, duration: float = 0.5, mode: int = 0) -> bool:
+    def send_vibration(
+        self,
+        vibrator_id: int,
+        intensity: int,
+        duration: float = 0.5,
+        mode: int = 0,
+        abort_event: Optional[threading.Event] = None
+    ) -> bool:
         """
         发送震动信号并控制震动时长
         
@@ -69,6 +169,7 @@ class SerialHandler:
                   1=超快脉冲 (密集蜂鸣)
                   2=三连击 (敲门效果)
                   3=波浪式 (渐强渐弱)
+            abort_event: 中止事件（可选），震动期间被置位时提前发送停止信号
         
         Returns:
             发送是否成功
@@ -97,25 +198,24 @@ class SerialHandler:
         
         try:
             # 第一步：发送震动信号（格式：motorID,intensity,mode）
-            start_message = f"{vibrator_id},{intensity},{mode}\n"
-            bytes_written = self.serial_connection.write(start_message.encode('utf-8'))
+            start_frame = self._start_frame(vibrator_id, intensity, mode)
+            bytes_written = self.serial_connection.write(start_frame)
             logger.info("─" * 60)
             logger.info(f"✓ Vibration START signal sent to serial port {self.port}")
             logger.info(f"  Vibrator ID: {vibrator_id}")
             logger.info(f"  Intensity: {intensity} {'(HIGH THREAT)' if intensity == 255 else '(LOW THREAT)'}")
             logger.info(f"  Mode: {mode} ({mode_descriptions[mode]})")
-            logger.info(f"  Message: {start_message.strip()}")
+            logger.info("  Message: %d,%d,%d", vibrator_id, intensity, mode)
             logger.info(f"  Bytes written: {bytes_written}")
             logger.info(f"  Duration: {duration} seconds")
             
-            # 第二步：等待指定时长
-            time.sleep(duration)
+            # 第二步：等待指定时长（中止事件被置位时提前结束，仍会发送停止信号）
+            _wait(duration, abort_event)
             
             # 第三步：发送停止信号（格式：stop）
-            stop_message = "stop\n"
-            bytes_written_stop = self.serial_connection.write(stop_message.encode('utf-8'))
+            bytes_written_stop = self.serial_connection.write(STOP_FRAME)
             logger.info(f"✓ Vibration STOP signal sent")
-            logger.info(f"  Message: {stop_message.strip()}")
+            logger.info("  Message: stop")
             logger.info(f"  Bytes written: {bytes_written_stop}")
             logger.info("─" * 60)
             return True
@@ -123,7 +223,13 @@ class SerialHandler:
             logger.error(f"Failed to send vibration signal: {e}")
             return False
     
-    def send_multi_vibration(self, intensities: list, duration: float = 3.0, mode: int = 0) -> bool:
+    def send_multi_vibration(
+        self,
+        intensities: list,
+        duration: float = 3.0,
+        mode: int = 0,
+        abort_event: Optional[threading.Event] = None
+    ) -> bool:
         """
         同时发送多个马达的震动信号（用于态势感知模式）
         
@@ -131,6 +237,7 @@ class SerialHandler:
             intensities: 16个马达的震动强度列表（0-255）
             duration: 震动持续时间（秒），默认3.0秒
             mode: 震动模式（0-3），默认0
+            abort_event: 中止事件（可选），震动期间被置位时提前发送停止信号
         
         Returns:
             发送是否成功
@@ -143,14 +250,6 @@ class SerialHandler:
             logger.error(f"Invalid intensities length: {len(intensities)}, expected 16")
             return False
         
-        # 方向描述（16个）
-        directions = [
-            "正北(0)", "北偏东(1)", "东北(2)", "东偏北(3)",
-            "正东(4)", "东偏南(5)", "东南(6)", "南偏东(7)",
-            "正南(8)", "南偏西(9)", "西南(10)", "西偏南(11)",
-            "正西(12)", "西偏北(13)", "西北(14)", "北偏西(15)"
-        ]
-        
         # 记录已启动的马达，确保停止时能正确记录
         started_motors = []
         
@@ -160,32 +259,49 @@ class SerialHandler:
             
             # 第一步：先停止所有马达，确保初始状态干净（解决残留震动问题）
             logger.info("🛑 预先停止所有马达...")
-            stop_message = "stop\n"
-            self.serial_connection.write(stop_message.encode('utf-8'))
+            self.serial_connection.write(STOP_FRAME)
             self.serial_connection.flush()
             time.sleep(0.2)  # 等待所有马达停止
             logger.info("✓ 所有马达已停止（发送 stop 命令）")
             
             logger.info(f"  震动模式: {mode}")
             logger.info(f"  持续时间: {duration}s")
-            logger.info("  各方向震动强度:")
             
-            # 第二步：发送所有16个马达的启动信号（格式：motorID,intensity,mode）
+            # 第二步：发送所有需要震动的马达的启动信号（格式：motorID,intensity,mode）
+            frames = []
             for motor_id in range(16):
                 intensity = int(intensities[motor_id])
                 if intensity > 0:
-                    start_message = f"{motor_id},{intensity},{mode}\n"
-                    bytes_written = self.serial_connection.write(start_message.encode('utf-8'))
-                    self.serial_connection.flush()  # 每个启动信号后立即刷新
+                    frames.append(self._start_frame(motor_id, intensity, mode))
                     started_motors.append(motor_id)
-                    logger.info(f"    {directions[motor_id]}: 强度 {intensity} (已发送 {bytes_written} 字节)")
-                    time.sleep(0.05)  # 每个启动信号之间延迟50毫秒
+            
+            if frames:
+                if self.frame_gap > 0:
+                    # 逐帧写出并间隔frame_gap，下位机接收缓冲区较小，连续突发的多帧数据可能溢出
+                    bytes_written = 0
+                    for frame in frames:
+                        bytes_written += self.serial_connection.write(frame)
+                        self.serial_connection.flush()
+                        if _wait(self.frame_gap, abort_event):
+                            break
+                else:
+                    # 拼接后一次写出，由串口驱动按波特率连续发送
+                    bytes_written = self.serial_connection.write(b"".join(frames))
+                    self.serial_connection.flush()
+                # 写出后再输出各方向强度（合并为一条日志），不在组帧过程中穿插日志调用
+                logger.info(
+                    "  各方向震动强度:\n%s",
+                    "\n".join(
+                        f"    {MULTI_DIRECTION_NAMES[m]}: 强度 {int(intensities[m])}" for m in started_motors
+                    )
+                )
+                logger.info(f"  启动信号已发送（{len(frames)} 帧，{bytes_written} 字节）")
             
             logger.info("─" * 60)
             logger.info(f"✓ 已启动 {len(started_motors)} 个马达的震动")
             
-            # 等待指定时长
-            time.sleep(duration)
+            # 等待指定时长（中止事件被置位时提前结束，finally中仍会发送停止信号）
+            _wait(duration, abort_event)
             
         except Exception as e:
             logger.error(f"Error during vibration period: {e}")
@@ -203,10 +319,9 @@ class SerialHandler:
                 stopped_count = len(started_motors)
                 
                 for attempt in range(3):  # 重复发送3次
-                    stop_message = "stop\n"
-                    bytes_written = self.serial_connection.write(stop_message.encode('utf-8'))
+                    bytes_written = self.serial_connection.write(STOP_FRAME)
                     self.serial_connection.flush()  # 立即刷新
-                    logger.info(f"  第 {attempt + 1} 次发送停止信号: {stop_message.strip()} ({bytes_written} 字节)")
+                    logger.info(f"  第 {attempt + 1} 次发送停止信号: stop ({bytes_written} 字节)")
                     
                     # 每次停止命令之间等待
                     if attempt < 2:
@@ -233,17 +348,27 @@ class SerialHandler:
         """检查串口是否已连接"""
         return self.serial_connection is not None and self.serial_connection.is_open
 
-    def hardware_test(self, num_vibrators: int = 16, test_duration: float = 1.0, pause_duration: float = 1.0) -> bool:
+    def hardware_test(
+        self,
+        num_vibrators: int = 16,
+        test_duration: float = 1.0,
+        pause_duration: float = 1.0,
+        abort_event: Optional[threading.Event] = None
+    ) -> bool:
         """
         硬件测试：依次测试所有振动器的所有模式
         
+        所有启动/停止帧的发送时刻在开始前一次性按单调时钟排好，逐帧等到期后发送，
+        间隔不会因日志输出等开销逐次累积；等待期间abort_event被置位时立即停止测试
+        
         Args:
             num_vibrators: 振动器数量，默认16个（编号0-15）
             test_duration: 每种模式的测试时长（秒），默认1秒
             pause_duration: 每次测试之间的间隔时长（秒），默认1秒
+            abort_event: 中止事件（可选），置位后发送停止信号并提前结束测试
         
         Returns:
-            测试是否成功完成
+            测试是否成功完成（被中止时返回False）
         """
         if not self.serial_connection or not self.serial_connection.is_open:
             logger.error("Serial port is not connected, cannot perform hardware test")
@@ -266,30 +391,38 @@ class SerialHandler:
         logger.info(f"  Intensity: 255 (HIGH)")
         logger.info("=" * 60)
         
+        if abort_event is None:
+            abort_event = threading.Event()
+        
+        # 预先计算发送计划：(相对开始时刻, 信号帧, 日志内容)
+        schedule = []
+        offset = 0.0
+        for vibrator_id in range(num_vibrators):
+            for mode in range(4):  # 测试4种模式：0, 1, 2, 3
+                # 启动震动（格式：motorID,intensity,mode）
+                schedule.append((
+                    offset,
+                    self._start_frame(vibrator_id, 255, mode),
+                    f"✓ Vibrator {vibrator_id} Mode {mode} ({mode_descriptions[mode]}): START - {vibrator_id},255,{mode}"
+                ))
+                # 停止震动（格式：stop），之后间隔pause_duration再开始下一项测试
+                schedule.append((
+                    offset + test_duration,
+                    STOP_FRAME,
+                    f"✓ Vibrator {vibrator_id} Mode {mode}: STOP - stop"
+                ))
+                offset += test_duration + pause_duration
+        
         try:
-            for vibrator_id in range(num_vibrators):
-                logger.info(f"\n{'─' * 60}")
-                logger.info(f"📍 Testing Vibrator #{vibrator_id}")
-                logger.info(f"{'─' * 60}")
-                
-                for mode in range(4):  # 测试4种模式：0, 1, 2, 3
-                    # 启动震动（格式：motorID,intensity,mode）
-                    start_message = f"{vibrator_id},{255},{mode}\n"
-                    self.serial_connection.write(start_message.encode('utf-8'))
-                    logger.info(f"✓ Vibrator {vibrator_id} Mode {mode} ({mode_descriptions[mode]}): START - {start_message.strip()}")
-                    
-                    # 等待指定时长
-                    time.sleep(test_duration)
-                    
-                    # 停止震动（格式：stop）
-                    stop_message = "stop\n"
-                    self.serial_connection.write(stop_message.encode('utf-8'))
-                    logger.info(f"✓ Vibrator {vibrator_id} Mode {mode}: STOP - {stop_message.strip()}")
-                    
-                    # 间隔时长（除非是最后一个测试）
-                    if not (vibrator_id == num_vibrators - 1 and mode == 3):
-                        logger.info(f"⏸  Pausing {pause_duration}s...")
-                        time.sleep(pause_duration)
+            start_time = time.monotonic()
+            for frame_offset, frame, message in schedule:
+                # 等到该帧的计划时刻；中止事件被置位时wait立即返回True
+                if abort_event.wait(max(0.0, start_time + frame_offset - time.monotonic())):
+                    self.serial_connection.write(STOP_FRAME)
+                    logger.warning("⚠ Hardware test aborted, stop signal sent")
+                    return False
+                self.serial_connection.write(frame)
+                logger.info(message)
             
             logger.info("\n" + "=" * 60)
             logger.info("✅ Hardware test completed successfully!")
@@ -301,3 +434,67 @@ class SerialHandler:
             logger.error(f"❌ Hardware test failed: {e}")
             return False
 
+
+class VibrationWorker:
+    """
+    后台震动执行线程
+    
+    震动序列（启动 → 等待duration → 停止）中的sleep在独立线程中执行，
+    主循环提交后立即返回继续接收UDP数据。同一时间只执行一个序列；
+    执行期间新提交的序列只保留最新的一个，过时的等待序列会被替换丢弃。
+    """
+    
+    def __init__(self):
+        """启动后台震动线程"""
+        self._cond = threading.Condition()
+        self._pending: Optional[tuple] = None  # 等待执行的最新序列 (func, args, kwargs)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="vibration-worker", daemon=True)
+        self._thread.start()
+    
+    def submit(self, func: Callable, *args, **kwargs):
+        """
+        提交一个震动序列到后台线程执行
+        
+        Args:
+            func: 执行震动序列的函数（如 SerialHandler.send_vibration）
+            *args: 传给func的位置参数
+            **kwargs: 传给func的关键字参数
+        """
+        with self._cond:
+            if not self._running:
+                logger.warning("Vibration worker is stopped, ignoring vibration request")
+                return
+            if self._pending is not None:
+                logger.info("Previous vibration still pending, replaced by the latest one")
+            self._pending = (func, args, kwargs)
+            self._cond.notify()
+    
+    def _run(self):
+        """后台线程主循环：取出最新的等待序列并执行"""
+        while True:
+            with self._cond:
+                while self._pending is None and self._running:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                func, args, kwargs = self._pending
+                self._pending = None
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Vibration sequence failed: {e}")
+    
+    def stop(self, timeout: Optional[float] = None):
+        """
+        停止后台线程：丢弃尚未开始的序列，等待正在执行的序列完成（确保停止信号已发送）
+        
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+        """
+        with self._cond:
+            self._running = False
+            self._pending = None
+            self._cond.notify()
+        self._thread.join(timeout)
+
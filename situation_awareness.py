@@ -1,9 +1,25 @@
 """态势感知模块 - 计算十六个方向的威胁度"""
 import math
 import logging
-from typing import Dict, Tuple, List
-from models import Target, GameData, Position
-from direction_mapper import calculate_direction_angle, angle_to_motor_id
+from typing import Dict, Tuple, List, Optional
+
+import numpy as np
+
+from models import Target, GameData, Position, TargetType
+from direction_mapper import (
+    calculate_direction_angle,
+    calculate_direction_angles,
+    angles_to_motor_ids,
+)
+
+try:
+    from numba import njit  # 可选：JIT编译数值内核
+except ImportError:
+    def njit(*args, **kwargs):
+        """numba不可用时的空装饰器，直接返回原函数"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
 
 logger = logging.getLogger(__name__)
 
@@ -26,83 +42,73 @@ except ImportError:
     ifs_adapter_for_direction = None
     logger.warning("IFS module not available, using simple algorithm for direction threats")
 
-# 方向角度范围（每个方向覆盖22.5度）
-DIRECTION_RANGES = {
-    0: (348.75, 11.25),    # 正北 (0° ±11.25°)
-    1: (11.25, 33.75),     # 北偏东 (22.5° ±11.25°)
-    2: (33.75, 56.25),     # 东北 (45° ±11.25°)
-    3: (56.25, 78.75),     # 东偏北 (67.5° ±11.25°)
-    4: (78.75, 101.25),    # 正东 (90° ±11.25°)
-    5: (101.25, 123.75),   # 东偏南 (112.5° ±11.25°)
-    6: (123.75, 146.25),   # 东南 (135° ±11.25°)
-    7: (146.25, 168.75),   # 南偏东 (157.5° ±11.25°)
-    8: (168.75, 191.25),   # 正南 (180° ±11.25°)
-    9: (191.25, 213.75),   # 南偏西 (202.5° ±11.25°)
-    10: (213.75, 236.25),  # 西南 (225° ±11.25°)
-    11: (236.25, 258.75),  # 西偏南 (247.5° ±11.25°)
-    12: (258.75, 281.25),  # 正西 (270° ±11.25°)
-    13: (281.25, 303.75),  # 西偏北 (292.5° ±11.25°)
-    14: (303.75, 326.25),  # 西北 (315° ±11.25°)
-    15: (326.25, 348.75)   # 北偏西 (337.5° ±11.25°)
-}
+# 方向名称（按方向ID索引）
+DIRECTION_NAMES = (
+    "正北", "北偏东", "东北", "东偏北",
+    "正东", "东偏南", "东南", "南偏东",
+    "正南", "南偏西", "西南", "西偏南",
+    "正西", "西偏北", "西北", "北偏西"
+)
 
-# 类型威胁因子
+# 类型威胁因子（按Target.kind索引，类型在构造Target时已解析，不再按字符串查表）
 TYPE_THREAT_FACTOR = {
-    "Tank": 2.0,
-    "tank": 2.0,
-    "Soldier": 1.0,
-    "soldier": 1.0
+    TargetType.SOLDIER: 1.0,
+    TargetType.DRONE: 1.0,
+    TargetType.TANK: 2.0
 }
+# 按TargetType取值索引的类型因子表，供批量计算直接查表
+_TYPE_THREAT_FACTORS = np.array([TYPE_THREAT_FACTOR[kind] for kind in TargetType], dtype=np.float64)
 
 # 最大速度（用于归一化速度因子，单位：米/秒）
 MAX_VELOCITY = 20.0
 
 
-def normalize_angle(angle: float) -> float:
+@njit(cache=True)
+def _accumulate_direction_threats(motor_ids: np.ndarray, scores: np.ndarray):
     """
-    将角度归一化到0-360度范围
+    按方向累加各目标威胁度并乘以数量因子（16个方向）
     
     Args:
-        angle: 角度（度）
+        motor_ids: 各目标所在方向ID数组（0-15）
+        scores: 各目标威胁度数组，与motor_ids一一对应
     
     Returns:
-        归一化后的角度（0-360度）
+        元组 (最终威胁度, 威胁度总和, 目标数量)，均为长度16的数组
     """
-    while angle < 0:
-        angle += 360
-    while angle >= 360:
-        angle -= 360
-    return angle
+    totals = np.zeros(16)
+    counts = np.zeros(16, dtype=np.int64)
+    for i in range(motor_ids.shape[0]):
+        direction_id = motor_ids[i]
+        totals[direction_id] += scores[i]
+        counts[direction_id] += 1
+    
+    # 数量因子：同一方向的敌人越多，威胁度越高（但不是线性增长），最多5个敌人时达到2.0倍
+    finals = np.empty(16)
+    for direction_id in range(16):
+        finals[direction_id] = totals[direction_id] * (1.0 + 0.2 * min(counts[direction_id], 5))
+    return finals, totals, counts
 
 
-def is_angle_in_range(angle: float, range_start: float, range_end: float) -> bool:
+def normalize_angle(angle: float) -> float:
     """
-    判断角度是否在指定范围内（考虑跨越0度的情况）
+    将角度归一化到0-360度范围
     
     Args:
-        angle: 要判断的角度（0-360度）
-        range_start: 范围起始角度
-        range_end: 范围结束角度
+        angle: 角度（度）
     
     Returns:
-        是否在范围内
+        归一化后的角度（0-360度）
     """
-    angle = normalize_angle(angle)
-    range_start = normalize_angle(range_start)
-    range_end = normalize_angle(range_end)
-    
-    if range_start <= range_end:
-        # 正常情况，不跨越0度
-        return range_start <= angle < range_end
-    else:
-        # 跨越0度的情况（如337.5-22.5）
-        return angle >= range_start or angle < range_end
+    # 一次取模（Python的%对正模数总返回非负结果）；极小的负数取模后会舍入为360.0，需回绕到0
+    angle = angle % 360.0
+    return angle if angle < 360.0 else 0.0
 
 
 def calculate_target_threat_score_simple(
     target: Target,
     player_pos: Position,
-    direction_angle: float
+    direction_angle: float,
+    target_angle: Optional[float] = None
 ) -> float:
     """
     使用简单算法计算单个目标对特定方向的威胁度（降级方案）
@@ -111,6 +117,7 @@ def calculate_target_threat_score_simple(
         target: 目标对象
         player_pos: 玩家位置
         direction_angle: 目标方向的角度（0-360度）
+        target_angle: 目标相对于玩家的方向角度（可选），调用方已计算时传入以免重复计算
     
     Returns:
         威胁度分数
@@ -119,7 +126,8 @@ def calculate_target_threat_score_simple(
     distance_factor = 1.0 / (target.distance + 1)
     
     # 2. 角度因子：计算目标相对于该方向的角度偏移
-    target_angle = calculate_direction_angle(player_pos, target.position)
+    if target_angle is None:
+        target_angle = calculate_direction_angle(player_pos, target.position)
     angle_offset = abs(target_angle - direction_angle)
     # 考虑最短角度差（可能跨越0度）
     if angle_offset > 180:
@@ -127,7 +135,7 @@ def calculate_target_threat_score_simple(
     angle_factor = 1.0 / (angle_offset + 1)
     
     # 3. 类型因子
-    type_factor = TYPE_THREAT_FACTOR.get(target.type, 1.0)
+    type_factor = TYPE_THREAT_FACTOR[target.kind]
     
     # 4. 速度因子：速度越快威胁越大（如果有速度信息）
     velocity_factor = 1.0
@@ -160,19 +168,125 @@ def calculate_target_threat_score_simple(
     threat_score = distance_factor * angle_factor * type_factor * velocity_factor * movement_factor
     
     logger.debug(
-        f"Target {target.id} ({target.type}) threat to direction {direction_angle:.1f}°: "
-        f"distance={target.distance:.2f}, angle_offset={angle_offset:.1f}°, "
-        f"velocity={target.velocity or 'N/A'}, movement_factor={movement_factor:.2f}, "
-        f"threat_score={threat_score:.4f}"
+        "Target %s (%s) threat to direction %.1f°: distance=%.2f, angle_offset=%.1f°, "
+        "velocity=%s, movement_factor=%.2f, threat_score=%.4f",
+        target.id, target.type, direction_angle, target.distance, angle_offset,
+        target.velocity or 'N/A', movement_factor, threat_score
     )
     
     return threat_score
 
 
+@njit(cache=True)
+def _simple_threat_kernel(
+    distances: np.ndarray,
+    target_angles: np.ndarray,
+    direction_angles: np.ndarray,
+    type_factors: np.ndarray,
+    velocities: np.ndarray,
+    movement_angles: np.ndarray
+):
+    """
+    简单算法的威胁度数值内核（与calculate_target_threat_score_simple的公式一致）
+    
+    Args:
+        distances: 各目标距离
+        target_angles: 各目标相对于玩家的方向角度（0-360度）
+        direction_angles: 各目标所在方向的中心角度
+        type_factors: 各目标类型因子
+        velocities: 各目标速度（无速度信息时为0）
+        movement_angles: 各目标移动方向（度）
+    
+    Returns:
+        元组 (威胁度, 角度偏移, 移动方向因子)，均为与输入等长的数组
+    """
+    # 1. 距离因子
+    distance_factor = 1.0 / (distances + 1)
+    
+    # 2. 角度因子：目标相对于所在方向中心的最短角度差
+    angle_offset = np.abs(target_angles - direction_angles)
+    angle_offset = np.where(angle_offset > 180, 360 - angle_offset, angle_offset)
+    angle_factor = 1.0 / (angle_offset + 1)
+    
+    # 3. 速度因子
+    moving = velocities > 0
+    ones = np.ones_like(velocities)
+    velocity_factor = np.where(moving, 0.5 + 0.5 * np.minimum(velocities / MAX_VELOCITY, 1.0), ones)
+    
+    # 4. 移动方向因子：朝向玩家移动时1.0-1.5，远离时0.8，未移动时1.0
+    angle_diff = np.abs(movement_angles % 360.0 - target_angles)
+    angle_diff = np.where(angle_diff > 180, 360 - angle_diff, angle_diff)
+    movement_factor = np.where(
+        moving,
+        np.where(angle_diff < 90, 1.0 + 0.5 * (1.0 - angle_diff / 90.0), np.full_like(angle_diff, 0.8)),
+        ones
+    )
+    
+    threat_scores = distance_factor * angle_factor * type_factors * velocity_factor * movement_factor
+    return threat_scores, angle_offset, movement_factor
+
+
+def calculate_target_threat_scores_simple(
+    game_data: GameData,
+    target_motor_ids: np.ndarray,
+    target_angles: np.ndarray
+) -> np.ndarray:
+    """
+    使用简单算法批量计算所有目标对其所在方向的威胁度（calculate_target_threat_score_simple的向量化版本）
+    
+    Args:
+        game_data: 游戏数据对象
+        target_motor_ids: 各目标所在方向ID数组（0-15）
+        target_angles: 各目标相对于玩家的方向角度数组（0-360度）
+    
+    Returns:
+        各目标威胁度数组，与game_data.targets一一对应
+    """
+    targets = game_data.targets
+    _, kinds, _, movement_angles = game_data.target_attributes()
+    velocities = [t.velocity for t in targets]
+    if not all(v is None or isinstance(v, (int, float)) for v in velocities) or \
+            np.isnan(movement_angles).any():
+        # 速度不是标量或缺少移动方向时无法批量计算，逐个目标计算
+        return np.fromiter(
+            (
+                calculate_target_threat_score_simple(
+                    t, game_data.playerPosition, int(m) * 22.5, float(a)
+                )
+                for t, m, a in zip(targets, target_motor_ids, target_angles)
+            ),
+            dtype=np.float64,
+            count=len(targets)
+        )
+    
+    n = len(targets)
+    _, distances, _ = game_data.target_arrays()
+    type_factors = _TYPE_THREAT_FACTORS[kinds]
+    # 无速度信息记为0，与速度为0相同（速度因子和移动方向因子均为1.0）
+    velocity_values = np.fromiter((v or 0.0 for v in velocities), dtype=np.float64, count=n)
+    
+    threat_scores, angle_offset, movement_factor = _simple_threat_kernel(
+        distances, target_angles, target_motor_ids * 22.5,
+        type_factors, velocity_values, movement_angles
+    )
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, target in enumerate(targets):
+            logger.debug(
+                "Target %s (%s) threat to direction %.1f°: distance=%.2f, angle_offset=%.1f°, "
+                "velocity=%s, movement_factor=%.2f, threat_score=%.4f",
+                target.id, target.type, target_motor_ids[i] * 22.5, target.distance,
+                angle_offset[i], target.velocity or 'N/A', movement_factor[i], threat_scores[i]
+            )
+    
+    return threat_scores
+
+
 def calculate_target_threat_score_with_ifs(
     target: Target,
     player_pos: Position,
-    direction_angle: float
+    direction_angle: float,
+    target_angle: Optional[float] = None
 ) -> float:
     """
     使用IFS方法计算单个目标对特定方向的威胁度
@@ -181,13 +295,14 @@ def calculate_target_threat_score_with_ifs(
         target: 目标对象
         player_pos: 玩家位置
         direction_angle: 目标方向的角度（0-360度）
+        target_angle: 目标相对于玩家的方向角度（可选），调用方已计算时传入以免重复计算
     
     Returns:
         威胁度分数
     """
     if not ifs_adapter_for_direction:
         # 降级到简单算法
-        return calculate_target_threat_score_simple(target, player_pos, direction_angle)
+        return calculate_target_threat_score_simple(target, player_pos, direction_angle, target_angle)
     
     try:
         # 创建临时GameData对象（只包含当前目标）
@@ -206,7 +321,8 @@ def calculate_target_threat_score_with_ifs(
             threat_score = result_details['comprehensive_threat_score']
             
             # 应用角度衰减因子（目标偏离方向中心时降低威胁度）
-            target_angle = calculate_direction_angle(player_pos, target.position)
+            if target_angle is None:
+                target_angle = calculate_direction_angle(player_pos, target.position)
             angle_offset = abs(target_angle - direction_angle)
             if angle_offset > 180:
                 angle_offset = 360 - angle_offset
@@ -217,25 +333,26 @@ def calculate_target_threat_score_with_ifs(
             final_score = threat_score * angle_decay
             
             logger.debug(
-                f"Target {target.id} IFS threat to direction {direction_angle:.1f}°: "
-                f"base_score={threat_score:.4f}, angle_offset={angle_offset:.1f}°, "
-                f"angle_decay={angle_decay:.3f}, final_score={final_score:.4f}"
+                "Target %s IFS threat to direction %.1f°: base_score=%.4f, angle_offset=%.1f°, "
+                "angle_decay=%.3f, final_score=%.4f",
+                target.id, direction_angle, threat_score, angle_offset, angle_decay, final_score
             )
             
             return final_score
         else:
-            return calculate_target_threat_score_simple(target, player_pos, direction_angle)
+            return calculate_target_threat_score_simple(target, player_pos, direction_angle, target_angle)
             
     except Exception as e:
         logger.warning(f"IFS evaluation failed for direction threat: {e}")
-        return calculate_target_threat_score_simple(target, player_pos, direction_angle)
+        return calculate_target_threat_score_simple(target, player_pos, direction_angle, target_angle)
 
 
 def calculate_target_threat_score(
     target: Target,
     player_pos: Position,
     direction_angle: float,
-    use_ifs: bool = True
+    use_ifs: bool = True,
+    target_angle: Optional[float] = None
 ) -> float:
     """
     计算单个目标对特定方向的威胁度（统一入口）
@@ -245,20 +362,23 @@ def calculate_target_threat_score(
         player_pos: 玩家位置
         direction_angle: 目标方向的角度（0-360度）
         use_ifs: 是否使用IFS方法，默认True
+        target_angle: 目标相对于玩家的方向角度（可选），调用方已计算时传入以免重复计算
     
     Returns:
         威胁度分数
     """
     if use_ifs and ifs_adapter_for_direction:
-        return calculate_target_threat_score_with_ifs(target, player_pos, direction_angle)
+        return calculate_target_threat_score_with_ifs(target, player_pos, direction_angle, target_angle)
     else:
-        return calculate_target_threat_score_simple(target, player_pos, direction_angle)
+        return calculate_target_threat_score_simple(target, player_pos, direction_angle, target_angle)
 
 
 def calculate_direction_threat_score(
     game_data: GameData,
     direction_id: int,
-    use_ifs: bool = True
+    use_ifs: bool = True,
+    target_motor_ids: Optional[np.ndarray] = None,
+    target_angles: Optional[np.ndarray] = None
 ) -> float:
     """
     计算特定方向的综合威胁度
@@ -267,6 +387,9 @@ def calculate_direction_threat_score(
         game_data: 游戏数据对象
         direction_id: 方向ID（0-15）
         use_ifs: 是否使用IFS方法，默认True
+        target_motor_ids: 预先批量计算好的各目标方向ID（与game_data.targets一一对应），
+                          为None时在此批量计算
+        target_angles: 预先批量计算好的各目标方向角度（可选），传入后评分时不再重复计算角度
     
     Returns:
         该方向的综合威胁度分数
@@ -275,26 +398,31 @@ def calculate_direction_threat_score(
         logger.warning(f"Invalid direction_id: {direction_id}")
         return 0.0
     
-    # 获取该方向的角度范围
-    range_start, range_end = DIRECTION_RANGES[direction_id]
     direction_center_angle = direction_id * 22.5  # 方向中心角度
     
+    if target_motor_ids is None and game_data.targets:
+        # 直接按角度分箱得到每个目标所在的方向ID（每个方向覆盖中心角±11.25度），
+        # 不再逐个目标做跨0度的范围判断；算出的角度同时用于威胁度计算
+        if target_angles is None:
+            positions, _, _ = game_data.target_arrays()
+            target_angles = calculate_direction_angles(
+                game_data.playerPosition, positions[:, 0], positions[:, 2]
+            )
+        target_motor_ids = angles_to_motor_ids(target_angles)
+    
     total_threat = 0.0
     target_count = 0
     
-    # 遍历所有目标，累加该方向范围内的威胁度
-    for target in game_data.targets:
-        # 计算目标相对于玩家的方向角度
-        target_angle = calculate_direction_angle(game_data.playerPosition, target.position)
-        
-        # 判断目标是否在该方向范围内
-        if is_angle_in_range(target_angle, range_start, range_end):
+    # 遍历所有目标，累加该方向内的威胁度
+    for i, target in enumerate(game_data.targets):
+        if target_motor_ids[i] == direction_id:
             target_count += 1
             threat_score = calculate_target_threat_score(
                 target,
                 game_data.playerPosition,
                 direction_center_angle,
-                use_ifs=use_ifs
+                use_ifs=use_ifs,
+                target_angle=None if target_angles is None else float(target_angles[i])
             )
             total_threat += threat_score
     
@@ -304,9 +432,9 @@ def calculate_direction_threat_score(
     final_threat = total_threat * count_factor
     
     logger.debug(
-        f"Direction {direction_id} ({direction_center_angle:.1f}°): "
-        f"target_count={target_count}, total_threat={total_threat:.4f}, "
-        f"count_factor={count_factor:.2f}, final_threat={final_threat:.4f}"
+        "Direction %d (%.1f°): target_count=%d, total_threat=%.4f, "
+        "count_factor=%.2f, final_threat=%.4f",
+        direction_id, direction_center_angle, target_count, total_threat, count_factor, final_threat
     )
     
     return final_threat
@@ -324,11 +452,49 @@ def calculate_all_directions_threat(
     Returns:
         字典，键为方向ID（0-15），值为威胁度分数
     """
-    direction_threats = {}
+    if not game_data.targets:
+        return {direction_id: 0.0 for direction_id in range(16)}
     
-    for direction_id in range(16):
-        threat_score = calculate_direction_threat_score(game_data, direction_id)
-        direction_threats[direction_id] = threat_score
+    # 一次向量化计算所有目标的方向ID，避免16个方向各自对N个目标重复atan2
+    positions, _, _ = game_data.target_arrays()
+    target_angles = calculate_direction_angles(game_data.playerPosition, positions[:, 0], positions[:, 2])
+    target_motor_ids = angles_to_motor_ids(target_angles)
+    
+    # 每个目标只落在一个方向内，因此每个目标只需评分一次（以其所在方向的中心角度）
+    if not ifs_adapter_for_direction:
+        # 简单算法的各项因子可对所有目标一次向量化计算
+        scores = calculate_target_threat_scores_simple(game_data, target_motor_ids, target_angles)
+    else:
+        scores = np.fromiter(
+            (
+                calculate_target_threat_score(
+                    target, game_data.playerPosition, int(motor_id) * 22.5,
+                    target_angle=float(target_angle)
+                )
+                for target, motor_id, target_angle in zip(
+                    game_data.targets, target_motor_ids, target_angles
+                )
+            ),
+            dtype=np.float64,
+            count=len(game_data.targets)
+        )
+    
+    # 按方向分组求和、计数并乘以数量因子（按目标顺序累加，与逐方向遍历的结果一致）
+    final_threats, total_threats, target_counts = _accumulate_direction_threats(
+        target_motor_ids, scores
+    )
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        for direction_id in range(16):
+            logger.debug(
+                "Direction %d (%.1f°): target_count=%d, total_threat=%.4f, "
+                "count_factor=%.2f, final_threat=%.4f",
+                direction_id, direction_id * 22.5, target_counts[direction_id],
+                total_threats[direction_id], 1.0 + 0.2 * min(target_counts[direction_id], 5),
+                final_threats[direction_id]
+            )
+    
+    direction_threats = dict(enumerate(final_threats.tolist()))
     
     return direction_threats
 
@@ -359,47 +525,31 @@ def normalize_threat_to_intensity(
     if not threat_scores:
         return {i: 0 for i in range(16)}
     
-    # 找到最大威胁度（用于归一化）
-    max_threat = max(threat_scores.values()) if threat_scores.values() else 0.0
+    # 按方向ID 0-15 排成数组，找到最大威胁度（用于归一化）
+    scores = np.fromiter(
+        (threat_scores.get(i, 0.0) for i in range(16)), dtype=np.float64, count=16
+    )
+    max_threat = scores.max()
     
     if max_threat <= 0:
         return {i: 0 for i in range(16)}
     
-    # 归一化并映射到震动强度
-    intensities = {}
-    for direction_id in range(16):
-        threat = threat_scores.get(direction_id, 0.0)
-        
-        if threat < threshold:
-            # 威胁度太低，不震动
-            intensities[direction_id] = 0
-        else:
-            # 归一化到0-1范围，然后映射到min_intensity-max_intensity
-            # 确保所有有效震动都在可感知范围内
-            normalized = threat / max_threat
-            intensity = int(min_intensity + normalized * (max_intensity - min_intensity))
-            intensities[direction_id] = intensity
-    
-    logger.info("=" * 60)
-    logger.info("🎯 Situation Awareness - Direction Threat Analysis")
-    logger.info("=" * 60)
-    
-    direction_names = [
-        "正北", "北偏东", "东北", "东偏北",
-        "正东", "东偏南", "东南", "南偏东",
-        "正南", "南偏西", "西南", "西偏南",
-        "正西", "西偏北", "西北", "北偏西"
-    ]
-    
-    for direction_id in range(16):
-        threat = threat_scores.get(direction_id, 0.0)
-        intensity = intensities.get(direction_id, 0)
-        direction_name = direction_names[direction_id]
-        logger.info(
-            f"  Direction {direction_id} ({direction_name}): "
-            f"Threat={threat:.4f}, Intensity={intensity}"
-        )
-    logger.info("=" * 60)
+    # 归一化并映射到震动强度：
+    # 威胁度太低（< threshold）不震动，否则归一化到0-1范围后映射到min_intensity-max_intensity，
+    # 确保所有有效震动都在可感知范围内（截断取整，与int()一致）
+    mapped = (min_intensity + scores / max_threat * (max_intensity - min_intensity)).astype(np.int64)
+    intensities = dict(enumerate(np.where(scores < threshold, 0, mapped).tolist()))
+    
+    # 各方向详情拼接为一条日志输出（INFO未启用时不做任何格式化）
+    if logger.isEnabledFor(logging.INFO):
+        lines = ["=" * 60, "🎯 Situation Awareness - Direction Threat Analysis", "=" * 60]
+        for direction_id in range(16):
+            lines.append(
+                f"  Direction {direction_id} ({DIRECTION_NAMES[direction_id]}): "
+                f"Threat={threat_scores.get(direction_id, 0.0):.4f}, Intensity={intensities[direction_id]}"
+            )
+        lines.append("=" * 60)
+        logger.info("\n".join(lines))
     
     return intensities
 
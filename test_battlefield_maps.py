@@ -10,6 +10,13 @@ from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 import math
 
+import numpy as np
+
+try:
+    import orjson  # 可选：更快的JSON编码，直接输出UTF-8字节
+except ImportError:
+    orjson = None
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -48,10 +55,8 @@ def convert_enemy_to_target(enemy: dict, player_pos: Position) -> Target:
     dz = enemy_pos.z - player_pos.z
     distance = (dx**2 + dz**2) ** 0.5
     
-    # 计算角度（相对于玩家的正北方向）
-    angle = math.degrees(math.atan2(dx, dz))
-    if angle < 0:
-        angle += 360
+    # 计算角度（相对于玩家的正北方向），取模把负角度转换到0-360度范围
+    angle = math.degrees(math.atan2(dx, dz)) % 360.0
     
     # 类型映射：uav -> Drone, soldier -> Soldier
     enemy_type = "Drone" if enemy['type'].lower() == 'uav' else "Soldier"
@@ -68,6 +73,56 @@ def convert_enemy_to_target(enemy: dict, player_pos: Position) -> Target:
     )
 
 
+def convert_all_enemies_to_targets(images: List[dict], player_pos: Position) -> List[List[Target]]:
+    """
+    一次性把所有地图的敌人转换为Target对象（convert_enemy_to_target的批量版本）
+    
+    所有地图的敌人坐标拼接为一维数组，距离和角度用一次向量化计算得出，
+    再按每张地图的敌人数量切分回各地图
+    
+    Args:
+        images: 图像数据字典列表
+        player_pos: 玩家位置
+    
+    Returns:
+        与images一一对应的Target列表
+    """
+    enemies = [enemy for image_data in images for enemy in image_data['enemies']]
+    n = len(enemies)
+    xs = np.fromiter((enemy['x'] for enemy in enemies), dtype=np.float64, count=n)
+    zs = np.fromiter((enemy['z'] for enemy in enemies), dtype=np.float64, count=n)
+    
+    # 距离与角度（相对于玩家的正北方向，0-360度）
+    dx = xs - player_pos.x
+    dz = zs - player_pos.z
+    distances = np.sqrt(dx * dx + dz * dz).tolist()
+    angles = (np.degrees(np.arctan2(dx, dz)) % 360.0).tolist()
+    
+    targets = []
+    for enemy, distance, angle in zip(enemies, distances, angles):
+        # 类型映射：uav -> Drone, soldier -> Soldier
+        enemy_type = "Drone" if enemy['type'].lower() == 'uav' else "Soldier"
+        targets.append(Target(
+            id=enemy['id'],
+            type=enemy_type,
+            position=Position(x=enemy['x'], y=0.0, z=enemy['z']),
+            distance=distance,
+            angle=angle,
+            velocity=enemy.get('speed'),
+            direction=enemy.get('direction'),
+            speed=enemy.get('speed')
+        ))
+    
+    # 按每张地图的敌人数量切分
+    results = []
+    start = 0
+    for image_data in images:
+        end = start + len(image_data['enemies'])
+        results.append(targets[start:end])
+        start = end
+    return results
+
+
 def find_most_threatening_direction(direction_threats: Dict[int, float]) -> Tuple[int, float]:
     """
     找出最具威胁的方向
@@ -78,8 +133,10 @@ def find_most_threatening_direction(direction_threats: Dict[int, float]) -> Tupl
     Returns:
         (方向ID, 威胁度值)
     """
-    max_direction = max(direction_threats.items(), key=lambda x: x[1])
-    return max_direction
+    # 键固定为0-15：转成列表后按下标取最大值（并列时取编号最小的方向，与按字典顺序遍历一致）
+    scores = [direction_threats[i] for i in range(16)]
+    best_id = max(range(16), key=scores.__getitem__)
+    return best_id, scores[best_id]
 
 
 def get_direction_name(direction_id: int) -> str:
@@ -96,7 +153,8 @@ def get_direction_name(direction_id: int) -> str:
 def test_single_battlefield(
     image_data: dict,
     player_pos: Position,
-    terrain_data: Optional[dict] = None
+    terrain_data: Optional[dict] = None,
+    targets: Optional[List[Target]] = None
 ) -> dict:
     """
     测试单张战场地图
@@ -105,12 +163,14 @@ def test_single_battlefield(
         image_data: 图像数据字典
         player_pos: 玩家位置
         terrain_data: 地形数据（可选）
+        targets: 已转换好的Target列表（可选），为None时由image_data['enemies']转换
     
     Returns:
         测试结果字典
     """
     # 转换敌人数据为Target对象
-    targets = [convert_enemy_to_target(enemy, player_pos) for enemy in image_data['enemies']]
+    if targets is None:
+        targets = [convert_enemy_to_target(enemy, player_pos) for enemy in image_data['enemies']]
     
     # 创建GameData对象
     game_data = GameData(
@@ -167,8 +227,13 @@ def save_results_to_json(results: List[dict], output_path: str):
         'results': results
     }
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        # direction_threats使用整数键，需要OPT_NON_STR_KEYS
+        with open(output_path, 'wb') as f:
+            f.write(orjson.dumps(output_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
     
     logger.info(f"Results saved to: {output_path}")
 
@@ -227,13 +292,16 @@ def main():
     # 玩家位置（默认在原点）
     player_pos = Position(x=0.0, y=0.0, z=0.0)
     
+    # 所有地图的敌人一次性批量转换
+    all_targets = convert_all_enemies_to_targets(images, player_pos)
+    
     # 批量测试
     results = []
-    for i, image_data in enumerate(images, 1):
+    for i, (image_data, targets) in enumerate(zip(images, all_targets), 1):
         logger.info(f"\n[{i}/{len(images)}] Testing: {image_data['imageId']}")
         
         try:
-            result = test_single_battlefield(image_data, player_pos, terrain)
+            result = test_single_battlefield(image_data, player_pos, terrain, targets)
             results.append(result)
             
             # 打印简要结果
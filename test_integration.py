@@ -2,6 +2,9 @@
 import unittest
 import sys
 import os
+import tempfile
+import threading
+import time
 from unittest.mock import Mock, patch
 
 # 添加项目根目录到路径
@@ -9,6 +12,10 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from models import Target, Position, GameData
 from threat_analyzer_ifs import IFSThreatAnalyzerAdapter, log_ifs_details
+from csv_logger import CSVLogger
+from serial_handler import VibrationWorker
+from IFS_ThreatAssessment.threat_evaluator import IFSThreatEvaluator
+from IFS_ThreatAssessment.visualizer import ThreatVisualizer
 
 
 class TestTargetConversion(unittest.TestCase):
@@ -172,6 +179,24 @@ class TestIFSEvaluation(unittest.TestCase):
         self.assertIn(target.id, [2, 3])
         self.assertGreater(details['comprehensive_threat_score'], 0.3)
     
+    def test_find_most_threatening_string_ids(self):
+        """测试非整数ID的目标（ID原样保留，不降级到备用算法）"""
+        game_data = self.create_game_data([
+            {'id': 'E1', 'type': 'Soldier', 'x': 30.0, 'z': 0.0, 'distance': 30.0, 'angle': 0.0,
+             'speed': 1.0, 'direction': 90.0},
+            {'id': 'E2', 'type': 'Drone', 'x': 5.0, 'z': 0.0, 'distance': 5.0, 'angle': 0.0,
+             'speed': 12.0, 'direction': 180.0}
+        ])
+        
+        enemies = self.adapter.convert_targets_to_enemies(game_data)
+        self.assertEqual([enemy['id'] for enemy in enemies], ['E1', 'E2'])
+        
+        target, details = self.adapter.find_most_threatening(game_data)
+        
+        self.assertIsNotNone(target)
+        self.assertEqual(target.id, 'E2')
+        self.assertEqual(details['enemy_id'], 'E2')
+    
     def test_empty_targets(self):
         """测试空目标列表"""
         game_data = GameData(
@@ -367,6 +392,202 @@ class TestDataModelBackwardCompatibility(unittest.TestCase):
         self.assertEqual(target.direction, 0.0)
 
 
+class TestCSVLoggerAsync(unittest.TestCase):
+    """测试CSV后台写入线程"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_logger = CSVLogger(base_dir=self.tmp_dir.name)
+        self.target = Target(
+            id=7,
+            angle=30.0,
+            distance=12.5,
+            type="Soldier",
+            position=Position(6.0, 0.0, 10.0)
+        )
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.csv_logger.close()
+        self.tmp_dir.cleanup()
+    
+    def _read_rounds(self):
+        """读取CSV文件中各数据行的round列"""
+        with open(self.csv_logger.file_path, encoding='utf-8') as f:
+            return [line.split(',')[1] for line in f.read().splitlines()[1:]]
+    
+    def test_rows_written_in_submit_order(self):
+        """测试后台线程按提交顺序写入"""
+        rounds = [f"1-{i}" for i in range(10)]
+        for round_number in rounds:
+            self.csv_logger.log_round_data_async(round_number, self.target, [0.1] * 16)
+        self.csv_logger.close()
+        
+        self.assertEqual(self._read_rounds(), rounds)
+    
+    def test_close_drains_queue(self):
+        """测试close()等待队列中的数据全部写完"""
+        for i in range(500):
+            self.csv_logger.log_round_data_async(f"2-{i}", None, [0.0] * 16)
+        self.csv_logger.close()
+        
+        self.assertEqual(len(self._read_rounds()), 500)
+        self.assertIsNone(self.csv_logger._writer_thread)
+    
+    def test_round_readable_before_written(self):
+        """测试提交后、后台线程写入前即可查询和读取该round"""
+        gate = threading.Event()
+        append_row = self.csv_logger._append_row
+        
+        def blocked_append(line):
+            gate.wait(5)
+            append_row(line)
+        
+        with patch.object(self.csv_logger, '_append_row', side_effect=blocked_append):
+            self.csv_logger.log_round_data_async("3-1", self.target, {0: 0.5, 4: 0.25})
+            
+            self.assertTrue(self.csv_logger.check_round_exists("3-1"))
+            data = self.csv_logger.read_round_data("3-1")
+            self.assertIsNotNone(data)
+            self.assertEqual(data['threat_enemy_id'], '7')
+            self.assertEqual(data['threat_enemy_distance'], '12.50')
+            self.assertEqual(data['direction_threats'][0], 0.5)
+            self.assertEqual(data['direction_threats'][4], 0.25)
+            self.assertEqual(self._read_rounds(), [])
+            
+            gate.set()
+            self.csv_logger.close()
+        
+        self.assertEqual(self._read_rounds(), ["3-1"])
+    
+    def test_idle_writer_syncs_pending_rows(self):
+        """测试后台线程空闲超过fsync_interval后把缓冲的行写入文件"""
+        self.csv_logger.close()
+        self.csv_logger = CSVLogger(base_dir=self.tmp_dir.name, fsync_interval=0.1)
+        for i in range(3):
+            self.csv_logger.log_round_data_async(f"4-{i}", None, [0.0] * 16)
+        
+        deadline = time.monotonic() + 2.0
+        while len(self._read_rounds()) < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        
+        self.assertEqual(self._read_rounds(), ["4-0", "4-1", "4-2"])
+
+
+class TestVibrationWorker(unittest.TestCase):
+    """测试后台震动执行线程"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.worker = VibrationWorker()
+        self.calls = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.gate.set()
+        self.worker.stop(timeout=2)
+    
+    def _blocking_sequence(self, name):
+        """模拟一个震动序列：记录调用后等待gate放行"""
+        self.calls.append(name)
+        self.started.set()
+        self.gate.wait(5)
+    
+    def _sequence(self, name):
+        """模拟一个立即完成的震动序列"""
+        self.calls.append(name)
+    
+    def test_pending_sequence_replaced_by_latest(self):
+        """测试执行期间只保留最新提交的等待序列"""
+        self.worker.submit(self._blocking_sequence, "first")
+        self.assertTrue(self.started.wait(2))
+        
+        self.worker.submit(self._sequence, "second")
+        self.worker.submit(self._sequence, "third")
+        self.gate.set()
+        
+        deadline = time.monotonic() + 2.0
+        while len(self.calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.calls, ["first", "third"])
+    
+    def test_stop_waits_for_running_and_drops_pending(self):
+        """测试stop()等待正在执行的序列完成并丢弃尚未开始的序列"""
+        self.worker.submit(self._blocking_sequence, "running")
+        self.assertTrue(self.started.wait(2))
+        self.worker.submit(self._sequence, "pending")
+        
+        threading.Timer(0.1, self.gate.set).start()
+        self.worker.stop(timeout=2)
+        
+        self.assertFalse(self.worker._thread.is_alive())
+        self.assertEqual(self.calls, ["running"])
+    
+    def test_submit_after_stop_ignored(self):
+        """测试停止后提交的序列不再执行"""
+        self.worker.stop(timeout=2)
+        self.worker.submit(self._sequence, "late")
+        
+        self.assertEqual(self.calls, [])
+    
+    def test_failed_sequence_does_not_stop_worker(self):
+        """测试序列抛出异常后线程继续执行后续序列"""
+        self.worker.submit(Mock(side_effect=RuntimeError("serial error")))
+        time.sleep(0.05)
+        self.worker.submit(self._blocking_sequence, "after_error")
+        
+        self.assertTrue(self.started.wait(2))
+        self.assertEqual(self.calls, ["after_error"])
+
+
+class TestThreatVisualizerReuse(unittest.TestCase):
+    """测试可视化工具在reuse_figure模式下逐帧重复绘制"""
+    
+    def setUp(self):
+        """测试前准备"""
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.visualizer = ThreatVisualizer(output_dir=self.tmp_dir.name, reuse_figure=True)
+        self.results = IFSThreatEvaluator().rank_targets([
+            {'id': 1, 'type': 'soldier', 'x': 8.0, 'z': 6.0, 'speed': 4.0, 'direction': 225},
+            {'id': 2, 'type': 'drone', 'x': -20.0, 'z': 15.0, 'speed': 12.0, 'direction': 90}
+        ])
+    
+    def tearDown(self):
+        """测试后清理"""
+        self.visualizer.close_cached()
+        self.tmp_dir.cleanup()
+    
+    def test_comparison_blit_after_full_redraw(self):
+        """测试blit → 非blit → blit交替绘制时原地更新的是当前图像中的柱子"""
+        self.visualizer.plot_comparison(self.results, blit=True)
+        self.visualizer.plot_comparison(self.results, blit=False)
+        
+        self.results[0]['indicator_details']['distance']['threat_score'] = -1.0
+        self.visualizer.plot_comparison(self.results, blit=True)
+        
+        artists = self.visualizer._comparison_artists
+        self.assertIsNotNone(artists)
+        distance_bars = artists['bars'][0]
+        for bar in distance_bars:
+            self.assertIsNotNone(bar.axes)
+        self.assertEqual(distance_bars[0].get_height(), 0.0)
+    
+    def test_terrain_edited_in_place(self):
+        """测试原地修改地形数据后再次绘制使用最新的几何"""
+        terrain = {'buildings': [{'id': 1, 'x': 10.0, 'z': 5.0, 'width': 4.0, 'depth': 2.0}]}
+        self.visualizer.plot_threat_heatmap(self.results, terrain_data=terrain)
+        
+        terrain['buildings'][0]['x'] = -10.0
+        terrain['buildings'].append({'id': 2, 'x': 0.0, 'z': 0.0, 'width': 2.0, 'depth': 2.0})
+        layers = self.visualizer._prepare_terrain(terrain)
+        
+        self.assertEqual(len(layers['buildings']['verts']), 2)
+        self.assertEqual(layers['buildings']['verts'][0][:, 0].mean(), -10.0)
+
+
 def run_tests():
     """运行所有测试"""
     # 创建测试套件
@@ -378,6 +599,9 @@ def run_tests():
     suite.addTests(loader.loadTestsFromTestCase(TestIFSEvaluation))
     suite.addTests(loader.loadTestsFromTestCase(TestIFSDetailsLogging))
     suite.addTests(loader.loadTestsFromTestCase(TestDataModelBackwardCompatibility))
+    suite.addTests(loader.loadTestsFromTestCase(TestCSVLoggerAsync))
+    suite.addTests(loader.loadTestsFromTestCase(TestVibrationWorker))
+    suite.addTests(loader.loadTestsFromTestCase(TestThreatVisualizerReuse))
     
     # 运行测试
     runner = unittest.TextTestRunner(verbosity=2)
@@ -2,9 +2,16 @@
 import logging
 import os
 import json
+import math
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from typing import Optional
+
+import numpy as np
+
 from models import Target, GameData
-from openai import OpenAI
 from dotenv import load_dotenv
 
 # 加载.env文件中的环境变量
@@ -18,8 +25,12 @@ from config import (
     TERRAIN_DATA_PATH,
     THREAT_ASSESSMENT_STRATEGY,
     IFS_LOG_LEVEL,
+    IFS_PREFILTER_TOP_K,
     OPENAI_API_KEY,
-    OPENAI_BASE_URL
+    OPENAI_BASE_URL,
+    GPT_REQUEST_TIMEOUT,
+    GPT_MAX_RETRIES,
+    GPT_SKIP_DOMINANCE_RATIO
 )
 
 logger = logging.getLogger(__name__)
@@ -44,25 +55,131 @@ if ENABLE_IFS_ASSESSMENT:
         ifs_adapter = None
 
 # ============================================================================
-# 初始化OpenAI客户端
+# OpenAI客户端（首次需要GPT评估时才导入openai并创建）
 # ============================================================================
+GPT_AVAILABLE = bool(ENABLE_GPT_ASSESSMENT and OPENAI_API_KEY)
+if ENABLE_GPT_ASSESSMENT and not OPENAI_API_KEY:
+    logger.warning("OPENAI_API_KEY not found, GPT assessment disabled")
+
 client = None
-if ENABLE_GPT_ASSESSMENT:
+_client_initialized = False
+
+
+def _get_client():
+    """
+    获取OpenAI客户端，首次调用时才导入openai并创建（openai导入较慢，IFS评估成功时用不到）
+    
+    Returns:
+        OpenAI客户端，未启用GPT评估或初始化失败时返回None
+    """
+    global client, _client_initialized
+    if _client_initialized:
+        return client
+    _client_initialized = True
+    
+    if not GPT_AVAILABLE:
+        return None
     try:
-        api_key = OPENAI_API_KEY
-        base_url = OPENAI_BASE_URL
-        
-        if api_key:
-            client = OpenAI(
-                api_key=api_key,
-                base_url=base_url
-            )
-            logger.info(f"✓ OpenAI client initialized with base_url: {base_url}")
-        else:
-            logger.warning("OPENAI_API_KEY not found, GPT assessment disabled")
+        from openai import OpenAI
+        # 限制超时和重试次数：默认设置下一次失败的请求可能阻塞主循环数分钟
+        client = OpenAI(
+            api_key=OPENAI_API_KEY,
+            base_url=OPENAI_BASE_URL,
+            timeout=GPT_REQUEST_TIMEOUT,
+            max_retries=GPT_MAX_RETRIES
+        )
+        logger.info("✓ OpenAI client initialized with base_url: %s", OPENAI_BASE_URL)
     except Exception as e:
         logger.error(f"Failed to initialize OpenAI client: {e}")
         client = None
+    return client
+
+
+# GPT提示词中不随回合变化的部分（逐字节固定，作为每次请求的公共前缀）
+GPT_SYSTEM_PROMPT = "你是一个专业的战术威胁评估AI。你需要分析战场情况，快速准确地判断最危险的敌人。只回复敌人的ID数字，不要任何解释。"
+GPT_PROMPT_INSTRUCTIONS = """你是一个战术威胁评估AI。请分析下面的战场情况，判断哪个敌人对玩家威胁最大。
+
+考虑因素：
+1. 距离：越近越危险
+2. 角度：越接近正前方（0度）越危险
+3. 类型：Drone（无人机）比Soldier（士兵）更危险
+
+请回复最有威胁的敌人ID（只回复数字ID，不要其他内容）。"""
+
+# 从GPT回复中提取目标ID（回复不是纯数字时使用）
+_DIGIT_RE = re.compile(r'\d+')
+
+# 简单算法的类型因子查找表（按原始类型字符串精确匹配，未列出的类型为1.0）
+SIMPLE_TYPE_FACTOR = {"Drone": 1.2}
+
+# GPT评估结果缓存：按提示词内容（玩家位置、目标距离和角度均已取两位小数）索引，
+# 场景不变的相邻帧直接复用上次返回的目标ID，不再重复请求；超过有效期的条目视为未命中
+GPT_CACHE_SIZE = 64
+GPT_CACHE_TTL = 0.5  # 秒
+_gpt_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def _get_cached_gpt_target_id(prompt: str) -> Optional[int]:
+    """
+    查询GPT评估结果缓存
+    
+    Args:
+        prompt: 发送给GPT的提示词
+    
+    Returns:
+        缓存的目标ID，未命中或已过期返回None
+    """
+    cached = _gpt_cache.get(prompt)
+    if cached is None:
+        return None
+    target_id, timestamp = cached
+    if time.monotonic() - timestamp > GPT_CACHE_TTL:
+        del _gpt_cache[prompt]
+        return None
+    _gpt_cache.move_to_end(prompt)
+    return target_id
+
+
+def _cache_gpt_target_id(prompt: str, target_id: int):
+    """
+    缓存GPT返回的目标ID，超出容量时淘汰最久未使用的条目
+    
+    Args:
+        prompt: 发送给GPT的提示词
+        target_id: GPT返回的目标ID
+    """
+    _gpt_cache[prompt] = (target_id, time.monotonic())
+    _gpt_cache.move_to_end(prompt)
+    if len(_gpt_cache) > GPT_CACHE_SIZE:
+        _gpt_cache.popitem(last=False)
+
+
+@lru_cache(maxsize=64)
+def _serialize_targets_info(targets_key: tuple) -> str:
+    """
+    将目标信息序列化为提示词中的JSON列表，相同的目标列表只序列化一次
+    
+    Args:
+        targets_key: 每个目标一个元组 (id, type, x, y, z, distance, angle)，距离和角度已取两位小数
+    
+    Returns:
+        紧凑格式（无缩进和多余空白）的JSON字符串，减少发送给GPT的token数
+    """
+    targets_info = [
+        {
+            "id": target_id,
+            "type": target_type,
+            "position": {
+                "x": x,
+                "y": y,
+                "z": z
+            },
+            "distance": distance,
+            "angle": angle
+        }
+        for target_id, target_type, x, y, z, distance, angle in targets_key
+    ]
+    return json.dumps(targets_info, separators=(',', ':'), ensure_ascii=False)
 
 
 def calculate_threat_score_simple(target: Target, player_pos) -> float:
@@ -82,18 +199,17 @@ def calculate_threat_score_simple(target: Target, player_pos) -> float:
     
     # 角度因子（角度越小威胁越大，0度正前方）
     # 将角度转换为绝对值，正前方（0度）威胁最大
-    angle_factor = 1.0 / (abs(target.angle) + 1)
+    angle_factor = 1.0 / (math.fabs(target.angle) + 1)
     
     # 类型因子（Drone=1.2, Soldier=1.0）
-    type_factor = 1.2 if target.type == "Drone" else 1.0
+    type_factor = SIMPLE_TYPE_FACTOR.get(target.type, 1.0)
     
     # 综合威胁度
     threat_score = distance_factor * angle_factor * type_factor
     
     logger.debug(
-        f"Target {target.id} ({target.type}): "
-        f"distance={target.distance:.2f}, angle={target.angle:.2f}, "
-        f"threat_score={threat_score:.4f}"
+        "Target %s (%s): distance=%.2f, angle=%.2f, threat_score=%.4f",
+        target.id, target.type, target.distance, target.angle, threat_score
     )
     
     return threat_score
@@ -109,90 +225,97 @@ def find_most_threatening_target_with_gpt(game_data: GameData) -> Optional[Targe
     Returns:
         最有威胁的目标对象，如果分析失败则返回None
     """
-    if not client:
+    gpt_client = _get_client()
+    if not gpt_client:
         logger.warning("OpenAI client not available, falling back to algorithm-based method")
         return None
     
+    # 只有一个目标时无需询问GPT
+    if len(game_data.targets) == 1:
+        return game_data.targets[0]
+    
+    # 简单算法得分第一的目标明显领先时直接采用，不再请求GPT
+    if GPT_SKIP_DOMINANCE_RATIO > 0:
+        threat_scores = calculate_threat_scores_simple(game_data)
+        runner_up, best = np.partition(threat_scores, -2)[-2:]
+        if best > GPT_SKIP_DOMINANCE_RATIO * runner_up:
+            target = game_data.targets[int(np.argmax(threat_scores))]
+            logger.info(
+                "Target %s dominates the simple threat scores (%.4f vs %.4f), skipping GPT-4o",
+                target.id, best, runner_up
+            )
+            return target
+    
     try:
-        # 构建发送给GPT的数据
+        # 构建发送给GPT的数据（目标列表不变时复用已序列化的JSON）
         player_pos = game_data.playerPosition
-        targets_info = []
-        
-        for target in game_data.targets:
-            targets_info.append({
-                "id": target.id,
-                "type": target.type,
-                "position": {
-                    "x": target.position.x,
-                    "y": target.position.y,
-                    "z": target.position.z
-                },
-                "distance": round(target.distance, 2),
-                "angle": round(target.angle, 2)
-            })
+        targets_key = tuple(
+            (
+                target.id, target.type,
+                target.position.x, target.position.y, target.position.z,
+                round(target.distance, 2), round(target.angle, 2)
+            )
+            for target in game_data.targets
+        )
         
         # 构建提示词
-        prompt = f"""你是一个战术威胁评估AI。请分析以下战场情况，判断哪个敌人对玩家威胁最大。
+        # 固定说明在前，只有末尾的战场数据随回合变化
+        prompt = f"""{GPT_PROMPT_INSTRUCTIONS}
 
 玩家位置: X={player_pos.x:.2f}, Y={player_pos.y:.2f}, Z={player_pos.z:.2f}
 
 敌人列表:
-{json.dumps(targets_info, indent=2, ensure_ascii=False)}
-
-考虑因素：
-1. 距离：越近越危险
-2. 角度：越接近正前方（0度）越危险
-3. 类型：Drone（无人机）比Soldier（士兵）更危险
+{_serialize_targets_info(targets_key)}"""
 
-请回复最有威胁的敌人ID（只回复数字ID，不要其他内容）。"""
-
-        logger.info("Sending data to GPT-4o for threat analysis...")
-        logger.debug(f"Prompt: {prompt}")
-        
-        # 调用GPT-4o API
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "你是一个专业的战术威胁评估AI。你需要分析战场情况，快速准确地判断最危险的敌人。只回复敌人的ID数字，不要任何解释。"
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3,
-            max_tokens=10
-        )
-        
-        # 解析GPT响应
-        gpt_response = response.choices[0].message.content.strip()
-        logger.info(f"GPT-4o response: {gpt_response}")
-        
-        # 提取目标ID
-        try:
-            target_id = int(gpt_response)
-        except ValueError:
-            # 尝试从响应中提取数字
-            import re
-            numbers = re.findall(r'\d+', gpt_response)
-            if numbers:
-                target_id = int(numbers[0])
-            else:
-                logger.error(f"Could not parse target ID from GPT response: {gpt_response}")
-                return None
+        target_id = _get_cached_gpt_target_id(prompt)
+        if target_id is not None:
+            logger.info("Scene unchanged since a recent GPT-4o query, reusing target ID %s", target_id)
+        else:
+            logger.info("Sending data to GPT-4o for threat analysis...")
+            logger.debug("Prompt: %s", prompt)
+            
+            # 调用GPT-4o API
+            response = gpt_client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": GPT_SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": prompt
+                    }
+                ],
+                temperature=0.3,
+                max_tokens=10
+            )
+            
+            # 解析GPT响应
+            gpt_response = response.choices[0].message.content.strip()
+            logger.info("GPT-4o response: %s", gpt_response)
+            
+            # 提取目标ID
+            try:
+                target_id = int(gpt_response)
+            except ValueError:
+                # 尝试从响应中提取第一个数字
+                match = _DIGIT_RE.search(gpt_response)
+                if match:
+                    target_id = int(match.group())
+                else:
+                    logger.error(f"Could not parse target ID from GPT response: {gpt_response}")
+                    return None
         
         # 找到对应的目标对象
-        for target in game_data.targets:
-            if target.id == target_id:
-                logger.info(
-                    f"[GPT-4o] Most threatening target: ID={target.id}, "
-                    f"Type={target.type}, "
-                    f"Distance={target.distance:.2f}, "
-                    f"Angle={target.angle:.2f}"
-                )
-                return target
+        target = game_data.target_by_id(target_id)
+        if target is not None:
+            _cache_gpt_target_id(prompt, target_id)
+            logger.info(
+                "[GPT-4o] Most threatening target: ID=%s, Type=%s, Distance=%.2f, Angle=%.2f",
+                target.id, target.type, target.distance, target.angle
+            )
+            return target
         
         logger.error(f"GPT returned invalid target ID: {target_id}")
         return None
@@ -202,6 +325,57 @@ def find_most_threatening_target_with_gpt(game_data: GameData) -> Optional[Targe
         return None
 
 
+def calculate_threat_scores_simple(game_data: GameData) -> np.ndarray:
+    """
+    一次向量化计算所有目标的简单算法威胁度（公式与calculate_threat_score_simple一致）
+    
+    Args:
+        game_data: 游戏数据对象
+    
+    Returns:
+        各目标威胁度数组，与game_data.targets一一对应
+    """
+    targets = game_data.targets
+    _, distances, angles = game_data.target_arrays()
+    type_factors = np.fromiter(
+        (SIMPLE_TYPE_FACTOR.get(t.type, 1.0) for t in targets), dtype=np.float64, count=len(targets)
+    )
+    return (1.0 / (distances + 1)) * (1.0 / (np.abs(angles) + 1)) * type_factors
+
+
+def prefilter_targets_for_ifs(game_data: GameData, top_k: int) -> GameData:
+    """
+    用简单算法预筛选候选目标，只保留得分最高的前top_k个供IFS评估
+    
+    第top_k名与第top_k+1名得分相同时无法确定取舍，保留全部目标
+    
+    Args:
+        game_data: 游戏数据对象
+        top_k: 保留的目标数量，不大于0时不筛选
+    
+    Returns:
+        只含候选目标的GameData（目标保持原有顺序）；无需筛选时返回原对象
+    """
+    n = len(game_data.targets)
+    if top_k <= 0 or n <= top_k:
+        return game_data
+    
+    threat_scores = calculate_threat_scores_simple(game_data)
+    # 第top_k+1大的得分落在order[top_k]，其前面的都不小于它
+    order = np.argpartition(-threat_scores, top_k)
+    if threat_scores[order[:top_k]].min() <= threat_scores[order[top_k]]:
+        return game_data
+    
+    keep = np.sort(order[:top_k])
+    logger.debug("IFS prefilter kept %d of %d targets", top_k, n)
+    return GameData(
+        round=game_data.round,
+        playerPosition=game_data.playerPosition,
+        targets=[game_data.targets[i] for i in keep.tolist()],
+        situationAwareness=game_data.situationAwareness
+    )
+
+
 def find_most_threatening_target_simple(game_data: GameData) -> Optional[Target]:
     """
     使用简单算法找出最有威胁的目标（保底方案）
@@ -217,22 +391,28 @@ def find_most_threatening_target_simple(game_data: GameData) -> Optional[Target]
         return None
     
     logger.info("Using simple algorithm for threat assessment")
-    max_threat_score = -1
-    most_threatening = None
     
-    for target in game_data.targets:
-        threat_score = calculate_threat_score_simple(target, game_data.playerPosition)
-        if threat_score > max_threat_score:
-            max_threat_score = threat_score
-            most_threatening = target
+    targets = game_data.targets
+    threat_scores = calculate_threat_scores_simple(game_data)
+    
+    if logger.isEnabledFor(logging.DEBUG):
+        for target, threat_score in zip(targets, threat_scores.tolist()):
+            logger.debug(
+                "Target %s (%s): distance=%.2f, angle=%.2f, threat_score=%.4f",
+                target.id, target.type, target.distance, target.angle, threat_score
+            )
+    
+    # argmax取第一个最大值
+    best = int(np.argmax(threat_scores))
+    most_threatening = targets[best]
+    max_threat_score = float(threat_scores[best])
     
     if most_threatening:
         logger.info(
-            f"[Simple Algorithm] Most threatening target: ID={most_threatening.id}, "
-            f"Type={most_threatening.type}, "
-            f"Distance={most_threatening.distance:.2f}, "
-            f"Angle={most_threatening.angle:.2f}, "
-            f"ThreatScore={max_threat_score:.4f}"
+            "[Simple Algorithm] Most threatening target: ID=%s, Type=%s, "
+            "Distance=%.2f, Angle=%.2f, ThreatScore=%.4f",
+            most_threatening.id, most_threatening.type,
+            most_threatening.distance, most_threatening.angle, max_threat_score
         )
     
     return most_threatening
@@ -253,7 +433,11 @@ def find_most_threatening_target_with_ifs(game_data: GameData) -> Optional[Targe
         return None
     
     try:
-        target, details = ifs_adapter.find_most_threatening(game_data)
+        # 只有detailed日志需要指标详情，其余级别跳过详情字典的组装
+        target, details = ifs_adapter.find_most_threatening(
+            prefilter_targets_for_ifs(game_data, IFS_PREFILTER_TOP_K),
+            want_details=(IFS_LOG_LEVEL == 'detailed')
+        )
         
         if target and details:
             # 根据配置输出日志
@@ -261,12 +445,11 @@ def find_most_threatening_target_with_ifs(game_data: GameData) -> Optional[Targe
                 log_ifs_details(target, details)
             elif IFS_LOG_LEVEL == 'summary':
                 logger.info(
-                    f"[IFS] Selected target: ID={target.id}, "
-                    f"Score={details['comprehensive_threat_score']:.3f}, "
-                    f"Level={details['threat_level']}"
+                    "[IFS] Selected target: ID=%s, Score=%.3f, Level=%s",
+                    target.id, details['comprehensive_threat_score'], details['threat_level']
                 )
             else:  # minimal
-                logger.info(f"[IFS] Selected target: ID={target.id}")
+                logger.info("[IFS] Selected target: ID=%s", target.id)
             
             return target
         else:
@@ -278,6 +461,30 @@ def find_most_threatening_target_with_ifs(game_data: GameData) -> Optional[Targe
         return None
 
 
+def _build_assessment_chain() -> list:
+    """
+    按评估策略和各评估器的可用状态构建评估链（导入时构建一次）
+    
+    Returns:
+        [(评估器名称, 评估函数), ...]，按优先级排列，最后一项总是简单算法
+    """
+    ifs_step = ('IFS', find_most_threatening_target_with_ifs)
+    gpt_step = ('GPT', find_most_threatening_target_with_gpt)
+    
+    if THREAT_ASSESSMENT_STRATEGY == 'ifs_first':
+        candidates = [(ENABLE_IFS_ASSESSMENT and ifs_adapter, ifs_step),
+                      (GPT_AVAILABLE, gpt_step)]
+    elif THREAT_ASSESSMENT_STRATEGY == 'gpt_first':
+        candidates = [(GPT_AVAILABLE, gpt_step),
+                      (ENABLE_IFS_ASSESSMENT and ifs_adapter, ifs_step)]
+    else:  # simple_only
+        candidates = []
+    
+    chain = [step for available, step in candidates if available]
+    chain.append(('simple algorithm', find_most_threatening_target_simple))
+    return chain
+
+
 def find_most_threatening_target(game_data: GameData) -> Optional[Target]:
     """
     找出最有威胁的目标（三级评估策略）
@@ -297,45 +504,17 @@ def find_most_threatening_target(game_data: GameData) -> Optional[Target]:
         logger.warning("No targets found in game data")
         return None
     
-    # 策略：ifs_first（默认）
-    if THREAT_ASSESSMENT_STRATEGY == 'ifs_first':
-        # 【第一优先级】IFS评估
-        if ENABLE_IFS_ASSESSMENT and ifs_adapter:
-            result = find_most_threatening_target_with_ifs(game_data)
-            if result:
-                return result
-            logger.warning("IFS evaluation failed, falling back to GPT")
-        
-        # 【第二优先级】GPT-4o评估
-        if ENABLE_GPT_ASSESSMENT and client:
-            result = find_most_threatening_target_with_gpt(game_data)
-            if result:
-                return result
-            logger.warning("GPT evaluation failed, falling back to simple algorithm")
-        
-        # 【第三优先级】简单算法（保底）
-        return find_most_threatening_target_simple(game_data)
-    
-    # 策略：gpt_first
-    elif THREAT_ASSESSMENT_STRATEGY == 'gpt_first':
-        # 【第一优先级】GPT-4o评估
-        if ENABLE_GPT_ASSESSMENT and client:
-            result = find_most_threatening_target_with_gpt(game_data)
-            if result:
-                return result
-            logger.warning("GPT evaluation failed, falling back to IFS")
-        
-        # 【第二优先级】IFS评估
-        if ENABLE_IFS_ASSESSMENT and ifs_adapter:
-            result = find_most_threatening_target_with_ifs(game_data)
-            if result:
-                return result
-            logger.warning("IFS evaluation failed, falling back to simple algorithm")
-        
-        # 【第三优先级】简单算法（保底）
-        return find_most_threatening_target_simple(game_data)
-    
-    # 策略：simple_only
-    else:
-        return find_most_threatening_target_simple(game_data)
+    # 依次尝试评估链中的评估器，简单算法作为最后的保底
+    last = len(_ASSESSMENT_CHAIN) - 1
+    for index, (_, assess) in enumerate(_ASSESSMENT_CHAIN):
+        result = assess(game_data)
+        if result or index == last:
+            return result
+        logger.warning(
+            "%s evaluation failed, falling back to %s",
+            _ASSESSMENT_CHAIN[index][0], _ASSESSMENT_CHAIN[index + 1][0]
+        )
+
 
+# 评估链（评估策略和评估器可用状态在运行期间不变）
+_ASSESSMENT_CHAIN = _build_assessment_chain()
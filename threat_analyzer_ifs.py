@@ -2,7 +2,10 @@
 import logging
 import os
 from typing import Optional, Tuple, Dict, List
-from models import Target, GameData
+
+import numpy as np
+
+from models import Target, GameData, TargetType
 
 logger = logging.getLogger(__name__)
 
@@ -54,7 +57,7 @@ class IFSThreatAnalyzerAdapter:
             enemy字典，包含IFS评估所需的字段
         """
         # 类型映射: Drone -> drone, Soldier -> soldier
-        enemy_type = 'drone' if target.type.lower() == 'drone' else 'soldier'
+        enemy_type = 'drone' if target.kind == TargetType.DRONE else 'soldier'
         
         return {
             'id': target.id,
@@ -65,15 +68,52 @@ class IFSThreatAnalyzerAdapter:
             'direction': target.direction
         }
     
+    def convert_targets_to_enemies(self, game_data: GameData) -> List[Dict]:
+        """
+        批量转换所有目标为IFS所需的enemy字典（与逐个调用convert_target_to_enemy结果一致）
+        
+        直接读取GameData的按列缓存，不再逐个访问Target对象的属性
+        
+        Args:
+            game_data: 游戏数据对象
+            
+        Returns:
+            enemy字典列表，与game_data.targets一一对应
+        """
+        positions, _, _ = game_data.target_arrays()
+        ids, kinds, speeds, directions = game_data.target_attributes()
+        if np.isnan(speeds).any() or np.isnan(directions).any():
+            # 缺少速度或方向时保持原值（None）传给评估器
+            return [self.convert_target_to_enemy(t) for t in game_data.targets]
+        
+        types = np.where(kinds == TargetType.DRONE, 'drone', 'soldier').tolist()
+        return [
+            {
+                'id': target_id,
+                'type': enemy_type,
+                'x': x,
+                'z': z,
+                'speed': speed,
+                'direction': direction
+            }
+            for target_id, enemy_type, x, z, speed, direction in zip(
+                ids, types, positions[:, 0].tolist(), positions[:, 2].tolist(),
+                speeds.tolist(), directions.tolist()
+            )
+        ]
+    
     def find_most_threatening(
         self, 
-        game_data: GameData
+        game_data: GameData,
+        want_details: bool = True
     ) -> Tuple[Optional[Target], Optional[Dict]]:
         """
         使用IFS评估找出最高威胁目标
         
         Args:
             game_data: 游戏数据对象
+            want_details: 是否返回完整评估详情（指标详情、贡献度等）；
+                为False时详情字典只含 enemy_id / comprehensive_threat_score / threat_level / distance
             
         Returns:
             (最高威胁的Target对象, IFS评估详情字典) 或 (None, None)
@@ -84,10 +124,10 @@ class IFSThreatAnalyzerAdapter:
         
         try:
             # 转换数据格式
-            enemies = [self.convert_target_to_enemy(t) for t in game_data.targets]
+            enemies = self.convert_targets_to_enemies(game_data)
             player_pos = (game_data.playerPosition.x, game_data.playerPosition.z)
             
-            logger.debug(f"Evaluating {len(enemies)} enemies at player position {player_pos}")
+            logger.debug("Evaluating %d enemies at player position %s", len(enemies), player_pos)
             
             # 地形分析（如果可用）
             terrain_data = None
@@ -97,7 +137,7 @@ class IFSThreatAnalyzerAdapter:
                         enemies, 
                         player_pos
                     )
-                    logger.debug(f"Terrain analysis completed for {len(enemies)} enemies")
+                    logger.debug("Terrain analysis completed for %d enemies", len(enemies))
                 except Exception as e:
                     logger.warning(f"Terrain analysis failed: {e}, continuing without terrain data")
                     terrain_data = None
@@ -106,7 +146,8 @@ class IFSThreatAnalyzerAdapter:
             result = self.evaluator.find_most_threatening(
                 enemies, 
                 player_pos, 
-                terrain_data
+                terrain_data,
+                include_details=want_details
             )
             
             if not result:
@@ -115,14 +156,13 @@ class IFSThreatAnalyzerAdapter:
             
             # 转换回Target对象
             enemy_id = result['enemy_id']
-            for target in game_data.targets:
-                if target.id == enemy_id:
-                    logger.info(
-                        f"IFS selected target ID={enemy_id}, "
-                        f"Score={result['comprehensive_threat_score']:.3f}, "
-                        f"Level={result['threat_level']}"
-                    )
-                    return target, result
+            target = game_data.target_by_id(enemy_id)
+            if target is not None:
+                logger.info(
+                    "IFS selected target ID=%s, Score=%.3f, Level=%s",
+                    enemy_id, result['comprehensive_threat_score'], result['threat_level']
+                )
+                return target, result
             
             logger.error(f"IFS returned invalid enemy ID: {enemy_id}")
             return None, None
@@ -149,7 +189,7 @@ class IFSThreatAnalyzerAdapter:
         
         try:
             # 转换数据格式
-            enemies = [self.convert_target_to_enemy(t) for t in game_data.targets]
+            enemies = self.convert_targets_to_enemies(game_data)
             player_pos = (game_data.playerPosition.x, game_data.playerPosition.z)
             
             # 地形分析（如果可用）
@@ -195,6 +235,10 @@ def log_ifs_details(target: Target, ifs_details: Dict):
         target: 目标对象
         ifs_details: IFS评估详情字典
     """
+    # INFO未启用时跳过下面所有格式化
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     logger.info("=" * 70)
     logger.info("🎯 IFS Threat Assessment Details")
     logger.info(f"Target ID: {target.id} ({target.type})")
@@ -1,27 +1,68 @@
 """UDP服务器模块"""
+import re
 import socket
+import selectors
 import json
 import logging
-from typing import Optional
+from typing import List, Optional, Tuple
 from models import GameData
 
+try:
+    import orjson  # 可选：更快的JSON解析，直接接受bytes
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads  # 标准库json同样接受UTF-8编码的bytes
+
 logger = logging.getLogger(__name__)
 
+_MAX_DATAGRAM_SIZE = 65507  # UDP（IPv4）单个数据报的最大有效载荷
+
+# 不反序列化即可从原始数据报中取出回合号，用于挑选最新回合
+_ROUND_RE = re.compile(rb'"round"\s*:\s*(-?\d+)')
+
+
+def _peek_round(data: bytes) -> Optional[int]:
+    """
+    用正则从原始数据报中读取回合号（不解析整个JSON）
+    
+    Args:
+        data: 数据报内容
+    
+    Returns:
+        回合号，找不到时返回None
+    """
+    match = _ROUND_RE.search(data)
+    return int(match.group(1)) if match else None
+
 
 class UDPServer:
     """UDP服务器"""
     
-    def __init__(self, host: str = "0.0.0.0", port: int = 5005):
+    def __init__(
+        self,
+        host: str = "0.0.0.0",
+        port: int = 5005,
+        recv_buffer_size: int = 4 * 1024 * 1024,
+        send_buffer_size: int = 4 * 1024 * 1024
+    ):
         """
         初始化UDP服务器
         
         Args:
             host: 监听地址，默认0.0.0.0（所有网络接口）
             port: 监听端口，默认5005
+            recv_buffer_size: 套接字接收缓冲区大小（字节），默认4 MiB
+            send_buffer_size: 套接字发送缓冲区大小（字节），默认4 MiB
         """
         self.host = host
         self.port = port
+        self.recv_buffer_size = recv_buffer_size
+        self.send_buffer_size = send_buffer_size
         self.socket: Optional[socket.socket] = None
+        self._selector: Optional[selectors.BaseSelector] = None
+        # 复用的接收缓冲区：recvfrom_into写入后只复制实际长度，避免每个数据报都分配64KB
+        self._recv_buf = bytearray(_MAX_DATAGRAM_SIZE)
+        self._recv_view = memoryview(self._recv_buf)
     
     def start(self) -> bool:
         """
@@ -32,8 +73,13 @@ class UDPServer:
         """
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._configure_buffers()
             self.socket.bind((self.host, self.port))
-            self.socket.settimeout(1.0)  # 设置超时以便能够响应中断
+            # 非阻塞socket + 选择器：线程在select中休眠直到socket可读
+            # （Linux上为epoll，Windows上为select）
+            self.socket.setblocking(False)
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self.socket, selectors.EVENT_READ)
             logger.info(f"UDP server started on {self.host}:{self.port}")
             return True
         except OSError as e:
@@ -43,49 +89,182 @@ class UDPServer:
             logger.error(f"Unexpected error starting UDP server: {e}")
             return False
     
-    def receive_data(self) -> Optional[GameData]:
+    def _configure_buffers(self):
+        """
+        增大套接字收/发缓冲区，使主循环处理较慢时内核能暂存更多数据报
+        
+        设置后通过getsockopt读回实际值；系统上限（如Linux的net.core.rmem_max）
+        会截断请求值，此时只记录警告，不影响启动
+        """
+        for name, option, requested in (
+            ("SO_RCVBUF", socket.SO_RCVBUF, self.recv_buffer_size),
+            ("SO_SNDBUF", socket.SO_SNDBUF, self.send_buffer_size),
+        ):
+            try:
+                self.socket.setsockopt(socket.SOL_SOCKET, option, requested)
+                actual = self.socket.getsockopt(socket.SOL_SOCKET, option)
+            except OSError as e:
+                logger.warning(f"Failed to set {name} to {requested} bytes: {e}")
+                continue
+            
+            # Linux内核会把设置值翻倍（含簿记开销），读回值小于请求值说明被系统上限截断
+            if actual < requested:
+                logger.warning(
+                    f"{name} capped at {actual} bytes (requested {requested}); "
+                    f"raise the OS limit (e.g. sysctl net.core.rmem_max / wmem_max) to allow more"
+                )
+            else:
+                logger.info(f"{name} set to {actual} bytes")
+    
+    def receive_data(self, timeout: float = 1.0) -> Optional[GameData]:
         """
         接收UDP数据并解析为GameData对象
         
+        Args:
+            timeout: 等待数据的最长时间（秒），超时返回None以便调用方能够响应中断
+        
         Returns:
-            GameData对象，如果接收失败或解析失败则返回None
+            GameData对象，如果超时、接收失败或解析失败则返回None
         """
         if not self.socket:
             logger.error("UDP server is not started")
             return None
         
         try:
-            # 接收数据（最大65507字节，UDP最大数据包大小）
-            data, addr = self.socket.recvfrom(65507)
-            logger.info(f"Received UDP data from {addr}, size: {len(data)} bytes")
-            
-            # 解析JSON
-            try:
-                json_str = data.decode('utf-8')
-                logger.info(f"Received JSON data: {json_str}")
-                json_data = json.loads(json_str)
-                game_data = GameData.from_dict(json_data)
-                logger.info(f"Successfully parsed game data - Round: {game_data.round}, Player Position: ({game_data.playerPosition.x}, {game_data.playerPosition.y}, {game_data.playerPosition.z}), Targets count: {len(game_data.targets)}")
-                return game_data
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON data: {e}")
-                return None
-            except KeyError as e:
-                logger.error(f"Missing required field in JSON data: {e}")
+            # 等待socket可读，超时是正常的，用于检查是否需要退出
+            if not self._selector.select(timeout):
                 return None
-            except Exception as e:
-                logger.error(f"Failed to create GameData object: {e}")
-                return None
-                
-        except socket.timeout:
-            # 超时是正常的，用于检查是否需要退出
+            
+            data, addr = self._recv_datagram()
+            return self._parse_game_data(data, addr)
+            
+        except (BlockingIOError, socket.timeout):
+            # select返回后数据已被取走等情况，视为本次没有数据
             return None
         except Exception as e:
             logger.error(f"Error receiving UDP data: {e}")
             return None
     
+    def receive_batch(self, max_datagrams: int = 32, timeout: float = 1.0) -> List[Tuple[bytes, tuple]]:
+        """
+        等待socket可读后，一次性取出内核队列中已到达的所有数据报（最多max_datagrams个）
+        
+        Args:
+            max_datagrams: 单次最多取出的数据报数量，默认32
+            timeout: 等待数据的最长时间（秒）
+        
+        Returns:
+            按到达顺序排列的 (data, addr) 列表，超时或出错时为空列表
+        """
+        batch = []
+        if not self.socket:
+            logger.error("UDP server is not started")
+            return batch
+        
+        try:
+            if not self._selector.select(timeout):
+                return batch
+            
+            # socket为非阻塞模式：连续recvfrom直到队列取空（BlockingIOError）或达到上限
+            while len(batch) < max_datagrams:
+                try:
+                    batch.append(self._recv_datagram())
+                except BlockingIOError:
+                    break
+        except Exception as e:
+            logger.error(f"Error receiving UDP data: {e}")
+        
+        return batch
+    
+    def _recv_datagram(self) -> Tuple[bytes, tuple]:
+        """
+        从socket读取一个数据报到复用缓冲区，返回其内容的副本
+        
+        Returns:
+            (data, addr)
+        """
+        nbytes, addr = self.socket.recvfrom_into(self._recv_buf)
+        return bytes(self._recv_view[:nbytes]), addr
+    
+    def receive_latest(self, max_datagrams: int = 32, timeout: float = 1.0) -> Optional[GameData]:
+        """
+        批量接收数据报，只解析最新回合的一条（主循环处理较慢时跳过已过时的中间数据）
+        
+        先用正则直接从原始bytes中读取各数据报的回合号，按回合号从大到小（同回合按到达
+        先后从新到旧）依次尝试解析，返回第一条解析成功的数据；过时的数据报不做反序列化。
+        读不出回合号的数据报排在最后
+        
+        Args:
+            max_datagrams: 单次最多取出的数据报数量，默认32
+            timeout: 等待数据的最长时间（秒）
+        
+        Returns:
+            最新的GameData对象，如果超时或全部解析失败则返回None
+        """
+        batch = self.receive_batch(max_datagrams, timeout)
+        if len(batch) > 1:
+            rounds = [_peek_round(data) for data, _ in batch]
+            order = sorted(
+                range(len(batch)),
+                key=lambda i: (rounds[i] is not None, rounds[i] or 0, i),
+                reverse=True
+            )
+        else:
+            order = range(len(batch))
+        
+        for attempt, index in enumerate(order):
+            data, addr = batch[index]
+            game_data = self._parse_game_data(data, addr)
+            if game_data is not None:
+                skipped = len(batch) - 1
+                if skipped:
+                    logger.info(
+                        "Skipped %d stale UDP datagram(s) (%d failed to parse), processing round %s",
+                        skipped, attempt, game_data.round
+                    )
+                return game_data
+        return None
+    
+    def _parse_game_data(self, data: bytes, addr) -> Optional[GameData]:
+        """
+        把收到的UDP数据报解析为GameData对象
+        
+        Args:
+            data: 数据报内容
+            addr: 发送方地址
+        
+        Returns:
+            GameData对象，解析失败返回None
+        """
+        logger.info("Received UDP data from %s, size: %d bytes", addr, len(data))
+        
+        # 解析JSON（直接解析bytes，不先解码为str；原始内容只在DEBUG日志开启时解码输出）
+        try:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Received JSON data: %s", data.decode('utf-8', errors='replace'))
+            json_data = _json_loads(data)
+            game_data = GameData.from_dict(json_data)
+            player_pos = game_data.playerPosition
+            logger.info(
+                "Successfully parsed game data - Round: %s, Player Position: (%s, %s, %s), Targets count: %d",
+                game_data.round, player_pos.x, player_pos.y, player_pos.z, len(game_data.targets)
+            )
+            return game_data
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON data: {e}")
+            return None
+        except KeyError as e:
+            logger.error(f"Missing required field in JSON data: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Failed to create GameData object: {e}")
+            return None
+    
     def stop(self):
         """停止UDP服务器"""
+        if self._selector:
+            self._selector.close()
+            self._selector = None
         if self.socket:
             self.socket.close()
             logger.info("UDP server stopped")